@@ -0,0 +1,27 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-material-fulfilment-ledger")
+@pass_context
+def rebuild_material_fulfilment_ledger(context):
+	"""Rebuild the Material Fulfilment Ledger from submitted documents."""
+	import frappe
+
+	from fabric_sense.fabric_sense.py.material_fulfilment import (
+		rebuild_material_fulfilment_ledger as rebuild,
+	)
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		frappe.set_user("Administrator")
+		rows = rebuild()
+		frappe.db.commit()
+		click.echo(f"Rebuilt {rows} ledger rows for {site}")
+	finally:
+		frappe.destroy()
+
+
+commands = [rebuild_material_fulfilment_ledger]
@@ -5,8 +5,137 @@ import frappe
 from frappe.model.document import Document
 
 
+BRAND_GRAPH_CACHE_KEY = "fabric_sense:brand_graph"
+
+# Backstop for a graph rebuilt from rows a concurrent transaction was about to change
+BRAND_GRAPH_CACHE_TTL = 3600
+
+
 class Brands(Document):
-	pass
+	def on_update(self):
+		# Sub Categories and Catalogues are child tables, so every change to them
+		# goes through the parent Brand and lands here
+		clear_brand_graph_cache()
+
+	def on_trash(self):
+		clear_brand_graph_cache()
+
+	def after_rename(self, old, new, merge=False):
+		clear_brand_graph_cache()
+
+
+def clear_brand_graph_cache():
+	"""
+	Invalidate the brand graph for a change made in the current transaction.
+
+	The cached graph is only dropped after commit, so no other worker can rebuild it from
+	the old rows in between. Until then this request reads the graph from the database.
+	"""
+	frappe.local.fabric_sense_brand_graph_dirty = True
+	frappe.db.after_commit.add(_invalidate_shared_brand_graph)
+
+
+def _invalidate_shared_brand_graph():
+	frappe.cache().delete_value(BRAND_GRAPH_CACHE_KEY)
+	frappe.local.fabric_sense_brand_graph_dirty = False
+
+
+def get_brand_graph():
+	"""
+	Return the brand graph used by the Item form, built once and cached in Redis for at
+	most BRAND_GRAPH_CACHE_TTL seconds:
+
+	{
+		"brands": {brand: {"brand_name": ..., "catalogues": [...], "item_groups": [...]}},
+		"item_groups": {item_group: [brand, ...]},
+	}
+	"""
+	if getattr(frappe.local, "fabric_sense_brand_graph_dirty", False):
+		# Brands changed in this transaction, the cached graph does not have it yet
+		return _build_brand_graph()
+
+	graph = frappe.cache().get_value(BRAND_GRAPH_CACHE_KEY)
+	if graph is None:
+		graph = _build_brand_graph()
+		frappe.cache().set_value(
+			BRAND_GRAPH_CACHE_KEY, graph, expires_in_sec=BRAND_GRAPH_CACHE_TTL
+		)
+	return graph
+
+
+def _build_brand_graph():
+	brands = {
+		b.name: {"brand_name": b.brand_name, "catalogues": [], "item_groups": []}
+		for b in frappe.db.sql(
+			"""
+			SELECT name, brand_name
+			FROM `tabBrands`
+			ORDER BY brand_name, name
+			""",
+			as_dict=True,
+		)
+	}
+	item_groups = {}
+
+	for row in frappe.db.sql(
+		"""
+		SELECT parent, catalogue
+		FROM `tabCatalogues`
+		WHERE parenttype = 'Brands'
+		ORDER BY catalogue
+		""",
+		as_dict=True,
+	):
+		if row.parent in brands and row.catalogue:
+			brands[row.parent]["catalogues"].append(row.catalogue)
+
+	for row in frappe.db.sql(
+		"""
+		SELECT parent, item_group
+		FROM `tabSub Categories`
+		WHERE parenttype = 'Brands'
+		ORDER BY idx
+		""",
+		as_dict=True,
+	):
+		if row.parent not in brands or not row.item_group:
+			continue
+		if row.item_group not in brands[row.parent]["item_groups"]:
+			brands[row.parent]["item_groups"].append(row.item_group)
+		item_groups.setdefault(row.item_group, [])
+		if row.parent not in item_groups[row.item_group]:
+			item_groups[row.item_group].append(row.parent)
+
+	# Keep brand lists in the same order as the brands themselves (by brand_name)
+	brand_order = {name: idx for idx, name in enumerate(brands)}
+	for brand_list in item_groups.values():
+		brand_list.sort(key=brand_order.get)
+
+	return {"brands": brands, "item_groups": item_groups}
+
+
+@frappe.whitelist()
+def get_item_form_brand_data(item_group=None, brand=None):
+	"""
+	Single endpoint for the Item form.
+	Returns whether the item group is mapped to any brand, the brands available
+	for it (with their catalogues) and the catalogues of the selected brand.
+	"""
+	graph = get_brand_graph()
+	brand_names = graph["item_groups"].get(item_group, []) if item_group else []
+
+	return {
+		"item_group_in_brands": bool(brand_names),
+		"brands": [
+			{
+				"name": name,
+				"brand_name": graph["brands"][name]["brand_name"],
+				"catalogues": graph["brands"][name]["catalogues"],
+			}
+			for name in brand_names
+		],
+		"catalogues": graph["brands"].get(brand, {}).get("catalogues", []) if brand else [],
+	}
 
 
 @frappe.whitelist()
@@ -14,38 +143,26 @@ def get_brands_by_item_group(doctype, txt, searchfield, start, page_len, filters
 	"""
 	Custom query function to filter brands based on item group.
 	Returns brands that have the specified item group in their sub_categories child table.
+	Served from the cached brand graph instead of joining Sub Categories on every keystroke.
 	"""
-	item_group = filters.get("item_group")
-	
-	if not item_group:
+	item_group = (filters or {}).get("item_group")
+	graph = get_brand_graph()
+
+	if item_group:
+		brand_names = graph["item_groups"].get(item_group, [])
+	else:
 		# If no item group is specified, return all brands
-		return frappe.db.sql("""
-			SELECT name, brand_name
-			FROM `tabBrands`
-			WHERE name LIKE %(txt)s
-			ORDER BY brand_name
-			LIMIT %(start)s, %(page_len)s
-		""", {
-			"txt": "%" + txt + "%",
-			"start": start,
-			"page_len": page_len
-		})
-	
-	# Filter brands that have the specified item group in their sub_categories
-	return frappe.db.sql("""
-		SELECT DISTINCT b.name, b.brand_name
-		FROM `tabBrands` b
-		INNER JOIN `tabSub Categories` sc ON sc.parent = b.name
-		WHERE sc.item_group = %(item_group)s
-		AND b.name LIKE %(txt)s
-		ORDER BY b.brand_name
-		LIMIT %(start)s, %(page_len)s
-	""", {
-		"item_group": item_group,
-		"txt": "%" + txt + "%",
-		"start": start,
-		"page_len": page_len
-	})
+		brand_names = list(graph["brands"])
+
+	txt = (txt or "").lower()
+	matches = [
+		(name, graph["brands"][name]["brand_name"])
+		for name in brand_names
+		if not txt or txt in name.lower()
+	]
+
+	start, page_len = int(start or 0), int(page_len or 20)
+	return matches[start : start + page_len]
 
 
 @frappe.whitelist()
@@ -56,17 +173,8 @@ def get_catalogues_by_brand(brand):
 	"""
 	if not brand:
 		return []
-	
-	catalogues = frappe.db.sql("""
-		SELECT catalogue
-		FROM `tabCatalogues`
-		WHERE parent = %(brand)s
-		ORDER BY catalogue
-	""", {
-		"brand": brand
-	}, as_dict=True)
-	
-	return [cat.catalogue for cat in catalogues]
+
+	return get_brand_graph()["brands"].get(brand, {}).get("catalogues", [])
 
 
 @frappe.whitelist()
@@ -77,13 +185,5 @@ def check_item_group_in_brands(item_group):
 	"""
 	if not item_group:
 		return False
-	
-	result = frappe.db.sql("""
-		SELECT COUNT(*) as count
-		FROM `tabSub Categories` sc
-		WHERE sc.item_group = %(item_group)s
-	""", {
-		"item_group": item_group
-	}, as_dict=True)
-	
-	return result[0].count > 0 if result else False
+
+	return bool(get_brand_graph()["item_groups"].get(item_group))
@@ -1,9 +1,37 @@
 # Copyright (c) 2025, innogenio and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from fabric_sense.fabric_sense.doctype.brands.brands import BRAND_GRAPH_CACHE_KEY, get_brand_graph
+
 
 class TestBrands(FrappeTestCase):
-	pass
+	def _make_brand(self):
+		brand = frappe.new_doc("Brands")
+		brand.brand_name = "Brand Graph Test Brand"
+		brand.append("catalogue", {"catalogue": "Brand Graph Test Catalogue"})
+		brand.flags.ignore_links = True
+		brand.insert(ignore_permissions=True)
+		return brand
+
+	def test_brand_is_visible_in_the_saving_transaction(self):
+		brand = self._make_brand()
+
+		self.assertEqual(
+			get_brand_graph()["brands"][brand.name]["catalogues"], ["Brand Graph Test Catalogue"]
+		)
+
+	def test_shared_cache_is_invalidated_after_commit(self):
+		brand = self._make_brand()
+
+		# Until commit the saved brand must not reach the shared cache
+		self.assertIn(brand.name, get_brand_graph()["brands"])
+		self.assertNotIn(
+			brand.name, (frappe.cache().get_value(BRAND_GRAPH_CACHE_KEY) or {}).get("brands", {})
+		)
+
+		frappe.db.after_commit.run()
+		self.assertIn(brand.name, get_brand_graph()["brands"])
+		self.assertIn(brand.name, frappe.cache().get_value(BRAND_GRAPH_CACHE_KEY)["brands"])
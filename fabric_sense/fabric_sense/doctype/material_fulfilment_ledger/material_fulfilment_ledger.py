@@ -0,0 +1,16 @@
+# Copyright (c) 2026, innogenio and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class MaterialFulfilmentLedger(Document):
+	pass
+
+
+def on_doctype_update():
+	# Every remaining-quantity lookup filters by source document, optionally by item
+	frappe.db.add_index(
+		"Material Fulfilment Ledger", ["source_doctype", "source_name", "item_code"]
+	)
@@ -0,0 +1,73 @@
+# Copyright (c) 2026, innogenio and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from fabric_sense.fabric_sense.py.material_fulfilment import (
+	get_fulfilment_ledger,
+	get_ledger_name,
+	get_ledger_quantities,
+	get_requested_quantities,
+	update_ledger_for_delivery_note,
+	update_ledger_for_material_request,
+)
+
+
+class TestMaterialFulfilmentLedger(FrappeTestCase):
+	def setUp(self):
+		frappe.db.delete("Material Fulfilment Ledger", {"source_name": "SO-LEDGER-TEST"})
+
+	def _material_request(self, qty):
+		return frappe._dict(
+			custom_tailoring_sheet=None,
+			custom_sales_order="SO-LEDGER-TEST",
+			items=[frappe._dict(item_code="LEDGER-ITEM", qty=qty)],
+		)
+
+	def test_submit_and_cancel_are_symmetric(self):
+		"""Cancelling a Material Request removes exactly what its submit added"""
+		update_ledger_for_material_request(self._material_request(4), "on_submit")
+		update_ledger_for_material_request(self._material_request(6), "on_submit")
+		ledger = get_fulfilment_ledger("Sales Order", "SO-LEDGER-TEST")
+		self.assertEqual(ledger["LEDGER-ITEM"].requested_qty, 10)
+
+		update_ledger_for_material_request(self._material_request(4), "on_cancel")
+		ledger = get_fulfilment_ledger("Sales Order", "SO-LEDGER-TEST")
+		self.assertEqual(ledger["LEDGER-ITEM"].requested_qty, 6)
+
+	def test_delivery_note_updates_delivered_qty(self):
+		"""Delivered quantities are booked against the Sales Order of each row"""
+		dn = frappe._dict(
+			items=[
+				frappe._dict(item_code="LEDGER-ITEM", qty=2, against_sales_order="SO-LEDGER-TEST"),
+				frappe._dict(item_code="LEDGER-ITEM", qty=3, against_sales_order="SO-LEDGER-TEST"),
+			]
+		)
+		update_ledger_for_delivery_note(dn, "on_submit")
+		row = get_fulfilment_ledger("Sales Order", "SO-LEDGER-TEST", ["LEDGER-ITEM"])["LEDGER-ITEM"]
+		self.assertEqual(row.delivered_qty, 5)
+		self.assertEqual(row.requested_qty, 0)
+
+	def test_remaining_quantity_reads(self):
+		"""Readers see the submitted requests through the ledger"""
+		update_ledger_for_material_request(self._material_request(4), "on_submit")
+		self.assertEqual(get_requested_quantities("Sales Order", "SO-LEDGER-TEST"), {"LEDGER-ITEM": 4})
+		self.assertEqual(
+			get_ledger_quantities("Sales Order", ["SO-LEDGER-TEST", "SO-OTHER"], "requested_qty"),
+			{("SO-LEDGER-TEST", "LEDGER-ITEM"): 4},
+		)
+		self.assertEqual(
+			get_ledger_quantities("Sales Order", ["SO-LEDGER-TEST"], "requested_qty", []), {}
+		)
+
+	def test_ledger_name_is_deterministic(self):
+		self.assertEqual(
+			get_ledger_name("Sales Order", "SO-1", "ITEM"),
+			get_ledger_name("Sales Order", "SO-1", "ITEM"),
+		)
+		self.assertNotEqual(
+			get_ledger_name("Sales Order", "SO-1", "ITEM"),
+			get_ledger_name("Tailoring Sheet", "SO-1", "ITEM"),
+		)
+
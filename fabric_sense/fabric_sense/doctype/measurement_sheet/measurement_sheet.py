@@ -1134,7 +1134,12 @@ def get_available_projects(doctype, txt, searchfield, start, page_len, filters):
     """
     Returns projects that are not already assigned to other measurement sheets.
     Excludes projects that are already linked to existing measurement sheets (except current one if editing).
-    
+
+    Uses a NOT EXISTS anti-join on the indexed `Measurement Sheet.project` column so the
+    exclusion is resolved per project instead of materialising every used project.
+    Link fields page with start/page_len, so results are paged with OFFSET over a total
+    order (projects without a project_name sort first).
+
     Args:
         doctype (str): Doctype name (for query function signature)
         txt (str): Search text
@@ -1142,53 +1147,50 @@ def get_available_projects(doctype, txt, searchfield, start, page_len, filters):
         start (int): Pagination start
         page_len (int): Page length
         filters (dict): Additional filters including customer and current measurement sheet name
-    
+
     Returns:
         list: List of available project names
     """
     try:
-        # Get customer filter if provided
-        customer = filters.get("customer") if filters else None
-        current_measurement_sheet = filters.get("current_measurement_sheet") if filters else None
-        
-        # Base query to get projects
-        query = """
-            SELECT DISTINCT p.name, p.project_name
-            FROM `tabProject` p
-            WHERE p.name NOT IN (
-                SELECT DISTINCT ms.project
-                FROM `tabMeasurement Sheet` ms
-                WHERE ms.project IS NOT NULL 
-                AND ms.project != ''
-                AND ms.docstatus != 2
-        """
-        
+        filters = filters or {}
+        customer = filters.get("customer")
+        current_measurement_sheet = filters.get("current_measurement_sheet")
+
+        exclude_current = ""
         params = []
-        
+
         # Exclude current measurement sheet if editing
         if current_measurement_sheet:
-            query += " AND ms.name != %s"
+            exclude_current = " AND ms.name != %s"
             params.append(current_measurement_sheet)
-            
-        query += ")"
-        
+
+        # `ms.project = p.name` never matches NULL or empty values, so no extra guards are needed
+        query = f"""
+            SELECT p.name, p.project_name
+            FROM `tabProject` p
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM `tabMeasurement Sheet` ms
+                WHERE ms.project = p.name
+                AND ms.docstatus != 2{exclude_current}
+            )
+        """
+
         # Filter by customer if provided
         if customer:
             query += " AND p.customer = %s"
             params.append(customer)
-            
+
         # Apply search text
         if txt:
             query += f" AND (p.{searchfield} LIKE %s OR p.project_name LIKE %s)"
             params.extend([f"%{txt}%", f"%{txt}%"])
-            
-        # Add ordering and pagination
-        query += " ORDER BY p.project_name LIMIT %s OFFSET %s"
+
+        query += " ORDER BY IFNULL(p.project_name, ''), p.name LIMIT %s OFFSET %s"
         params.extend([page_len, start])
-        
-        result = frappe.db.sql(query, params, as_dict=False)
-        return result
-        
+
+        return frappe.db.sql(query, params, as_dict=False)
+
     except Exception as e:
         frappe.log_error(
             f"Error in get_available_projects: {str(e)}\n{frappe.get_traceback()}",
@@ -0,0 +1,8 @@
+// Copyright (c) 2026, innogenio and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Reorder Monitoring Settings", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -1,12 +1,23 @@
 # Copyright (c) 2025, innogenio and Contributors
 # See license.txt
 
+from unittest.mock import patch
+
 import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, flt, getdate
+from fabric_sense.fabric_sense.py.reorder_forecast import (
+    forecast_consumption,
+    update_reorder_forecasts,
+)
 from fabric_sense.fabric_sense.py.reorder_monitoring import (
+    REORDER_LEVEL_CACHE_KEY,
+    REORDER_LEVEL_VERSION_KEY,
     get_reorder_level,
+    get_reorder_level_map,
     get_current_stock_balance,
-    create_reorder_notification
+    create_reorder_notification,
+    upsert_reorder_notifications,
 )
 
 
@@ -25,25 +36,70 @@ class TestReorderNotification(FrappeTestCase):
             })
             item.insert(ignore_permissions=True)
             
-        # Create test warehouse if it doesn't exist
-        if not frappe.db.exists("Warehouse", "TEST-WAREHOUSE"):
+        # Create test warehouse if it doesn't exist; its name carries the company abbreviation
+        company = frappe.defaults.get_global_default("company") or "Test Company"
+        self.warehouse = frappe.db.get_value(
+            "Warehouse", {"warehouse_name": "Test Warehouse", "company": company}, "name"
+        )
+        if not self.warehouse:
             warehouse = frappe.get_doc({
                 "doctype": "Warehouse",
                 "warehouse_name": "Test Warehouse",
-                "company": frappe.defaults.get_global_default("company") or "Test Company"
+                "company": company
             })
             warehouse.insert(ignore_permissions=True)
+            self.warehouse = warehouse.name
     
     def test_get_reorder_level(self):
         """Test getting reorder level for item-warehouse combination"""
         # This will return None if no reorder level is set
-        reorder_level = get_reorder_level("TEST-REORDER-ITEM", "TEST-WAREHOUSE")
+        reorder_level = get_reorder_level("TEST-REORDER-ITEM", self.warehouse)
         # Should be None initially as no reorder level is set
         self.assertIsNone(reorder_level)
     
+    def test_reorder_level_map_follows_item_save(self):
+        """Saving an Item's reorder levels invalidates the cached map"""
+        warehouse = frappe.db.get_value("Warehouse", {"is_group": 0}, "name")
+        if not warehouse:
+            self.skipTest("Needs a warehouse")
+
+        item = frappe.get_doc("Item", "TEST-REORDER-ITEM")
+        item.reorder_levels = []
+        item.save(ignore_permissions=True)
+        self.assertIsNone(get_reorder_level("TEST-REORDER-ITEM", warehouse))
+        self.assertNotIn("TEST-REORDER-ITEM", get_reorder_level_map())
+
+        item.append(
+            "reorder_levels",
+            {
+                "warehouse": warehouse,
+                "warehouse_reorder_level": 10,
+                "warehouse_reorder_qty": 20,
+                "material_request_type": "Purchase",
+            },
+        )
+        item.save(ignore_permissions=True)
+        self.assertEqual(get_reorder_level("TEST-REORDER-ITEM", warehouse), 10.0)
+
+        # The shared map only changes once the save is committed
+        version = frappe.cache().get_value(REORDER_LEVEL_VERSION_KEY)
+        self.assertNotIn(
+            "TEST-REORDER-ITEM",
+            frappe.cache().get_value(f"{REORDER_LEVEL_CACHE_KEY}:{version}") or {},
+        )
+
+        # A map built from the old rows and written late lands on a dead key
+        frappe.db.after_commit.run()
+        frappe.cache().set_value(f"{REORDER_LEVEL_CACHE_KEY}:{version}", {})
+        self.assertIn("TEST-REORDER-ITEM", get_reorder_level_map())
+
+        item.reorder_levels = []
+        item.save(ignore_permissions=True)
+        self.assertIsNone(get_reorder_level("TEST-REORDER-ITEM", warehouse))
+
     def test_get_current_stock_balance(self):
         """Test getting current stock balance"""
-        stock_balance = get_current_stock_balance("TEST-REORDER-ITEM", "TEST-WAREHOUSE")
+        stock_balance = get_current_stock_balance("TEST-REORDER-ITEM", self.warehouse)
         # Should return a float value (could be 0)
         self.assertIsInstance(stock_balance, float)
     
@@ -52,13 +108,13 @@ class TestReorderNotification(FrappeTestCase):
         # Clean up any existing notifications
         frappe.db.delete("Reorder Notification", {
             "item": "TEST-REORDER-ITEM",
-            "warehouse": "TEST-WAREHOUSE"
+            "warehouse": self.warehouse
         })
         
         # Create a reorder notification
         create_reorder_notification(
             item_code="TEST-REORDER-ITEM",
-            warehouse="TEST-WAREHOUSE", 
+            warehouse=self.warehouse, 
             reorder_level=10.0,
             current_quantity=5.0
         )
@@ -66,7 +122,7 @@ class TestReorderNotification(FrappeTestCase):
         # Check if notification was created
         notification = frappe.db.exists("Reorder Notification", {
             "item": "TEST-REORDER-ITEM",
-            "warehouse": "TEST-WAREHOUSE",
+            "warehouse": self.warehouse,
             "status": "Pending"
         })
         
@@ -76,6 +132,88 @@ class TestReorderNotification(FrappeTestCase):
         if notification:
             frappe.delete_doc("Reorder Notification", notification, ignore_permissions=True)
     
+    def test_upsert_keeps_one_open_notification(self):
+        """Repeated checks update the open notification instead of adding rows"""
+        frappe.db.delete("Reorder Notification", {"item": "TEST-REORDER-ITEM"})
+
+        row = {
+            "item_code": "TEST-REORDER-ITEM",
+            "warehouse": self.warehouse,
+            "reorder_level": 10.0,
+            "current_quantity": 5.0,
+        }
+        upsert_reorder_notifications([row])
+        upsert_reorder_notifications([dict(row, current_quantity=3.0)])
+
+        notifications = frappe.get_all(
+            "Reorder Notification",
+            filters={"item": "TEST-REORDER-ITEM", "status": "Pending"},
+            fields=["current_quantity"],
+        )
+        self.assertEqual(len(notifications), 1)
+        self.assertEqual(notifications[0].current_quantity, 3.0)
+
+    def test_forecast_consumption(self):
+        """Steady issues give their daily rate; receipts are not consumption"""
+        start = getdate("2026-01-01")
+        rows = [("ITEM-A", "WH", add_days(start, day), -2, 500 - 2 * day, 1) for day in range(60)]
+        rows.append(("ITEM-B", "WH", start, 40, 40, 0))
+
+        forecasts = {f.item_code: f for f in forecast_consumption(rows, add_days(start, 59))}
+
+        self.assertAlmostEqual(forecasts["ITEM-A"].daily_consumption, 2.0)
+        self.assertEqual(forecasts["ITEM-A"].current_quantity, 382)
+        self.assertEqual(forecasts["ITEM-B"].daily_consumption, 0.0)
+
+    def test_update_reorder_forecasts(self):
+        """Forecasts fill open notifications and never open new ones"""
+        frappe.db.delete("Reorder Notification", {"item": "TEST-REORDER-ITEM"})
+        create_reorder_notification(
+            item_code="TEST-REORDER-ITEM",
+            warehouse=self.warehouse,
+            reorder_level=10.0,
+            current_quantity=5.0,
+        )
+
+        start = getdate("2026-01-01")
+        rows = [
+            ("TEST-REORDER-ITEM", self.warehouse, add_days(start, day), -2, 500 - 2 * day, 1)
+            for day in range(60)
+        ]
+        # Below its suggested level, but without an open notification
+        rows.append(("TEST-REORDER-ITEM", "TEST-OTHER-WAREHOUSE", start, -5, 1, 1))
+
+        with patch(
+            "fabric_sense.fabric_sense.py.reorder_forecast.get_reorder_level_map",
+            return_value={"TEST-REORDER-ITEM": {self.warehouse: 10.0}},
+        ), patch(
+            "fabric_sense.fabric_sense.py.reorder_forecast.get_ledger_rows", return_value=rows
+        ):
+            update_reorder_forecasts(add_days(start, 59))
+
+        notifications = frappe.get_all(
+            "Reorder Notification",
+            filters={"item": "TEST-REORDER-ITEM"},
+            fields=[
+                "warehouse",
+                "reorder_level",
+                "daily_consumption",
+                "days_of_cover",
+                "lead_time_days",
+                "suggested_reorder_level",
+            ],
+        )
+        self.assertEqual(len(notifications), 1)
+        notification = notifications[0]
+        self.assertEqual(notification.warehouse, self.warehouse)
+        # reorder_level is a Data field
+        self.assertEqual(flt(notification.reorder_level), 10.0)
+        self.assertAlmostEqual(notification.daily_consumption, 2.0)
+        self.assertEqual(notification.days_of_cover, 191.0)
+        # No lead time on the Item: the default of 7 days
+        self.assertEqual(notification.lead_time_days, 7)
+        self.assertAlmostEqual(notification.suggested_reorder_level, 14.0)
+
     def tearDown(self):
         """Clean up test data"""
         # Clean up test notifications
@@ -1,9 +1,139 @@
 # Copyright (c) 2025, innogenio and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
+from frappe.utils import flt
+
+
+SERVICE_RATE_MATRIX_CACHE_KEY = "fabric_sense:service_rate_matrix"
+SERVICE_RATE_MATRIX_VERSION_KEY = "fabric_sense:service_rate_matrix_version"
+
+# Matrices are stored under SERVICE_RATE_MATRIX_CACHE_KEY:<version>; the TTL only clears
+# out keys of versions nobody reads any more
+SERVICE_RATE_MATRIX_CACHE_TTL = 86400
+
+# site -> (version, matrix), so a worker only goes back to Redis after an invalidation
+_process_cache = {}
 
 
 class Services(Document):
-	pass
+	def on_update(self):
+		# Contractors is a child table, so rate changes go through the parent Service
+		clear_service_rate_matrix_cache()
+
+	def on_trash(self):
+		clear_service_rate_matrix_cache()
+
+	def after_rename(self, old, new, merge=False):
+		clear_service_rate_matrix_cache()
+
+
+def clear_service_rate_matrix_cache():
+	"""
+	Invalidate the rate matrix for a change made in the current transaction.
+
+	The shared cache is only dropped after commit: done earlier, another worker could
+	rebuild it from the old rows under the new version. Until then this request reads the
+	matrix from the database, so it sees its own changes.
+	"""
+	frappe.local.fabric_sense_service_rate_matrix_dirty = True
+	_process_cache.pop(frappe.local.site, None)
+	frappe.db.after_commit.add(_invalidate_shared_service_rate_matrix)
+
+
+def _invalidate_shared_service_rate_matrix():
+	"""
+	Bump the rate matrix version so every process reloads it.
+
+	A worker that read the old rows before the commit can still write its matrix after
+	this; it lands under the old version, which nobody reads any more.
+	"""
+	old_version = frappe.cache().get_value(SERVICE_RATE_MATRIX_VERSION_KEY)
+	frappe.cache().set_value(SERVICE_RATE_MATRIX_VERSION_KEY, frappe.generate_hash(length=10))
+	if old_version:
+		frappe.cache().delete_value(f"{SERVICE_RATE_MATRIX_CACHE_KEY}:{old_version}")
+	_process_cache.pop(frappe.local.site, None)
+	frappe.local.fabric_sense_service_rate_matrix_dirty = False
+
+
+def get_service_rate_matrix():
+	"""
+	Return the compiled Services rate matrix, cached in Redis and per process:
+
+	{
+		service: {
+			"uom": ...,
+			"contractors": [contractor, ...],
+			"rates": {contractor: rate},
+		},
+	}
+	"""
+	if getattr(frappe.local, "fabric_sense_service_rate_matrix_dirty", False):
+		# Services changed in this transaction, the cached matrix does not have it yet
+		return _build_service_rate_matrix()
+
+	version = frappe.cache().get_value(SERVICE_RATE_MATRIX_VERSION_KEY)
+	if not version:
+		version = frappe.generate_hash(length=10)
+		frappe.cache().set_value(SERVICE_RATE_MATRIX_VERSION_KEY, version)
+
+	cached = _process_cache.get(frappe.local.site)
+	if cached and cached[0] == version:
+		return cached[1]
+
+	cache_key = f"{SERVICE_RATE_MATRIX_CACHE_KEY}:{version}"
+	matrix = frappe.cache().get_value(cache_key)
+	if matrix is None:
+		matrix = _build_service_rate_matrix()
+		frappe.cache().set_value(cache_key, matrix, expires_in_sec=SERVICE_RATE_MATRIX_CACHE_TTL)
+	_process_cache[frappe.local.site] = (version, matrix)
+	return matrix
+
+
+def _build_service_rate_matrix():
+	matrix = {
+		s.name: {"uom": s.uom, "contractors": [], "rates": {}}
+		for s in frappe.db.sql(
+			"""
+			SELECT name, uom
+			FROM `tabServices`
+			""",
+			as_dict=True,
+		)
+	}
+
+	for row in frappe.db.sql(
+		"""
+		SELECT parent, contractor, rate
+		FROM `tabContractors List`
+		WHERE parenttype = 'Services'
+		ORDER BY parent, idx
+		""",
+		as_dict=True,
+	):
+		service = matrix.get(row.parent)
+		if not service or not row.contractor:
+			continue
+		service["contractors"].append(row.contractor)
+		# The first row wins, like the linear scan over the child table did
+		service["rates"].setdefault(row.contractor, flt(row.rate))
+
+	return matrix
+
+
+def get_service_rates(pairs):
+	"""
+	Batch lookup of contractor rates.
+
+	Args:
+		pairs (iterable): (service, contractor) tuples
+
+	Returns:
+		dict: (service, contractor) -> rate, or None when the service or contractor is unknown
+	"""
+	matrix = get_service_rate_matrix()
+	return {
+		(service, contractor): (matrix.get(service) or {}).get("rates", {}).get(contractor)
+		for service, contractor in pairs
+	}
@@ -1,9 +1,72 @@
 # Copyright (c) 2025, innogenio and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from fabric_sense.fabric_sense.doctype.services.services import (
+	SERVICE_RATE_MATRIX_CACHE_KEY,
+	SERVICE_RATE_MATRIX_VERSION_KEY,
+	get_service_rate_matrix,
+	get_service_rates,
+)
+
+
+def _shared_matrix():
+	version = frappe.cache().get_value(SERVICE_RATE_MATRIX_VERSION_KEY)
+	return frappe.cache().get_value(f"{SERVICE_RATE_MATRIX_CACHE_KEY}:{version}") or {}
+
 
 class TestServices(FrappeTestCase):
-	pass
+	def _make_service(self, rates):
+		service = frappe.new_doc("Services")
+		service.service_name = "Rate Matrix Test Service"
+		for contractor, rate in rates:
+			service.append("contractors", {"contractor": contractor, "rate": rate})
+		service.flags.ignore_links = True
+		service.insert(ignore_permissions=True)
+		return service
+
+	def test_rate_matrix_lists_contractors_and_rates(self):
+		service = self._make_service([("EMP-RATE-1", 100), ("EMP-RATE-2", 150), ("EMP-RATE-1", 999)])
+
+		entry = get_service_rate_matrix()[service.name]
+		self.assertEqual(entry["contractors"], ["EMP-RATE-1", "EMP-RATE-2", "EMP-RATE-1"])
+		# The first row of a contractor wins
+		self.assertEqual(entry["rates"], {"EMP-RATE-1": 100, "EMP-RATE-2": 150})
+
+		self.assertEqual(
+			get_service_rates([(service.name, "EMP-RATE-2"), (service.name, "EMP-UNKNOWN")]),
+			{(service.name, "EMP-RATE-2"): 150, (service.name, "EMP-UNKNOWN"): None},
+		)
+
+	def test_rate_change_is_visible_in_the_saving_transaction(self):
+		service = self._make_service([("EMP-RATE-1", 100)])
+		get_service_rate_matrix()
+
+		service.contractors[0].rate = 120
+		service.save(ignore_permissions=True)
+
+		self.assertEqual(get_service_rate_matrix()[service.name]["rates"]["EMP-RATE-1"], 120)
+
+	def test_shared_cache_is_invalidated_after_commit(self):
+		service = self._make_service([("EMP-RATE-1", 100)])
+
+		# Until commit the saved rates must not reach the shared cache
+		self.assertIn(service.name, get_service_rate_matrix())
+		self.assertNotIn(service.name, _shared_matrix())
+
+		frappe.db.after_commit.run()
+		self.assertIn(service.name, get_service_rate_matrix())
+		self.assertIn(service.name, _shared_matrix())
+
+	def test_stale_write_after_invalidation_is_not_read(self):
+		"""A matrix built before the commit but written after it lands on a dead key"""
+		get_service_rate_matrix()
+		stale_key = f"{SERVICE_RATE_MATRIX_CACHE_KEY}:{frappe.cache().get_value(SERVICE_RATE_MATRIX_VERSION_KEY)}"
+		service = self._make_service([("EMP-RATE-1", 100)])
+
+		frappe.db.after_commit.run()
+		frappe.cache().set_value(stale_key, {})
+
+		self.assertIn(service.name, get_service_rate_matrix())
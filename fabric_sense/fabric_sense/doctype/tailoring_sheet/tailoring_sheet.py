@@ -52,101 +52,54 @@ def get_available_measurement_sheets(
     Query function to get measurement sheets that are:
     1. Approved status
     2. Not already selected in other tailoring sheets (except current one)
-    """
-    current_tailoring_sheet = filters.get("current_tailoring_sheet", "")
-
-    # Get list of measurement sheets already used in other tailoring sheets
-    used_measurement_sheets = frappe.db.sql(
-        """
-		SELECT DISTINCT measurement_sheet
-		FROM `tabTailoring Sheet`
-		WHERE measurement_sheet IS NOT NULL
-		AND measurement_sheet != ''
-		AND name != %(current_tailoring_sheet)s
-		""",
-        {"current_tailoring_sheet": current_tailoring_sheet},
-        as_dict=False,
-    )
 
-    # Extract the measurement sheet names from the result
-    used_ms_list = (
-        [ms[0] for ms in used_measurement_sheets] if used_measurement_sheets else []
-    )
-
-    # Build the query to get available measurement sheets
-    conditions = ["status = 'Approved'"]
-    query_params = {}
+    The exclusion is a single NOT EXISTS anti-join on the indexed
+    `Tailoring Sheet.measurement_sheet` column, results are ranked by where the
+    search text matches and paginated with `start` / `page_len`.
+    """
+    current_tailoring_sheet = (filters or {}).get("current_tailoring_sheet", "")
 
-    if txt:
-        conditions.append("name LIKE %(txt)s")
-        query_params["txt"] = f"%{txt}%"
+    query_params = {
+        "current_tailoring_sheet": current_tailoring_sheet,
+        "txt": f"%{txt}%",
+        "_txt": txt.replace("%", "") if txt else "",
+        "start": start,
+        "page_len": page_len,
+    }
 
-    if used_ms_list:
-        # Exclude already used measurement sheets using named parameters
-        placeholders = ", ".join([f"%(ms_{i})s" for i in range(len(used_ms_list))])
-        conditions.append(f"name NOT IN ({placeholders})")
-        # Add each measurement sheet to query params
-        for i, ms in enumerate(used_ms_list):
-            query_params[f"ms_{i}"] = ms
+    search_condition = "AND ms.name LIKE %(txt)s" if txt else ""
 
-    query = f"""
-		SELECT name
-		FROM `tabMeasurement Sheet`
-		WHERE {' AND '.join(conditions)}
-		ORDER BY modified DESC
-	"""
+    return frappe.db.sql(
+        f"""
+		SELECT ms.name
+		FROM `tabMeasurement Sheet` ms
+		WHERE ms.status = 'Approved'
+		{search_condition}
+		AND NOT EXISTS (
+			SELECT 1
+			FROM `tabTailoring Sheet` ts
+			WHERE ts.measurement_sheet = ms.name
+			AND ts.name != %(current_tailoring_sheet)s
+		)
+		ORDER BY
+			IF(LOCATE(%(_txt)s, ms.name) > 0, LOCATE(%(_txt)s, ms.name), 99999),
+			ms.modified DESC
+		LIMIT %(page_len)s OFFSET %(start)s
+		""",
+        query_params,
+    )
 
-    return frappe.db.sql(query, query_params)
 
+# Item groups (and their children) excluded from Tailoring Sheet Material Requests
+TAILORING_SERVICE_ITEM_GROUPS = ("Stitching", "Labour")
 
-def is_service_item(item_code):
-    """
-    Check if an item should be excluded from Material Request.
-    Items are excluded if their parent item group is "Stitching" or "Labour".
-    
-    Args:
-        item_code (str): Item code to check
-    
-    Returns:
-        bool: True if item should be excluded (is a service item), False otherwise
-    """
-    try:
-        # Get item's item_group
-        item_group = frappe.db.get_value("Item", item_code, "item_group")
-        if not item_group:
-            return False
-        
-        # Check if item_group is "Stitching" or "Labour" (root level)
-        if item_group in ["Stitching", "Labour"]:
-            return True
-        
-        # Check if item_group starts with "Stitching/" or "Labour/" (child groups stored as paths)
-        if item_group.startswith("Stitching/") or item_group.startswith("Labour/"):
-            return True
-        
-        # Check parent_item_group if item_group is a child
-        # In ERPNext, hierarchical item groups can be stored as "Parent/Child"
-        # or we can check the parent_item_group field of the Item Group
-        try:
-            # Try to get Item Group by the full path first
-            if frappe.db.exists("Item Group", item_group):
-                item_group_doc = frappe.get_doc("Item Group", item_group)
-                if hasattr(item_group_doc, 'parent_item_group') and item_group_doc.parent_item_group:
-                    parent_group = item_group_doc.parent_item_group
-                    if parent_group in ["Stitching", "Labour"]:
-                        return True
-        except Exception:
-            # If getting Item Group fails, try to extract parent from path
-            # For paths like "Stitching/Curtain Stitching", check if first part is Stitching or Labour
-            if "/" in item_group:
-                parent_from_path = item_group.split("/")[0]
-                if parent_from_path in ["Stitching", "Labour"]:
-                    return True
-        
-        return False
-    except Exception:
-        # If there's any error checking, don't exclude the item
-        return False
+# (item field, quantity field, default UOM) of each material picked in a measurement row
+MEASUREMENT_MATERIAL_FIELDS = (
+    ("fabric_selected", "final_fabric_quantity", "Meter"),
+    ("lining", "final_lining_quantity", "Meter"),
+    ("lead_rope", "lead_rope_qty", "Meter"),
+    ("track_rod", "track_rod_qty", "Foot"),
+)
 
 
 @frappe.whitelist()
@@ -155,82 +108,50 @@ def get_remaining_quantities(tailoring_sheet):
     Calculate remaining quantities for each item in the Tailoring Sheet
     by subtracting quantities already requested in Material Requests.
     Service items (parent item group is "Stitching" or "Labour") are excluded.
+
+    Reads the measurement rows directly from the child table, the requested
+    quantities from the Material Fulfilment Ledger (plus draft requests) and
+    classifies service items in one batch.
     """
-    # Get the Tailoring Sheet document
-    ts_doc = frappe.get_doc("Tailoring Sheet", tailoring_sheet)
-    
+    from fabric_sense.fabric_sense.py.material_fulfilment import get_requested_quantities
+    from fabric_sense.fabric_sense.py.sales_order import get_service_items
+
     # Dictionary to store aggregated quantities by item
     item_quantities = {}
     
     # Aggregate quantities from measurement details
-    for row in ts_doc.measurement_details:
-        # Fabric Selected
-        if row.fabric_selected and row.final_fabric_quantity:
-            if row.fabric_selected not in item_quantities:
-                item_quantities[row.fabric_selected] = {
-                    "total_qty": 0,
-                    "uom": "Meter"  # Default UOM for fabric
-                }
-            item_quantities[row.fabric_selected]["total_qty"] += row.final_fabric_quantity
-        
-        # Lining Selected
-        if row.lining and row.final_lining_quantity:
-            if row.lining not in item_quantities:
-                item_quantities[row.lining] = {
-                    "total_qty": 0,
-                    "uom": "Meter"  # Default UOM for lining
-                }
-            item_quantities[row.lining]["total_qty"] += row.final_lining_quantity
-        
-        # Lead Rope Selected
-        if row.lead_rope and row.lead_rope_qty:
-            if row.lead_rope not in item_quantities:
-                item_quantities[row.lead_rope] = {
-                    "total_qty": 0,
-                    "uom": "Meter"  # Default UOM for lead rope
-                }
-            item_quantities[row.lead_rope]["total_qty"] += row.lead_rope_qty
-        
-        # Hardware (Track/Rod)
-        if row.track_rod and row.track_rod_qty:
-            if row.track_rod not in item_quantities:
-                item_quantities[row.track_rod] = {
-                    "total_qty": 0,
-                    "uom": "Foot"  # Default UOM for hardware
-                }
-            item_quantities[row.track_rod]["total_qty"] += row.track_rod_qty
-    
-    # Get quantities already requested in Material Requests
-    requested_quantities = {}
-    
-    # Query all Material Requests linked to this Tailoring Sheet
-    material_requests = frappe.get_all(
-        "Material Request",
+    measurement_rows = frappe.get_all(
+        "Tailoring Measurement Details",
         filters={
-            "custom_tailoring_sheet": tailoring_sheet,
-            "docstatus": ["!=", 2]  # Exclude cancelled documents
+            "parent": tailoring_sheet,
+            "parenttype": "Tailoring Sheet",
+            "parentfield": "measurement_details"
         },
-        fields=["name"]
+        fields=[field for fields in MEASUREMENT_MATERIAL_FIELDS for field in fields[:2]],
+        order_by="idx asc"
     )
+    for row in measurement_rows:
+        for item_field, qty_field, uom in MEASUREMENT_MATERIAL_FIELDS:
+            item_code = row.get(item_field)
+            qty = row.get(qty_field)
+            if item_code and qty:
+                if item_code not in item_quantities:
+                    item_quantities[item_code] = {
+                        "total_qty": 0,
+                        "uom": uom
+                    }
+                item_quantities[item_code]["total_qty"] += qty
     
-    # Get items from all Material Requests
-    for mr in material_requests:
-        mr_items = frappe.get_all(
-            "Material Request Item",
-            filters={"parent": mr.name},
-            fields=["item_code", "qty"]
-        )
-        
-        for item in mr_items:
-            if item.item_code not in requested_quantities:
-                requested_quantities[item.item_code] = 0
-            requested_quantities[item.item_code] += item.qty
+    # Get quantities already requested in non-cancelled Material Requests
+    requested_quantities = get_requested_quantities("Tailoring Sheet", tailoring_sheet)
     
+    service_items = get_service_items(item_quantities, TAILORING_SERVICE_ITEM_GROUPS)
+
     # Calculate remaining quantities, excluding service items
     result_items = []
     for item_code, data in item_quantities.items():
         # Skip service items (parent item group is "Stitching" or "Labour")
-        if is_service_item(item_code):
+        if item_code in service_items:
             continue
         
         total_qty = data["total_qty"]
@@ -248,77 +169,56 @@ def get_remaining_quantities(tailoring_sheet):
     return {"items": result_items}
 
 
+# Tailoring Sheets with more remaining items than this create their Material Requests in a background job
+MULTI_MATERIAL_REQUEST_SYNC_LIMIT = 100
+
+
 @frappe.whitelist()
 def create_multi_material_request(tailoring_sheet):
     """
     Create two Material Requests from Tailoring Sheet:
     - Purchase type: for items with 'Is On Order Item' checked
     - Material Issue type: for all other items
+
+    Both Material Requests are created in one transaction: if either fails, neither is kept.
+    Sheets with more than MULTI_MATERIAL_REQUEST_SYNC_LIMIT remaining items are handed to a
+    background job which reports progress and the result over realtime.
     
     Args:
         tailoring_sheet (str): Tailoring Sheet name
         
     Returns:
-        dict: Contains purchase_mr and issue_mr names
+        dict: Contains purchase_mr and issue_mr names (and queued=True for background runs)
     """
     try:
-        # Get the Tailoring Sheet document
-        ts_doc = frappe.get_doc("Tailoring Sheet", tailoring_sheet)
-        
         # Get remaining quantities (already excludes service items)
         remaining_data = get_remaining_quantities(tailoring_sheet)
-        
-        if not remaining_data or not remaining_data.get("items"):
+        remaining_items = [
+            item_data
+            for item_data in (remaining_data or {}).get("items") or []
+            if item_data["remaining_qty"] > 0
+        ]
+
+        if not remaining_items:
             return {
                 "purchase_mr": None,
                 "issue_mr": None
             }
-        
-        # Separate items based on 'Is On Order Item' field
-        purchase_items = []
-        issue_items = []
-        
-        for item_data in remaining_data["items"]:
-            # Only include items with remaining quantity > 0
-            if item_data["remaining_qty"] <= 0:
-                continue
-            
-            item_code = item_data["item_code"]
-            
-            # Check if item has 'Is On Order Item' checked
-            is_on_order = frappe.db.get_value("Item", item_code, "custom_is_onorder_item")
-            
-            if is_on_order:
-                purchase_items.append(item_data)
-            else:
-                issue_items.append(item_data)
-        
-        result = {
-            "purchase_mr": None,
-            "issue_mr": None
-        }
-        
-        # Create Purchase Material Request if there are on-order items
-        if purchase_items:
-            purchase_mr = create_material_request_from_items(
-                ts_doc, 
-                purchase_items, 
-                "Purchase"
-            )
-            if purchase_mr:
-                result["purchase_mr"] = purchase_mr.name
-        
-        # Create Material Issue Request for other items
-        if issue_items:
-            issue_mr = create_material_request_from_items(
-                ts_doc, 
-                issue_items, 
-                "Material Issue"
+
+        if len(remaining_items) > MULTI_MATERIAL_REQUEST_SYNC_LIMIT:
+            frappe.enqueue(
+                "fabric_sense.fabric_sense.doctype.tailoring_sheet.tailoring_sheet.create_multi_material_request_job",
+                queue="long",
+                timeout=1500,
+                job_id=f"multi_material_request::{tailoring_sheet}",
+                deduplicate=True,
+                enqueue_after_commit=True,
+                tailoring_sheet=tailoring_sheet,
             )
-            if issue_mr:
-                result["issue_mr"] = issue_mr.name
-        
-        return result
+            return {"purchase_mr": None, "issue_mr": None, "queued": True}
+
+        ts_doc = frappe.get_doc("Tailoring Sheet", tailoring_sheet)
+        return _create_multi_material_request(ts_doc, remaining_items)
         
     except Exception as e:
         frappe.log_error(
@@ -328,40 +228,139 @@ def create_multi_material_request(tailoring_sheet):
         frappe.throw(_("Error creating Material Requests: {0}").format(str(e)))
 
 
-def create_material_request_from_items(ts_doc, items, material_request_type):
+def create_multi_material_request_job(tailoring_sheet):
+    """Background job for large Tailoring Sheets, publishes the result to the requesting user."""
+    result = {"purchase_mr": None, "issue_mr": None}
+    error = None
+
+    try:
+        remaining_items = [
+            item_data
+            for item_data in get_remaining_quantities(tailoring_sheet)["items"]
+            if item_data["remaining_qty"] > 0
+        ]
+        ts_doc = frappe.get_doc("Tailoring Sheet", tailoring_sheet)
+        result = _create_multi_material_request(ts_doc, remaining_items, publish_progress=True)
+        frappe.db.commit()
+    except Exception as e:
+        frappe.db.rollback()
+        error = str(e)
+        frappe.log_error(
+            f"Error creating multi material request for {tailoring_sheet}: {error}\n{frappe.get_traceback()}",
+            "Multi Material Request Error"
+        )
+
+    frappe.publish_realtime(
+        "fabric_sense_multi_material_request",
+        {
+            "reference_doctype": "Tailoring Sheet",
+            "reference_name": tailoring_sheet,
+            "error": error,
+            **result,
+        },
+        user=frappe.session.user,
+    )
+
+
+def _create_multi_material_request(ts_doc, remaining_items, publish_progress=False):
+    """Split the remaining items and create both Material Requests without committing."""
+    from fabric_sense.fabric_sense.py.item_attributes import get_item_attributes
+
+    def progress(percent, description):
+        if publish_progress:
+            frappe.publish_progress(
+                percent,
+                title=_("Creating Material Requests"),
+                doctype="Tailoring Sheet",
+                docname=ts_doc.name,
+                description=description,
+            )
+
+    item_attributes = get_item_attributes(item_data["item_code"] for item_data in remaining_items)
+
+    # Separate items based on 'Is On Order Item' field
+    purchase_items = []
+    issue_items = []
+
+    for item_data in remaining_items:
+        if (item_attributes.get(item_data["item_code"]) or {}).get("custom_is_onorder_item"):
+            purchase_items.append(item_data)
+        else:
+            issue_items.append(item_data)
+
+    progress(10, _("Split {0} items").format(len(remaining_items)))
+
+    # Company and approval status are decided once, before either Material Request exists
+    company = get_material_request_company(ts_doc)
+    is_first_request = not frappe.db.exists(
+        "Material Request",
+        {"custom_tailoring_sheet": ts_doc.name, "docstatus": ["!=", 2]}
+    )
+
+    result = {
+        "purchase_mr": None,
+        "issue_mr": None
+    }
+
+    # Create Purchase Material Request if there are on-order items
+    if purchase_items:
+        result["purchase_mr"] = create_material_request_from_items(
+            ts_doc, purchase_items, "Purchase", company, is_first_request
+        ).name
+        progress(55, _("Created Purchase Material Request {0}").format(result["purchase_mr"]))
+
+    # Create Material Issue Request for other items
+    if issue_items:
+        result["issue_mr"] = create_material_request_from_items(
+            ts_doc, issue_items, "Material Issue", company, is_first_request
+        ).name
+        progress(100, _("Created Material Issue Request {0}").format(result["issue_mr"]))
+
+    return result
+
+
+def get_material_request_company(ts_doc):
+    """Company of the Tailoring Sheet's project, falling back to the default company."""
+    company = None
+    if ts_doc.project:
+        company = frappe.db.get_value("Project", ts_doc.project, "company")
+
+    # Get default company
+    return company or frappe.db.get_single_value("Global Defaults", "default_company")
+
+
+def create_material_request_from_items(
+    ts_doc, items, material_request_type, company=None, is_first_request=None
+):
     """
-    Create a Material Request from given items.
+    Create and submit a Material Request from given items.
+
+    Does not commit; the caller owns the transaction so that all Material Requests
+    of one run are kept or rolled back together.
     
     Args:
         ts_doc (Document): Tailoring Sheet document
         items (list): List of item dictionaries with item_code, remaining_qty, uom
         material_request_type (str): "Purchase" or "Material Issue"
+        company (str): Company, looked up from the project if omitted
+        is_first_request (bool): Whether this run is the sheet's first request, looked up if omitted
         
     Returns:
-        Document: Created Material Request document or None
+        Document: Created Material Request document or None if there are no items
     """
     if not items:
         return None
     
     try:
-        # Get company from project or use default
-        company = None
-        if ts_doc.project:
-            company = frappe.db.get_value("Project", ts_doc.project, "company")
-        
         if not company:
-            # Get default company
-            company = frappe.db.get_single_value("Global Defaults", "default_company")
-        
+            company = get_material_request_company(ts_doc)
+
         # Check if there are existing Material Requests for this Tailoring Sheet
-        existing_mrs = frappe.get_all(
-            "Material Request",
-            filters={
-                "custom_tailoring_sheet": ts_doc.name,
-                "docstatus": ["!=", 2]  # Exclude cancelled
-            },
-            fields=["name"]
-        )
+        if is_first_request is None:
+            is_first_request = not frappe.db.exists(
+                "Material Request",
+                {"custom_tailoring_sheet": ts_doc.name, "docstatus": ["!=", 2]}
+            )
         
         # Create Material Request
         mr_doc = frappe.new_doc("Material Request")
@@ -373,7 +372,7 @@ def create_material_request_from_items(ts_doc, items, material_request_type):
         
         # Set approval status: if no existing MRs, it's first request (Approved)
         # If there are existing MRs, it's additional request (Pending)
-        if not existing_mrs:
+        if is_first_request:
             mr_doc.custom_manager_approval_status = "Approved"
         # else:
         #     mr_doc.custom_manager_approval_status = "Pending"
@@ -392,8 +391,6 @@ def create_material_request_from_items(ts_doc, items, material_request_type):
         mr_doc.insert()
         mr_doc.submit()
         
-        frappe.db.commit()
-        
         return mr_doc
         
     except Exception as e:
@@ -401,4 +398,4 @@ def create_material_request_from_items(ts_doc, items, material_request_type):
             f"Error creating {material_request_type} Material Request: {str(e)}\n{frappe.get_traceback()}",
             f"Create {material_request_type} MR Error"
         )
-        return None
+        raise
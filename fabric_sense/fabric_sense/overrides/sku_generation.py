@@ -4,6 +4,12 @@ from frappe import _  # type: ignore
 from erpnext.stock.doctype.item.item import Item  # type: ignore
 import re
 
+from fabric_sense.fabric_sense.py.item_attributes import clear_item_attribute_cache
+from fabric_sense.fabric_sense.py.reorder_monitoring import (
+    clear_reorder_level_cache,
+    clear_reorder_level_cache_for_item,
+)
+
 
 class CustomItem(Item):
     def autoname(self):
@@ -104,6 +110,20 @@ class CustomItem(Item):
                     # Both fields are empty - clear the SKU (for service items)
                     self.custom_sku = None
 
+    def on_update(self):
+        super().on_update()
+        # Drop request-scoped attributes so later hooks in this request see the saved values
+        clear_item_attribute_cache(self.name)
+        clear_reorder_level_cache_for_item(self)
+
+    def on_trash(self):
+        super().on_trash()
+        clear_reorder_level_cache()
+
+    def after_rename(self, old_name, new_name, merge):
+        super().after_rename(old_name, new_name, merge)
+        clear_reorder_level_cache()
+
     def validate_without_reorder_qty_check(self):
         """Custom validation that skips reorder quantity validation"""
         # Call all parent validation methods except the reorder validation
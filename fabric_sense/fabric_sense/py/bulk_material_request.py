@@ -0,0 +1,309 @@
+import hashlib
+import json
+
+import frappe  # type: ignore
+from frappe.utils import flt, getdate, today  # type: ignore
+
+from fabric_sense.fabric_sense.py.sales_order import SERVICE_ITEM_GROUPS
+
+
+# Sales Orders processed between two commits of the bulk run
+BULK_MATERIAL_REQUEST_CHUNK_SIZE = 50
+
+
+def get_pending_sales_order_lines(sales_orders=None):
+    """
+    Find every undelivered Sales Order line whose item still has unrequested quantity.
+
+    One query: ordered and requested quantities are aggregated per Sales Order and item
+    in derived tables, service items (item group or parent group in SERVICE_ITEM_GROUPS)
+    are excluded in SQL, and only items with ordered > requested are returned.
+
+    Args:
+        sales_orders (list): Optional Sales Order names to restrict the scan to
+
+    Returns:
+        list: Sales Order Item rows with sales_order, company, item_code, qty,
+            requested_qty, ordered_qty, uom, warehouse, schedule_date and custom_is_onorder_item,
+            ordered by Sales Order and row index
+    """
+    conditions = ""
+    values = {"service_item_groups": SERVICE_ITEM_GROUPS}
+    if sales_orders is not None:
+        if not sales_orders:
+            return []
+        conditions = "AND so.name IN %(sales_orders)s"
+        values["sales_orders"] = tuple(sales_orders)
+
+    return frappe.db.sql(
+        f"""
+        SELECT
+            so.name AS sales_order,
+            so.company,
+            soi.name AS sales_order_item,
+            soi.item_code,
+            soi.qty,
+            COALESCE(NULLIF(soi.stock_uom, ''), soi.uom) AS uom,
+            soi.warehouse,
+            COALESCE(soi.delivery_date, so.delivery_date) AS schedule_date,
+            i.custom_is_onorder_item,
+            ordered.qty AS ordered_qty,
+            COALESCE(requested.qty, 0) AS requested_qty
+        FROM `tabSales Order Item` soi
+        INNER JOIN `tabSales Order` so ON so.name = soi.parent
+        INNER JOIN `tabItem` i ON i.name = soi.item_code
+        LEFT JOIN `tabItem Group` ig ON ig.name = i.item_group
+        INNER JOIN (
+            SELECT parent, item_code, SUM(qty) AS qty
+            FROM `tabSales Order Item`
+            WHERE parenttype = 'Sales Order'
+                AND docstatus = 1
+            GROUP BY parent, item_code
+        ) ordered ON ordered.parent = soi.parent AND ordered.item_code = soi.item_code
+        LEFT JOIN (
+            SELECT mr.custom_sales_order, mri.item_code, SUM(mri.qty) AS qty
+            FROM `tabMaterial Request Item` mri
+            INNER JOIN `tabMaterial Request` mr ON mri.parent = mr.name
+            WHERE mr.docstatus < 2
+                AND IFNULL(mr.custom_sales_order, '') != ''
+            GROUP BY mr.custom_sales_order, mri.item_code
+        ) requested ON requested.custom_sales_order = soi.parent
+            AND requested.item_code = soi.item_code
+        WHERE soi.parenttype = 'Sales Order'
+            AND so.docstatus = 1
+            AND so.status IN ('To Deliver and Bill', 'To Deliver')
+            AND so.per_delivered < 100
+            AND IFNULL(i.item_group, '') NOT IN %(service_item_groups)s
+            AND SUBSTRING_INDEX(IFNULL(i.item_group, ''), '/', 1) NOT IN %(service_item_groups)s
+            AND IFNULL(ig.parent_item_group, '') NOT IN %(service_item_groups)s
+            AND ordered.qty > COALESCE(requested.qty, 0)
+            {conditions}
+        ORDER BY so.name, soi.idx
+        """,
+        values,
+        as_dict=True,
+    )
+
+
+def build_material_request_plans(lines):
+    """
+    Turn pending Sales Order lines into Material Request plans.
+
+    Remaining quantity per item is allocated to the lines in row order. Lines are then
+    grouped per Sales Order and request type ("Purchase" for on-order items, otherwise
+    "Material Issue"), and ordered by warehouse and schedule date. Each line stays its own
+    row, so every row keeps its sales_order_item link.
+
+    Args:
+        lines (list): Rows from get_pending_sales_order_lines
+
+    Returns:
+        list: Plans with sales_order, company, material_request_type, idempotency_key and items
+    """
+    plans = {}
+    remaining = {}
+
+    for line in lines:
+        key = (line.sales_order, line.item_code)
+        if key not in remaining:
+            remaining[key] = flt(line.ordered_qty) - flt(line.requested_qty)
+
+        qty = min(flt(line.qty), remaining[key])
+        if qty <= 0:
+            continue
+        remaining[key] -= qty
+
+        material_request_type = "Purchase" if line.custom_is_onorder_item else "Material Issue"
+        plan = plans.setdefault(
+            (line.sales_order, material_request_type),
+            {
+                "sales_order": line.sales_order,
+                "company": line.company,
+                "material_request_type": material_request_type,
+                "requested_qty": {},
+                "items": [],
+            },
+        )
+        plan["requested_qty"][line.item_code] = flt(line.requested_qty)
+
+        # Schedule dates in the past are moved to today, Material Requests reject them
+        schedule_date = max(getdate(line.schedule_date or today()), getdate(today()))
+        plan["items"].append(
+            {
+                "item_code": line.item_code,
+                "qty": qty,
+                "uom": line.uom,
+                "warehouse": line.warehouse,
+                "schedule_date": schedule_date,
+                "sales_order": line.sales_order,
+                "sales_order_item": line.sales_order_item,
+            }
+        )
+
+    result = []
+    for plan in plans.values():
+        plan["items"].sort(key=lambda row: (row["warehouse"] or "", row["schedule_date"]))
+        plan["idempotency_key"] = get_idempotency_key(plan)
+        result.append(plan)
+
+    return result
+
+
+def get_idempotency_key(plan):
+    """
+    Key identifying one planned Material Request of a Sales Order.
+
+    It is derived from the Sales Order and, per item, the quantity already requested when
+    the plan was made. Any run that starts from the same requested state, whatever its
+    row split, warehouses or dates, yields the same key and is skipped; once the request
+    is in, the requested quantities (and the key of later plans) change.
+    """
+    items = sorted(plan["requested_qty"].items())
+    payload = json.dumps([plan["sales_order"], items])
+    return f"{plan['sales_order']}::{hashlib.sha1(payload.encode()).hexdigest()}"
+
+
+def create_material_request_from_plan(plan):
+    """
+    Insert and submit the Material Request for one plan, without committing.
+
+    Returns:
+        str: Material Request name, or None when a request with the same key already exists
+    """
+    if frappe.db.exists("Material Request", {"custom_idempotency_key": plan["idempotency_key"]}):
+        return None
+
+    mr_doc = frappe.new_doc("Material Request")
+    mr_doc.material_request_type = plan["material_request_type"]
+    mr_doc.transaction_date = today()
+    mr_doc.schedule_date = min(row["schedule_date"] for row in plan["items"])
+    mr_doc.company = plan["company"]
+    mr_doc.custom_sales_order = plan["sales_order"]
+    mr_doc.custom_idempotency_key = plan["idempotency_key"]
+
+    # Only Sales Orders with remaining items are planned, which create_multi_material_request
+    # treats as an approved request
+    mr_doc.custom_manager_approval_status = "Approved"
+
+    for row in plan["items"]:
+        mr_doc.append(
+            "items",
+            {
+                "item_code": row["item_code"],
+                "qty": row["qty"],
+                "uom": row["uom"],
+                "schedule_date": row["schedule_date"],
+                "warehouse": row["warehouse"],
+                "sales_order": row["sales_order"],
+                "sales_order_item": row["sales_order_item"],
+            },
+        )
+
+    mr_doc.insert()
+    mr_doc.submit()
+
+    return mr_doc.name
+
+
+def create_pending_material_requests(sales_orders=None, chunk_size=None):
+    """
+    Create the Purchase and Material Issue requests for all pending Sales Orders.
+
+    Runs from the scheduler and from the Sales Order list bulk action. Sales Orders are
+    processed in chunks with a commit after each chunk; a failing Sales Order is rolled
+    back to its savepoint and logged without affecting the others.
+
+    Args:
+        sales_orders (list): Optional Sales Order names, all pending Sales Orders if omitted
+        chunk_size (int): Sales Orders per commit, BULK_MATERIAL_REQUEST_CHUNK_SIZE by default
+
+    Returns:
+        dict: created (Material Request names), skipped (Sales Orders) and failed (Sales Orders)
+    """
+    chunk_size = chunk_size or BULK_MATERIAL_REQUEST_CHUNK_SIZE
+
+    plans_by_sales_order = {}
+    for plan in build_material_request_plans(get_pending_sales_order_lines(sales_orders)):
+        plans_by_sales_order.setdefault(plan["sales_order"], []).append(plan)
+
+    summary = {"created": [], "skipped": [], "failed": []}
+    pending = list(plans_by_sales_order)
+
+    for start in range(0, len(pending), chunk_size):
+        for sales_order in pending[start : start + chunk_size]:
+            frappe.db.savepoint("bulk_material_request")
+            try:
+                names = [
+                    name
+                    for name in (
+                        create_material_request_from_plan(plan)
+                        for plan in plans_by_sales_order[sales_order]
+                    )
+                    if name
+                ]
+            except frappe.DuplicateEntryError:
+                # Another run created the same request concurrently
+                frappe.db.rollback(save_point="bulk_material_request")
+                summary["skipped"].append(sales_order)
+                continue
+            except Exception as e:
+                frappe.db.rollback(save_point="bulk_material_request")
+                summary["failed"].append(sales_order)
+                frappe.log_error(
+                    f"Error creating Material Requests for {sales_order}: {e!s}\n{frappe.get_traceback()}",
+                    "Bulk Material Request Error",
+                )
+                continue
+
+            if names:
+                summary["created"].extend(names)
+            else:
+                summary["skipped"].append(sales_order)
+
+        frappe.db.commit()
+
+    return summary
+
+
+@frappe.whitelist()
+def create_material_requests_for_sales_orders(sales_orders):
+    """
+    Bulk action for the Sales Order list: queue Material Request creation for the selection.
+
+    Args:
+        sales_orders (str|list): Sales Order names (JSON list from the client)
+    """
+    if isinstance(sales_orders, str):
+        sales_orders = json.loads(sales_orders)
+
+    frappe.has_permission("Material Request", "create", throw=True)
+
+    frappe.enqueue(
+        "fabric_sense.fabric_sense.py.bulk_material_request.create_material_requests_job",
+        queue="long",
+        timeout=3600,
+        enqueue_after_commit=True,
+        sales_orders=list(sales_orders),
+    )
+    return {"queued": True}
+
+
+def create_material_requests_job(sales_orders=None):
+    """Background job of the bulk action, publishes the summary to the requesting user."""
+    summary = create_pending_material_requests(sales_orders)
+    frappe.publish_realtime(
+        "fabric_sense_bulk_material_request",
+        summary,
+        user=frappe.session.user,
+    )
+
+
+def create_material_requests_for_pending_sales_orders():
+    """Scheduled job: create Material Requests for every pending Sales Order."""
+    create_pending_material_requests()
+
+
+def clear_idempotency_key(doc, method=None):
+    """Free the key of a cancelled Material Request so the quantities can be requested again."""
+    if doc.get("custom_idempotency_key"):
+        doc.db_set("custom_idempotency_key", None, update_modified=False)
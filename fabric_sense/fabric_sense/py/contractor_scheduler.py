@@ -0,0 +1,256 @@
+import heapq
+from datetime import timedelta
+
+import frappe  # type: ignore
+from frappe import _  # type: ignore
+from frappe.utils import flt, getdate, today  # type: ignore
+
+from fabric_sense.fabric_sense.doctype.services.services import get_service_rate_matrix
+
+
+# Tasks a contractor can take on per day, unless the caller passes another capacity
+DEFAULT_DAILY_TASK_CAPACITY = 2
+
+# Longest span (in days) a single task is booked for
+MAX_TASK_SPAN_DAYS = 31
+
+# Task statuses that still need (or hold) a contractor
+OPEN_TASK_STATUSES = ("Open", "Working", "Pending Review", "Overdue")
+
+TASK_PRIORITY_ORDER = {"Urgent": 0, "High": 1, "Medium": 2, "Low": 3}
+
+# Assignments applied in the request; larger batches go to a background job
+APPLY_ASSIGNMENTS_SYNC_LIMIT = 50
+
+
+def schedule_tasks(tasks, capabilities, existing_load=None, daily_capacity=None):
+    """
+    Greedy contractor assignment.
+
+    Tasks are taken from a priority queue (priority, then expected start, then larger
+    quantity first). Each task books one unit of capacity on every day of its expected
+    span and goes to the capable contractor with the lowest load on those days, ties
+    broken by rate and name. Single-day tasks, the common case, pick from a lazily
+    updated heap per (service, day), so a few thousand tasks and a hundred contractors
+    schedule in milliseconds.
+
+    Args:
+        tasks (list): dicts with name, service, quantity, priority, start_date, end_date
+        capabilities (dict): service -> {contractor: rate}
+        existing_load (dict): (contractor, date) -> tasks already booked
+        daily_capacity (int): Tasks per contractor per day
+
+    Returns:
+        dict: assignments (list of task, contractor, service, start_date, end_date)
+            and unassigned (list of task, reason)
+    """
+    daily_capacity = int(daily_capacity or DEFAULT_DAILY_TASK_CAPACITY)
+    load = dict(existing_load or {})
+    day_heaps = {}
+
+    queue = []
+    for idx, task in enumerate(tasks):
+        start_date, end_date = _get_task_span(task)
+        heapq.heappush(
+            queue,
+            (
+                TASK_PRIORITY_ORDER.get(task.get("priority"), len(TASK_PRIORITY_ORDER)),
+                start_date,
+                -flt(task.get("quantity")),
+                idx,
+                start_date,
+                end_date,
+            ),
+        )
+
+    assignments = []
+    unassigned = []
+
+    while queue:
+        *_order, idx, start_date, end_date = heapq.heappop(queue)
+        task = tasks[idx]
+        rates = capabilities.get(task.get("service")) or {}
+
+        if not rates:
+            unassigned.append({"task": task["name"], "reason": _("No contractor offers this service")})
+            continue
+
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        if len(days) == 1:
+            contractor = _pick_from_day_heap(day_heaps, task["service"], days[0], rates, load, daily_capacity)
+        else:
+            contractor = _pick_by_scan(days, rates, load, daily_capacity)
+
+        if not contractor:
+            unassigned.append({"task": task["name"], "reason": _("All capable contractors are fully booked")})
+            continue
+
+        for day in days:
+            load[(contractor, day)] = load.get((contractor, day), 0) + 1
+
+        assignments.append(
+            {
+                "task": task["name"],
+                "contractor": contractor,
+                "service": task["service"],
+                "start_date": start_date,
+                "end_date": end_date,
+            }
+        )
+
+    return {"assignments": assignments, "unassigned": unassigned}
+
+
+def _get_task_span(task):
+    start_date = getdate(task.get("start_date") or task.get("end_date") or today())
+    end_date = getdate(task.get("end_date") or start_date)
+    if end_date < start_date:
+        end_date = start_date
+    return start_date, min(end_date, start_date + timedelta(days=MAX_TASK_SPAN_DAYS - 1))
+
+
+def _pick_from_day_heap(day_heaps, service, day, rates, load, daily_capacity):
+    """Pop the least loaded contractor for a service and day; stale entries are refreshed."""
+    heap = day_heaps.get((service, day))
+    if heap is None:
+        heap = [
+            (load.get((contractor, day), 0), flt(rate), contractor)
+            for contractor, rate in rates.items()
+        ]
+        heapq.heapify(heap)
+        day_heaps[(service, day)] = heap
+
+    while heap:
+        booked, rate, contractor = heapq.heappop(heap)
+        current = load.get((contractor, day), 0)
+        if current != booked:
+            # Booked through another service or a multi-day task since it was pushed
+            heapq.heappush(heap, (current, rate, contractor))
+            continue
+        if current >= daily_capacity:
+            # Least loaded contractor is full, so everyone left is full too
+            heapq.heappush(heap, (current, rate, contractor))
+            return None
+        heapq.heappush(heap, (current + 1, rate, contractor))
+        return contractor
+
+    return None
+
+
+def _pick_by_scan(days, rates, load, daily_capacity):
+    best = None
+    for contractor, rate in rates.items():
+        booked = [load.get((contractor, day), 0) for day in days]
+        if max(booked) >= daily_capacity:
+            continue
+        key = (sum(booked), flt(rate), contractor)
+        if best is None or key < best:
+            best = key
+    return best[2] if best else None
+
+
+def get_open_task_workload(project=None):
+    """
+    Load open Tasks in one query: the unassigned ones to schedule and the booked load
+    of tasks that already have a contractor.
+
+    Returns:
+        tuple: (tasks to schedule, existing_load)
+    """
+    filters = {"status": ["in", OPEN_TASK_STATUSES], "custom_service": ["is", "set"]}
+    if project:
+        filters["project"] = project
+
+    rows = frappe.get_all(
+        "Task",
+        filters=filters,
+        fields=[
+            "name",
+            "custom_service as service",
+            "custom_quantity as quantity",
+            "custom_assigned_contractor as contractor",
+            "priority",
+            "exp_start_date as start_date",
+            "exp_end_date as end_date",
+            "project",
+        ],
+        order_by="exp_start_date asc, name asc",
+    )
+
+    tasks = []
+    existing_load = {}
+    for row in rows:
+        if not row.contractor:
+            tasks.append(row)
+            continue
+        start_date, end_date = _get_task_span(row)
+        day = start_date
+        while day <= end_date:
+            existing_load[(row.contractor, day)] = existing_load.get((row.contractor, day), 0) + 1
+            day += timedelta(days=1)
+
+    return tasks, existing_load
+
+
+def get_contractor_capabilities():
+    """service -> {contractor: rate}, from the cached Services rate matrix."""
+    return {service: entry["rates"] for service, entry in get_service_rate_matrix().items()}
+
+
+@frappe.whitelist()
+def propose_contractor_assignments(project=None, daily_capacity=None):
+    """
+    Propose contractors for every unassigned open Task, without changing anything.
+
+    Args:
+        project (str): Optional project to restrict the proposal to
+        daily_capacity (int): Tasks per contractor per day, DEFAULT_DAILY_TASK_CAPACITY by default
+
+    Returns:
+        dict: assignments and unassigned, see schedule_tasks
+    """
+    tasks, existing_load = get_open_task_workload(project)
+    return schedule_tasks(tasks, get_contractor_capabilities(), existing_load, daily_capacity)
+
+
+@frappe.whitelist()
+def apply_contractor_assignments(assignments):
+    """
+    Write proposed assignments to the Tasks.
+
+    Each Task is saved normally, so service rates are prefilled and contractors notified.
+    More than APPLY_ASSIGNMENTS_SYNC_LIMIT assignments are applied in a background job.
+
+    Args:
+        assignments (str|list): dicts with task and contractor (JSON list from the client)
+    """
+    assignments = frappe.parse_json(assignments) if isinstance(assignments, str) else assignments
+    frappe.has_permission("Task", "write", throw=True)
+
+    if len(assignments) > APPLY_ASSIGNMENTS_SYNC_LIMIT:
+        frappe.enqueue(
+            "fabric_sense.fabric_sense.py.contractor_scheduler.apply_assignments",
+            queue="long",
+            timeout=3600,
+            enqueue_after_commit=True,
+            assignments=assignments,
+        )
+        return {"queued": True}
+
+    return {"updated": apply_assignments(assignments, commit=False)}
+
+
+def apply_assignments(assignments, commit=True):
+    """Assign contractors to Tasks that are still unassigned; returns the updated task names."""
+    updated = []
+    for row in assignments:
+        doc = frappe.get_doc("Task", row["task"])
+        if doc.custom_assigned_contractor:
+            # Assigned by hand since the proposal was made
+            continue
+        doc.custom_assigned_contractor = row["contractor"]
+        doc.save()
+        updated.append(doc.name)
+        if commit:
+            frappe.db.commit()
+    return updated
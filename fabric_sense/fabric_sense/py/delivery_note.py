@@ -1,4 +1,15 @@
 import frappe  # type: ignore
+from frappe.model.document import Document  # type: ignore
+from frappe.utils import now  # type: ignore
+
+from fabric_sense.fabric_sense.py.material_fulfilment import (
+    LEDGER_DOCTYPE,
+    get_ledger_quantities,
+)
+
+
+ADJUSTMENT_PLAN_CACHE_KEY = "fabric_sense:delivery_note_adjustment_plan:{0}"
+ADJUSTMENT_PLAN_CACHE_TTL = 3600
 
 
 def send_customer_delivery_notification(doc, method=None):
@@ -336,120 +347,34 @@ def adjust_stock_ledger_entries_for_delivery_note(doc, method=None):
     Adjust stock ledger entries during Delivery Note submission to exclude quantities
     already updated through Stock Entry (Material Issue).
 
-    This function doesn't modify the Delivery Note document but intercepts the stock
-    update process to prevent duplicate stock deductions.
+    The adjustment plan (cached by a preceding preview when still current) is recorded on
+    the Delivery Note for auditing. Its issued quantities are registered for this Delivery
+    Note in the current request context; the stock ledger hook (see
+    install_stock_ledger_hook) only adjusts entries whose voucher is this Delivery Note
+    and only while the registration is active. Other vouchers, and other requests running
+    in the same process, pass straight through.
 
     Args:
         doc (Document): Delivery Note document object
-        method (str): Event method name (e.g., 'on_submit')
+        method (str): Event method name (e.g., 'before_submit')
 
     Returns:
         None
     """
     try:
-        # Store original make_sl_entries method if not already stored
-        if not hasattr(frappe.local, "original_make_sl_entries"):
-            from erpnext.stock.stock_ledger import make_sl_entries
-
-            frappe.local.original_make_sl_entries = make_sl_entries
-
-        # Get issued quantities for this delivery note
-        issued_quantities = get_issued_quantities_for_delivery_note(doc)
-
-        if issued_quantities:
-            # Monkey patch the make_sl_entries function temporarily
-            def adjusted_make_sl_entries(
-                sl_entries, allow_negative_stock=None, via_landed_cost_voucher=False
-            ):
-                # Check if any entry is from a Delivery Note - if not, use original function
-                has_delivery_note_entries = any(
-                    entry.get("voucher_type") == "Delivery Note" for entry in sl_entries
-                )
+        install_stock_ledger_hook()
 
-                # If no Delivery Note entries, pass through to original function
-                if not has_delivery_note_entries:
-                    if hasattr(frappe.local, "original_make_sl_entries"):
-                        return frappe.local.original_make_sl_entries(
-                            sl_entries, allow_negative_stock, via_landed_cost_voucher
-                        )
-                    else:
-                        # Fallback to importing and calling directly
-                        from erpnext.stock.stock_ledger import (
-                            make_sl_entries as original_make_sl_entries,
-                        )
-
-                        return original_make_sl_entries(
-                            sl_entries, allow_negative_stock, via_landed_cost_voucher
-                        )
-
-                # Filter and adjust stock ledger entries for Delivery Notes
-                adjusted_entries = []
-                excluded_items = []
-
-                for entry in sl_entries:
-                    # Check if this entry is from our delivery note
-                    if (
-                        entry.get("voucher_type") == "Delivery Note"
-                        and entry.get("voucher_no") == doc.name
-                    ):
-
-                        item_code = entry.get("item_code")
-                        original_qty = abs(float(entry.get("actual_qty", 0)))
-                        issued_qty = issued_quantities.get(item_code, 0)
-
-                        if issued_qty > 0:
-                            # Calculate remaining quantity to update
-                            remaining_qty = max(0, original_qty - issued_qty)
-
-                            if remaining_qty > 0:
-                                # Update the entry with remaining quantity
-                                entry["actual_qty"] = (
-                                    -remaining_qty
-                                )  # Negative for outgoing
-                                adjusted_entries.append(entry)
-
-                                frappe.logger().info(
-                                    f"Adjusted stock entry for {item_code}: "
-                                    f"Original={original_qty}, Issued={issued_qty}, Remaining={remaining_qty}"
-                                )
-                            else:
-                                # Exclude this item completely
-                                excluded_items.append(
-                                    {
-                                        "item_code": item_code,
-                                        "original_qty": original_qty,
-                                        "issued_qty": issued_qty,
-                                    }
-                                )
-
-                                frappe.logger().info(
-                                    f"Excluded stock entry for {item_code}: "
-                                    f"Fully issued via Stock Entry (Original={original_qty}, Issued={issued_qty})"
-                                )
-                        else:
-                            # No issued quantity, include as is
-                            adjusted_entries.append(entry)
-                    else:
-                        # Not from our delivery note, include as is
-                        adjusted_entries.append(entry)
-
-                # Show notification if any adjustments were made
-                if excluded_items or len(adjusted_entries) != len(sl_entries):
-                    # show_stock_adjustment_notification(excluded_items, doc.name)
-                    print("excluded_items", excluded_items)
-
-                # Call original function with adjusted entries
-                return frappe.local.original_make_sl_entries(
-                    adjusted_entries, allow_negative_stock, via_landed_cost_voucher
-                )
-
-            # Temporarily replace the function
-            import erpnext.stock.stock_ledger
+        # Get issued quantities for this delivery note, reusing the preview's when current
+        plan = get_delivery_note_adjustment_plan(doc)
 
-            erpnext.stock.stock_ledger.make_sl_entries = adjusted_make_sl_entries
+        doc.custom_stock_adjustment_plan = (
+            frappe.as_json({"ledger_state": plan.ledger_state, "adjustments": plan.adjustments}, indent=1)
+            if plan.adjustments
+            else None
+        )
 
-            # Store reference to restore later
-            frappe.local.temp_adjusted_make_sl_entries = adjusted_make_sl_entries
+        if plan.issued_quantities:
+            push_stock_ledger_adjustment(doc.name, plan.issued_quantities)
 
     except Exception as e:
         frappe.log_error(
@@ -460,19 +385,14 @@ def adjust_stock_ledger_entries_for_delivery_note(doc, method=None):
 
 def restore_original_stock_ledger_function(doc, method=None):
     """
-    Restore the original make_sl_entries function after Delivery Note processing.
+    Drop the stock ledger adjustment registered for this Delivery Note.
+
+    The hook itself stays installed and is inert without a registration. If submission
+    fails before this runs, the registration dies with the request context.
     """
     try:
-        if hasattr(frappe.local, "original_make_sl_entries"):
-            import erpnext.stock.stock_ledger
-
-            erpnext.stock.stock_ledger.make_sl_entries = (
-                frappe.local.original_make_sl_entries
-            )
-
-            # Clean up temporary references
-            if hasattr(frappe.local, "temp_adjusted_make_sl_entries"):
-                delattr(frappe.local, "temp_adjusted_make_sl_entries")
+        pop_stock_ledger_adjustment(doc.name)
+        frappe.cache().delete_value(ADJUSTMENT_PLAN_CACHE_KEY.format(doc.name))
 
     except Exception as e:
         frappe.log_error(
@@ -481,158 +401,304 @@ def restore_original_stock_ledger_function(doc, method=None):
         )
 
 
-def get_issued_quantities_for_delivery_note(doc):
+def push_stock_ledger_adjustment(delivery_note, issued_quantities):
     """
-    Get issued quantities for all items in the Delivery Note.
+    Register issued quantities for a Delivery Note in the current request context.
 
-    Returns:
-        dict: Dictionary mapping item_code to issued quantity
+    Registrations nest: pushing the same Delivery Note again shadows the previous
+    quantities until the matching pop.
     """
-    issued_quantities = {}
+    _get_stock_ledger_adjustments().setdefault(delivery_note, []).append(issued_quantities)
 
-    try:
-        for item in doc.items:
-            if not item.against_sales_order:
-                continue
-
-            # Get the Sales Order to find linked Measurement Sheet
-            try:
-                sales_order = frappe.get_doc("Sales Order", item.against_sales_order)
-            except frappe.DoesNotExistError:
-                continue
-
-            if not sales_order.get("measurement_sheet"):
-                continue
-
-            # Find Tailoring Sheet linked to this Measurement Sheet
-            tailoring_sheets = frappe.get_all(
-                "Tailoring Sheet",
-                filters={"measurement_sheet": sales_order.measurement_sheet},
-                fields=["name"],
-            )
 
-            if not tailoring_sheets:
-                continue
+def pop_stock_ledger_adjustment(delivery_note):
+    """Remove the innermost registration of a Delivery Note, if any."""
+    adjustments = _get_stock_ledger_adjustments()
+    stack = adjustments.get(delivery_note)
+    if stack:
+        stack.pop()
+    if not stack:
+        adjustments.pop(delivery_note, None)
 
-            # For each Tailoring Sheet, check issued quantities
-            total_issued_qty = 0
 
-            for ts in tailoring_sheets:
-                issued_qty = get_issued_quantity_for_item(ts.name, item.item_code)
-                total_issued_qty += issued_qty
+def _get_stock_ledger_adjustments():
+    # frappe.local is context-local (per request, thread and greenlet) and released
+    # at the end of every request
+    if getattr(frappe.local, "fabric_sense_stock_ledger_adjustments", None) is None:
+        frappe.local.fabric_sense_stock_ledger_adjustments = {}
+    return frappe.local.fabric_sense_stock_ledger_adjustments
 
-            if total_issued_qty > 0:
-                issued_quantities[item.item_code] = total_issued_qty
 
-    except Exception as e:
-        frappe.log_error(
-            message=f"Error getting issued quantities for Delivery Note: {str(e)}",
-            title="Get Issued Quantities Error",
-        )
+def install_stock_ledger_hook():
+    """
+    Wrap erpnext.stock.stock_ledger.make_sl_entries once per process.
 
-    return issued_quantities
+    The wrapper only changes entries of Delivery Notes registered in the calling
+    context, so installing it is safe for every other voucher and worker.
+    """
+    import erpnext.stock.stock_ledger
 
+    current = erpnext.stock.stock_ledger.make_sl_entries
+    if getattr(current, "_fabric_sense_adjusting", False):
+        return
 
-def show_stock_adjustment_notification(excluded_items, delivery_note_name):
+    erpnext.stock.stock_ledger.make_sl_entries = make_adjusting_make_sl_entries(current)
+
+
+def make_adjusting_make_sl_entries(original_make_sl_entries):
+    """Build the make_sl_entries wrapper around the given original function."""
+
+    def adjusted_make_sl_entries(sl_entries, *args, **kwargs):
+        adjustments = getattr(frappe.local, "fabric_sense_stock_ledger_adjustments", None)
+        if adjustments:
+            sl_entries = apply_stock_ledger_adjustments(sl_entries, adjustments)
+        return original_make_sl_entries(sl_entries, *args, **kwargs)
+
+    adjusted_make_sl_entries._fabric_sense_adjusting = True
+    adjusted_make_sl_entries._fabric_sense_original = original_make_sl_entries
+    return adjusted_make_sl_entries
+
+
+def apply_stock_ledger_adjustments(sl_entries, adjustments):
     """
-    Show notification about stock adjustments made.
+    Reduce the outgoing quantity of registered Delivery Note entries by what was
+    already issued, dropping entries that were fully issued.
+
+    Args:
+        sl_entries (list): Stock ledger entry dicts passed to make_sl_entries
+        adjustments (dict): Delivery Note name -> stack of {item_code: issued_qty}
+
+    Returns:
+        list: Adjusted stock ledger entries
     """
-    if excluded_items:
-        excluded_lines = []
-        for item in excluded_items:
-            excluded_lines.append(
-                f"• {item['item_code']}: Stock update excluded (already issued {item['issued_qty']} qty via Stock Entry)"
+    adjusted_entries = []
+    excluded_items = []
+
+    for entry in sl_entries:
+        stack = (
+            adjustments.get(entry.get("voucher_no"))
+            if entry.get("voucher_type") == "Delivery Note"
+            else None
+        )
+        if not stack:
+            # Not from a registered delivery note, include as is
+            adjusted_entries.append(entry)
+            continue
+
+        item_code = entry.get("item_code")
+        original_qty = abs(float(entry.get("actual_qty", 0)))
+        issued_qty = stack[-1].get(item_code, 0)
+
+        if issued_qty <= 0:
+            # No issued quantity, include as is
+            adjusted_entries.append(entry)
+            continue
+
+        # Calculate remaining quantity to update
+        remaining_qty = max(0, original_qty - issued_qty)
+
+        if remaining_qty > 0:
+            # Update the entry with remaining quantity
+            entry["actual_qty"] = -remaining_qty  # Negative for outgoing
+            adjusted_entries.append(entry)
+
+            frappe.logger().info(
+                f"Adjusted stock entry for {item_code}: "
+                f"Original={original_qty}, Issued={issued_qty}, Remaining={remaining_qty}"
+            )
+        else:
+            # Exclude this item completely
+            excluded_items.append(
+                {
+                    "item_code": item_code,
+                    "original_qty": original_qty,
+                    "issued_qty": issued_qty,
+                }
             )
 
-        frappe.msgprint(
-            msg=f"<b>Stock updates automatically adjusted:</b><br><br>"
-            + "<br>".join(excluded_lines)
-            + "<br><br><i>Items already issued through Stock Entry are excluded from stock updates while preserving Delivery Note records.</i>",
-            title="Stock Updates Adjusted",
-            indicator="blue",
-        )
+            frappe.logger().info(
+                f"Excluded stock entry for {item_code}: "
+                f"Fully issued via Stock Entry (Original={original_qty}, Issued={issued_qty})"
+            )
+
+    return adjusted_entries
 
 
-def get_issued_quantity_for_item(tailoring_sheet, item_code):
+def get_delivery_note_adjustment_plan(doc):
     """
-    Get the total quantity already issued for an item from Stock Entries
-    linked to the given Tailoring Sheet.
+    Issued quantities and resulting stock adjustments of a Delivery Note.
+
+    The issued quantities are cached per Delivery Note, so the preview and the submit a
+    moment later compute them once. A cached plan is reused while the Delivery Note's
+    modified timestamp, its (Sales Order, item) rows and the issued state of the Material
+    Fulfilment Ledger are unchanged; checking the latter is a single aggregate query.
 
     Args:
-        tailoring_sheet (str): Tailoring Sheet name
-        item_code (str): Item code to check
+        doc (Document|dict): Delivery Note, saved or as sent by the form
 
     Returns:
-        float: Total issued quantity for the item
+        frappe._dict: ledger_state, issued_quantities (item_code -> qty) and adjustments
+            (one dict per adjusted row, see preview_delivery_note_adjustments)
     """
-    try:
-        total_issued = 0.0
+    items = doc.get("items") or []
+    pairs = sorted(
+        {
+            (item.get("against_sales_order"), item.get("item_code"))
+            for item in items
+            if item.get("against_sales_order") and item.get("item_code")
+        }
+    )
+    ledger_state = get_issued_ledger_state({sales_order for sales_order, _item in pairs})
+
+    cache_key = signature = None
+    if doc.get("name") and not doc.get("__islocal"):
+        # On submit the timestamp is already bumped, the saved one is what the preview saw
+        # (the form sends a plain dict, which has no saved state)
+        previous = doc.get_doc_before_save() if isinstance(doc, Document) else None
+        cache_key = ADJUSTMENT_PLAN_CACHE_KEY.format(doc.get("name"))
+        signature = (str((previous or doc).get("modified")), pairs, ledger_state)
+
+    cached = frappe.cache().get_value(cache_key) if cache_key else None
+    if cached and cached.get("signature") == signature:
+        issued_by_order = cached["issued_by_order"]
+    else:
+        issued_by_order = get_issued_quantities_by_sales_order(items)
+        if cache_key:
+            frappe.cache().set_value(
+                cache_key,
+                {"signature": signature, "issued_by_order": issued_by_order},
+                expires_in_sec=ADJUSTMENT_PLAN_CACHE_TTL,
+            )
 
-        # Method 1: Direct link via custom_tailoring_sheet field
-        stock_entries_direct = frappe.get_all(
-            "Stock Entry",
-            filters={
-                "custom_tailoring_sheet": tailoring_sheet,
-                "stock_entry_type": "Material Issue",
-                "docstatus": 1,  # Submitted only
-            },
-            fields=["name"],
+    plan = frappe._dict(ledger_state=ledger_state, issued_quantities={}, adjustments=[])
+    for item in items:
+        total_issued_qty = issued_by_order.get(
+            (item.get("against_sales_order"), item.get("item_code")), 0
         )
+        if total_issued_qty <= 0:
+            continue
+
+        original_qty = float(item.get("qty") or 0)
+        remaining_qty = max(0, original_qty - total_issued_qty)
+
+        plan.issued_quantities[item.get("item_code")] = total_issued_qty
+        plan.adjustments.append(
+            {
+                "item_code": item.get("item_code"),
+                "original_qty": original_qty,
+                "issued_qty": total_issued_qty,
+                "remaining_qty": remaining_qty,
+                "stock_update_qty": remaining_qty,  # This is what will actually update stock
+            }
+        )
+
+    return plan
 
-        for se in stock_entries_direct:
-            se_items = frappe.get_all(
-                "Stock Entry Detail",
-                filters={"parent": se.name, "item_code": item_code},
-                fields=["qty"],
+
+def get_issued_ledger_state(sales_orders):
+    """
+    Fingerprint of the Material Fulfilment Ledger rows the issued quantities of the given
+    Sales Orders are read from (those of their Tailoring Sheets, see
+    get_issued_quantities_by_sales_order); it changes whenever a Material Issue of
+    one of them is submitted or cancelled.
+    """
+    if not sales_orders:
+        return None
+
+    count, issued_qty, modified = frappe.db.sql(
+        f"""
+        SELECT COUNT(*), COALESCE(SUM(l.issued_qty), 0), MAX(l.modified)
+        FROM `tab{LEDGER_DOCTYPE}` l
+        WHERE l.source_doctype = 'Tailoring Sheet'
+            AND l.source_name IN (
+                SELECT ts.name
+                FROM `tabTailoring Sheet` ts
+                INNER JOIN `tabSales Order` so ON so.measurement_sheet = ts.measurement_sheet
+                WHERE so.name IN %(sales_orders)s
             )
+        """,
+        {"sales_orders": tuple(sales_orders)},
+    )[0]
+    return f"{count}:{float(issued_qty or 0)}:{modified}"
 
-            for se_item in se_items:
-                total_issued += float(se_item.qty or 0)
 
-        # Method 2: Link via Material Request reference
-        # Get Material Requests linked to this Tailoring Sheet
-        material_requests = frappe.get_all(
-            "Material Request",
-            filters={
-                "custom_tailoring_sheet": tailoring_sheet,
-                "material_request_type": "Material Issue",
-                "docstatus": 1,  # Submitted only
-            },
-            fields=["name"],
+def get_issued_quantities_by_sales_order(items):
+    """
+    Quantities already issued through Stock Entry for Delivery Note rows.
+
+    Sales Order -> Measurement Sheet -> Tailoring Sheets are resolved once per distinct
+    order and the issued quantities of all (tailoring sheet, item) pairs are read from
+    the Material Fulfilment Ledger at once, so the cost does not grow with the number
+    of rows.
+
+    Args:
+        items (list): Delivery Note rows (documents or dicts) with item_code and against_sales_order
+
+    Returns:
+        dict: (sales_order, item_code) -> issued quantity summed over the order's Tailoring Sheets
+    """
+    pairs = {
+        (item.get("against_sales_order"), item.get("item_code"))
+        for item in items
+        if item.get("against_sales_order") and item.get("item_code")
+    }
+    if not pairs:
+        return {}
+
+    measurement_sheets = dict(
+        frappe.get_all(
+            "Sales Order",
+            filters={"name": ["in", list({sales_order for sales_order, _item in pairs})]},
+            fields=["name", "measurement_sheet"],
+            as_list=True,
         )
+    )
 
-        if material_requests:
-            mr_names = [mr.name for mr in material_requests]
-
-            # Find Stock Entries that reference these Material Requests
-            stock_entries_mr = frappe.get_all(
-                "Stock Entry",
-                filters={
-                    "material_request": ["in", mr_names],
-                    "stock_entry_type": "Material Issue",
-                    "docstatus": 1,  # Submitted only
-                },
-                fields=["name"],
-            )
+    tailoring_sheets = {}
+    if any(measurement_sheets.values()):
+        for ts in frappe.get_all(
+            "Tailoring Sheet",
+            filters={"measurement_sheet": ["in", list(set(filter(None, measurement_sheets.values())))]},
+            fields=["name", "measurement_sheet"],
+        ):
+            tailoring_sheets.setdefault(ts.measurement_sheet, []).append(ts.name)
+
+    if not tailoring_sheets:
+        return {}
+
+    issued = get_ledger_quantities(
+        "Tailoring Sheet",
+        [name for names in tailoring_sheets.values() for name in names],
+        "issued_qty",
+        {item_code for _sales_order, item_code in pairs},
+    )
 
-            for se in stock_entries_mr:
-                se_items = frappe.get_all(
-                    "Stock Entry Detail",
-                    filters={"parent": se.name, "item_code": item_code},
-                    fields=["qty"],
-                )
+    result = {}
+    for sales_order, item_code in pairs:
+        sheets = tailoring_sheets.get(measurement_sheets.get(sales_order)) or []
+        result[(sales_order, item_code)] = sum(issued.get((ts, item_code), 0.0) for ts in sheets)
 
-                for se_item in se_items:
-                    total_issued += float(se_item.qty or 0)
+    return result
 
-        return total_issued
 
-    except Exception as e:
-        frappe.log_error(
-            message=f"Error getting issued quantity for item {item_code} in tailoring sheet {tailoring_sheet}: {str(e)}",
-            title="Get Issued Quantity Error",
+def show_stock_adjustment_notification(excluded_items, delivery_note_name):
+    """
+    Show notification about stock adjustments made.
+    """
+    if excluded_items:
+        excluded_lines = []
+        for item in excluded_items:
+            excluded_lines.append(
+                f"• {item['item_code']}: Stock update excluded (already issued {item['issued_qty']} qty via Stock Entry)"
+            )
+
+        frappe.msgprint(
+            msg=f"<b>Stock updates automatically adjusted:</b><br><br>"
+            + "<br>".join(excluded_lines)
+            + "<br><br><i>Items already issued through Stock Entry are excluded from stock updates while preserving Delivery Note records.</i>",
+            title="Stock Updates Adjusted",
+            indicator="blue",
         )
-        return 0.0
 
 
 @frappe.whitelist()
@@ -641,7 +707,8 @@ def preview_delivery_note_adjustments(delivery_note):
     Preview stock update adjustments that will be made during Delivery Note submission.
 
     This shows which items will have their stock updates excluded or adjusted
-    without modifying the Delivery Note document itself.
+    without modifying the Delivery Note document itself. The computed plan is cached
+    for the submit that follows (see get_delivery_note_adjustment_plan).
 
     Args:
         delivery_note (dict): Delivery Note document data
@@ -650,61 +717,15 @@ def preview_delivery_note_adjustments(delivery_note):
         list: List of adjustment dictionaries for preview
     """
     try:
-        adjustments = []
-
         # Convert to document object if it's a dict
+        if isinstance(delivery_note, str):
+            delivery_note = frappe.parse_json(delivery_note)
         if isinstance(delivery_note, dict):
             doc = frappe._dict(delivery_note)
         else:
             doc = delivery_note
 
-        # Process each item in the Delivery Note
-        for item in doc.get("items", []):
-            if not item.get("against_sales_order"):
-                continue
-
-            # Get the Sales Order to find linked Measurement Sheet
-            try:
-                sales_order = frappe.get_doc("Sales Order", item.against_sales_order)
-            except frappe.DoesNotExistError:
-                continue
-
-            if not sales_order.get("measurement_sheet"):
-                continue
-
-            # Find Tailoring Sheet linked to this Measurement Sheet
-            tailoring_sheets = frappe.get_all(
-                "Tailoring Sheet",
-                filters={"measurement_sheet": sales_order.measurement_sheet},
-                fields=["name"],
-            )
-
-            if not tailoring_sheets:
-                continue
-
-            # For each Tailoring Sheet, check issued quantities
-            total_issued_qty = 0
-
-            for ts in tailoring_sheets:
-                issued_qty = get_issued_quantity_for_item(ts.name, item.item_code)
-                total_issued_qty += issued_qty
-
-            # If stock has been issued for this item, add to adjustments
-            if total_issued_qty > 0:
-                original_qty = float(item.qty or 0)
-                remaining_qty = max(0, original_qty - total_issued_qty)
-
-                adjustments.append(
-                    {
-                        "item_code": item.item_code,
-                        "original_qty": original_qty,
-                        "issued_qty": total_issued_qty,
-                        "remaining_qty": remaining_qty,
-                        "stock_update_qty": remaining_qty,  # This is what will actually update stock
-                    }
-                )
-
-        return adjustments
+        return get_delivery_note_adjustment_plan(doc).adjustments
 
     except Exception as e:
         frappe.log_error(
@@ -731,77 +752,66 @@ def update_additional_material_request_status(doc, method=None):
     """
     try:
         # Get unique sales orders from delivery note items
-        sales_orders = set()
-        if doc.items:
-            for item in doc.items:
-                if item.against_sales_order:
-                    sales_orders.add(item.against_sales_order)
+        sales_orders = {item.against_sales_order for item in doc.items if item.against_sales_order}
 
         if not sales_orders:
             frappe.logger().info(f"No sales orders found in Delivery Note {doc.name}")
             return
 
-        # Fetch material requests for each sales order where custom_is_additional = 1
-        for sales_order in sales_orders:
-            material_requests = frappe.get_all(
-                "Material Request",
-                filters={
-                    "custom_sales_order": sales_order,
-                    "custom_is_additional": 0,
-                    "docstatus": 1,  # Only submitted material requests
-                },
-                fields=["name", "status"],
-            )
+        # Submitted, non-additional material requests of all those sales orders at once
+        material_requests = frappe.get_all(
+            "Material Request",
+            filters={
+                "custom_sales_order": ["in", list(sales_orders)],
+                "custom_is_additional": 0,
+                "docstatus": 1,  # Only submitted material requests
+            },
+            pluck="name",
+        )
 
-            if not material_requests:
-                frappe.logger().info(
-                    f"No additional material requests found for Sales Order {sales_order}"
-                )
-                continue
-
-            # Update status to 'Issued' for each material request
-            for mr in material_requests:
-                try:
-                    # Get the material request document
-                    mr_doc = frappe.get_doc("Material Request", mr.name)
-
-                    # Update the status field and per_ordered to trigger 'Issued' status
-                    mr_doc.status = "Issued"
-                    mr_doc.per_ordered = 100.0
-                    mr_doc.per_received = 100.0
-
-                    # Use db_set to update multiple fields and trigger list view update
-                    mr_doc.db_set(
-                        {
-                            "status": "Issued",
-                            "per_ordered": 100.0,
-                            "per_received": 100.0,
-                        }
-                    )
+        if not material_requests:
+            frappe.logger().info(
+                f"No additional material requests found for Sales Orders {', '.join(sorted(sales_orders))}"
+            )
+            return
 
-                    # Notify update to refresh list view
-                    mr_doc.notify_update()
+        # One set-based update of status and per_ordered/per_received to 'Issued'
+        frappe.db.sql(
+            """
+            UPDATE `tabMaterial Request`
+            SET status = 'Issued',
+                per_ordered = 100,
+                per_received = 100,
+                modified = %(modified)s,
+                modified_by = %(user)s
+            WHERE name IN %(names)s
+            """,
+            {
+                "names": tuple(material_requests),
+                "modified": now(),
+                "user": frappe.session.user,
+            },
+        )
 
-                    frappe.logger().info(
-                        f"Updated Material Request {mr.name} status to 'Issued' for Sales Order {sales_order}"
-                    )
+        # Refresh list views once the transaction commits; the events go out in one flush
+        for name in material_requests:
+            frappe.publish_realtime(
+                "list_update",
+                {"doctype": "Material Request", "name": name, "user": frappe.session.user},
+                doctype="Material Request",
+                after_commit=True,
+            )
 
-                except Exception as e:
-                    frappe.log_error(
-                        message=f"Failed to update Material Request {mr.name}: {str(e)}\n{frappe.get_traceback()}",
-                        title=f"Material Request Status Update Failed: {mr.name}",
-                    )
-                    frappe.logger().error(
-                        f"Failed to update Material Request {mr.name}: {str(e)}"
-                    )
+        frappe.logger().info(
+            f"Updated {len(material_requests)} Material Request(s) to 'Issued' for Delivery Note {doc.name}"
+        )
 
-            # Show success message to user
-            if material_requests:
-                frappe.msgprint(
-                    msg=f"✅ Material request(s) status updated",
-                    title="Material Requests Updated",
-                    indicator="green",
-                )
+        # Show success message to user
+        frappe.msgprint(
+            msg=f"✅ Material request(s) status updated",
+            title="Material Requests Updated",
+            indicator="green",
+        )
 
     except Exception as e:
         # Log error but don't block delivery note submission
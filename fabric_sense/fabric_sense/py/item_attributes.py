@@ -0,0 +1,63 @@
+import frappe  # type: ignore
+
+
+# Item fields read by the Fabric Sense Sales Order / Material Request logic
+ITEM_ATTRIBUTE_FIELDS = (
+    "item_name",
+    "item_group",
+    "stock_uom",
+    "custom_mbq",
+    "custom_billing_multiples",
+    "custom_is_onorder_item",
+)
+
+
+def get_item_attributes(item_codes):
+    """
+    Return Item attributes for the given item codes, loading all uncached items in one query.
+
+    Results are kept on `frappe.local` for the rest of the request (or background job),
+    so every hook that runs during the same save shares a single round trip.
+
+    Args:
+        item_codes (iterable): Item codes, duplicates and empty values are ignored
+
+    Returns:
+        dict: item_code -> frappe._dict of ITEM_ATTRIBUTE_FIELDS (None for unknown items)
+    """
+    cache = _get_request_cache()
+    item_codes = [code for code in dict.fromkeys(item_codes or []) if code]
+
+    missing = [code for code in item_codes if code not in cache]
+    if missing:
+        rows = frappe.get_all(
+            "Item",
+            filters={"name": ["in", missing]},
+            fields=["name", *ITEM_ATTRIBUTE_FIELDS],
+        )
+        for row in rows:
+            cache[row.name] = row
+        for code in missing:
+            cache.setdefault(code, None)
+
+    return {code: cache.get(code) for code in item_codes}
+
+
+def get_item_attributes_for_doc(doc, table_field="items"):
+    """Shortcut for get_item_attributes over the item codes of a child table."""
+    return get_item_attributes(row.item_code for row in doc.get(table_field) or [])
+
+
+def clear_item_attribute_cache(item_code=None):
+    """Forget cached attributes for one item, or for all items when no code is given."""
+    cache = _get_request_cache()
+    if item_code:
+        cache.pop(item_code, None)
+    else:
+        cache.clear()
+
+
+def _get_request_cache():
+    if getattr(frappe.local, "fabric_sense_item_attributes", None) is None:
+        frappe.local.fabric_sense_item_attributes = {}
+    return frappe.local.fabric_sense_item_attributes
@@ -0,0 +1,309 @@
+import hashlib
+
+import frappe  # type: ignore
+from frappe.utils import flt, now  # type: ignore
+
+
+LEDGER_DOCTYPE = "Material Fulfilment Ledger"
+QTY_FIELDS = ("requested_qty", "issued_qty", "delivered_qty")
+
+# Material Request field linking it to each source doctype
+SOURCE_LINK_FIELDS = {
+    "Sales Order": "custom_sales_order",
+    "Tailoring Sheet": "custom_tailoring_sheet",
+}
+
+
+def get_fulfilment_ledger(source_doctype, source_name, item_codes=None):
+    """
+    Read requested, issued and delivered quantities for a source document.
+
+    Args:
+        source_doctype (str): "Sales Order" or "Tailoring Sheet"
+        source_name (str): Source document name
+        item_codes (list): Optional item codes to restrict the lookup to
+
+    Returns:
+        dict: item_code -> frappe._dict(requested_qty, issued_qty, delivered_qty)
+    """
+    filters = {"source_doctype": source_doctype, "source_name": source_name}
+    if item_codes is not None:
+        if not item_codes:
+            return {}
+        filters["item_code"] = ["in", list(item_codes)]
+
+    return {
+        row.item_code: row
+        for row in frappe.get_all(
+            LEDGER_DOCTYPE, filters=filters, fields=["item_code", *QTY_FIELDS]
+        )
+    }
+
+
+def get_ledger_quantities(source_doctype, source_names, field, item_codes=None):
+    """
+    Read one ledger quantity for several source documents at once.
+
+    Args:
+        source_doctype (str): "Sales Order" or "Tailoring Sheet"
+        source_names (iterable): Source document names
+        field (str): One of QTY_FIELDS
+        item_codes (iterable): Optional item codes to restrict the lookup to
+
+    Returns:
+        dict: (source_name, item_code) -> quantity
+    """
+    source_names = list(set(filter(None, source_names)))
+    filters = {"source_doctype": source_doctype, "source_name": ["in", source_names]}
+    if item_codes is not None:
+        item_codes = list(set(filter(None, item_codes)))
+        if not item_codes:
+            return {}
+        filters["item_code"] = ["in", item_codes]
+    if not source_names:
+        return {}
+
+    return {
+        (row.source_name, row.item_code): flt(row.get(field))
+        for row in frappe.get_all(
+            LEDGER_DOCTYPE, filters=filters, fields=["source_name", "item_code", field]
+        )
+    }
+
+
+def get_requested_quantities(source_doctype, source_name):
+    """
+    Quantities requested in non-cancelled Material Requests of a source document, per item.
+
+    Submitted requests come from the ledger. Draft requests still count as requested
+    but are not in the ledger (it only follows submit and cancel), so they are added
+    with one grouped query over the drafts.
+
+    Args:
+        source_doctype (str): "Sales Order" or "Tailoring Sheet"
+        source_name (str): Source document name
+
+    Returns:
+        dict: item_code -> requested quantity
+    """
+    requested = {
+        item_code: qty
+        for (_source, item_code), qty in get_ledger_quantities(
+            source_doctype, [source_name], "requested_qty"
+        ).items()
+    }
+
+    for item_code, qty in frappe.db.sql(
+        """
+        SELECT mri.item_code, SUM(mri.qty)
+        FROM `tabMaterial Request Item` mri
+        INNER JOIN `tabMaterial Request` mr ON mri.parent = mr.name
+        WHERE mr.{0} = %s
+            AND mr.docstatus = 0
+        GROUP BY mri.item_code
+        """.format(SOURCE_LINK_FIELDS[source_doctype]),
+        (source_name,),
+    ):
+        requested[item_code] = requested.get(item_code, 0.0) + flt(qty)
+
+    return requested
+
+
+def update_ledger_for_material_request(doc, method=None):
+    """Add (on_submit) or remove (on_cancel) Material Request quantities as requested_qty."""
+    sources = _get_sources(doc.get("custom_tailoring_sheet"), doc.get("custom_sales_order"))
+    if not sources:
+        return
+
+    sign = -1 if method == "on_cancel" else 1
+    deltas = {}
+    for item in doc.items:
+        for source in sources:
+            _add_delta(deltas, source, item.item_code, "requested_qty", sign * flt(item.qty))
+
+    _apply_deltas(deltas)
+
+
+def update_ledger_for_stock_entry(doc, method=None):
+    """Add (on_submit) or remove (on_cancel) Material Issue quantities as issued_qty."""
+    if doc.get("stock_entry_type") != "Material Issue":
+        return
+
+    mr_names = list({item.material_request for item in doc.items if item.get("material_request")})
+    mr_sources = {}
+    if mr_names:
+        mr_sources = {
+            mr.name: mr
+            for mr in frappe.get_all(
+                "Material Request",
+                filters={"name": ["in", mr_names]},
+                fields=["name", "custom_tailoring_sheet", "custom_sales_order"],
+            )
+        }
+
+    sign = -1 if method == "on_cancel" else 1
+    deltas = {}
+    for item in doc.items:
+        mr = mr_sources.get(item.get("material_request")) or {}
+        sources = _get_sources(
+            doc.get("custom_tailoring_sheet") or mr.get("custom_tailoring_sheet"),
+            mr.get("custom_sales_order"),
+        )
+        for source in sources:
+            _add_delta(deltas, source, item.item_code, "issued_qty", sign * flt(item.qty))
+
+    _apply_deltas(deltas)
+
+
+def update_ledger_for_delivery_note(doc, method=None):
+    """Add (on_submit) or remove (on_cancel) Delivery Note quantities as delivered_qty."""
+    sign = -1 if method == "on_cancel" else 1
+    deltas = {}
+    for item in doc.items:
+        if item.get("against_sales_order"):
+            _add_delta(
+                deltas,
+                ("Sales Order", item.against_sales_order),
+                item.item_code,
+                "delivered_qty",
+                sign * flt(item.qty),
+            )
+
+    _apply_deltas(deltas)
+
+
+@frappe.whitelist()
+def rebuild_material_fulfilment_ledger():
+    """
+    Rebuild the whole ledger from submitted Material Requests, Stock Entries and Delivery Notes.
+
+    Uses three grouped queries and the same source attribution as the incremental hooks.
+    Can be run from the desk or with
+    `bench --site <site> rebuild-material-fulfilment-ledger`.
+    """
+    frappe.only_for("System Manager")
+
+    deltas = {}
+
+    for row in frappe.db.sql(
+        """
+        SELECT mr.custom_tailoring_sheet, mr.custom_sales_order, mri.item_code, SUM(mri.qty) AS qty
+        FROM `tabMaterial Request Item` mri
+        INNER JOIN `tabMaterial Request` mr ON mri.parent = mr.name
+        WHERE mr.docstatus = 1
+        GROUP BY mr.custom_tailoring_sheet, mr.custom_sales_order, mri.item_code
+        """,
+        as_dict=True,
+    ):
+        for source in _get_sources(row.custom_tailoring_sheet, row.custom_sales_order):
+            _add_delta(deltas, source, row.item_code, "requested_qty", flt(row.qty))
+
+    for row in frappe.db.sql(
+        """
+        SELECT
+            COALESCE(NULLIF(se.custom_tailoring_sheet, ''), mr.custom_tailoring_sheet) AS tailoring_sheet,
+            mr.custom_sales_order AS sales_order,
+            sed.item_code,
+            SUM(sed.qty) AS qty
+        FROM `tabStock Entry Detail` sed
+        INNER JOIN `tabStock Entry` se ON sed.parent = se.name
+        LEFT JOIN `tabMaterial Request` mr ON mr.name = sed.material_request
+        WHERE se.docstatus = 1
+            AND se.stock_entry_type = 'Material Issue'
+        GROUP BY tailoring_sheet, sales_order, sed.item_code
+        """,
+        as_dict=True,
+    ):
+        for source in _get_sources(row.tailoring_sheet, row.sales_order):
+            _add_delta(deltas, source, row.item_code, "issued_qty", flt(row.qty))
+
+    for row in frappe.db.sql(
+        """
+        SELECT dni.against_sales_order, dni.item_code, SUM(dni.qty) AS qty
+        FROM `tabDelivery Note Item` dni
+        INNER JOIN `tabDelivery Note` dn ON dni.parent = dn.name
+        WHERE dn.docstatus = 1
+            AND IFNULL(dni.against_sales_order, '') != ''
+        GROUP BY dni.against_sales_order, dni.item_code
+        """,
+        as_dict=True,
+    ):
+        _add_delta(
+            deltas,
+            ("Sales Order", row.against_sales_order),
+            row.item_code,
+            "delivered_qty",
+            flt(row.qty),
+        )
+
+    frappe.db.delete(LEDGER_DOCTYPE)
+    _apply_deltas(deltas)
+
+    return len(deltas)
+
+
+def get_ledger_name(source_doctype, source_name, item_code):
+    """Deterministic ledger row name, so increments can upsert on the primary key."""
+    key = "\0".join((source_doctype, source_name, item_code))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _get_sources(tailoring_sheet, sales_order):
+    sources = []
+    if tailoring_sheet:
+        sources.append(("Tailoring Sheet", tailoring_sheet))
+    if sales_order:
+        sources.append(("Sales Order", sales_order))
+    return sources
+
+
+def _add_delta(deltas, source, item_code, field, qty):
+    if not item_code or not qty:
+        return
+    row = deltas.setdefault((*source, item_code), dict.fromkeys(QTY_FIELDS, 0.0))
+    row[field] += qty
+
+
+def _apply_deltas(deltas, chunk_size=500):
+    """Upsert quantity deltas with INSERT ... ON DUPLICATE KEY UPDATE, in chunks."""
+    if not deltas:
+        return
+
+    timestamp = now()
+    user = frappe.session.user
+    rows = [
+        (
+            get_ledger_name(source_doctype, source_name, item_code),
+            timestamp,
+            timestamp,
+            user,
+            user,
+            source_doctype,
+            source_name,
+            item_code,
+            qtys["requested_qty"],
+            qtys["issued_qty"],
+            qtys["delivered_qty"],
+        )
+        for (source_doctype, source_name, item_code), qtys in deltas.items()
+    ]
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start : start + chunk_size]
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(chunk))
+        frappe.db.sql(
+            f"""
+            INSERT INTO `tabMaterial Fulfilment Ledger`
+                (name, creation, modified, owner, modified_by,
+                source_doctype, source_name, item_code,
+                requested_qty, issued_qty, delivered_qty)
+            VALUES {placeholders}
+            ON DUPLICATE KEY UPDATE
+                requested_qty = requested_qty + VALUES(requested_qty),
+                issued_qty = issued_qty + VALUES(issued_qty),
+                delivered_qty = delivered_qty + VALUES(delivered_qty),
+                modified = VALUES(modified),
+                modified_by = VALUES(modified_by)
+            """,
+            [value for row in chunk for value in row],
+        )
@@ -0,0 +1,196 @@
+from itertools import groupby
+from operator import itemgetter
+
+import frappe  # type: ignore
+from frappe.utils import add_days, flt, getdate, today  # type: ignore
+
+from fabric_sense.fabric_sense.py.reorder_monitoring import get_reorder_level_map
+
+
+# Ledger history the consumption rate is computed over
+FORECAST_LOOKBACK_DAYS = 365
+
+# Span of the exponential moving average, alpha = 2 / (span + 1)
+FORECAST_SPAN_DAYS = 30
+
+# Lead time for Items that don't define one
+DEFAULT_LEAD_TIME_DAYS = 7
+
+# Vouchers whose outgoing entries are consumption; Stock Entries count too when their
+# purpose is Material Issue (see get_ledger_rows)
+CONSUMPTION_VOUCHER_TYPES = ("Delivery Note", "Sales Invoice")
+
+
+def forecast_consumption(rows, as_of, span_days=FORECAST_SPAN_DAYS):
+    """
+    Daily consumption rate per item and warehouse, in a single pass over ledger rows.
+
+    Consumption is bucketed per posting day and fed into an exponential moving average;
+    days without consumption count as zero up to as_of. The average is bias-corrected
+    for pairs whose history is shorter than the span. Only the running state of the
+    current pair is kept, so memory does not depend on the number of rows.
+
+    Args:
+        rows (iterable): (item_code, warehouse, posting_date, actual_qty, qty_after_transaction,
+            is_consumption) tuples ordered by item_code, warehouse and posting order
+        as_of (date): Day the forecast is made for
+        span_days (int): EMA span in days
+
+    Yields:
+        frappe._dict: item_code, warehouse, daily_consumption and current_quantity (stock
+            after the last ledger row)
+    """
+    alpha = 2.0 / (span_days + 1)
+    as_of = getdate(as_of)
+
+    for (item_code, warehouse), group in groupby(rows, key=itemgetter(0, 1)):
+        ema = weight = 0.0
+        day = None
+        day_qty = balance = 0.0
+
+        for _item, _warehouse, posting_date, actual_qty, qty_after_transaction, is_consumption in group:
+            posting_date = getdate(posting_date)
+            if day is None:
+                day = posting_date
+            elif posting_date != day:
+                ema, weight = _close_day(ema, weight, day_qty, (posting_date - day).days, alpha)
+                day, day_qty = posting_date, 0.0
+
+            if is_consumption:
+                day_qty -= flt(actual_qty)
+            balance = flt(qty_after_transaction)
+
+        if day is None:
+            continue
+
+        # Close the last posting day and count the quiet days up to and including as_of
+        ema, weight = _close_day(ema, weight, day_qty, max((as_of - day).days, 0) + 1, alpha)
+
+        yield frappe._dict(
+            item_code=item_code,
+            warehouse=warehouse,
+            daily_consumption=ema / weight if weight else 0.0,
+            current_quantity=balance,
+        )
+
+
+def _close_day(ema, weight, qty, days, alpha):
+    """
+    Add one day of consumption to the average, then days - 1 days without any.
+
+    weight is the total weight given to observed days (1 - (1 - alpha)^n), used for the
+    bias correction.
+    """
+    decay = 1.0 - alpha
+    ema = alpha * qty + decay * ema
+    weight = alpha + decay * weight
+
+    quiet_days = days - 1
+    if quiet_days > 0:
+        factor = decay**quiet_days
+        ema *= factor
+        weight = 1.0 - (1.0 - weight) * factor
+
+    return ema, weight
+
+
+def get_ledger_rows(from_date):
+    """
+    Stream Stock Ledger Entries of pairs with a reorder level, in forecast_consumption order.
+
+    Must be consumed inside frappe.db.unbuffered_cursor(), without other queries until
+    the iterator is exhausted.
+    """
+    return frappe.db.sql(
+        """
+        SELECT
+            sle.item_code,
+            sle.warehouse,
+            sle.posting_date,
+            sle.actual_qty,
+            sle.qty_after_transaction,
+            sle.actual_qty < 0 AND (
+                sle.voucher_type IN %(consumption_voucher_types)s
+                OR (sle.voucher_type = 'Stock Entry' AND se.purpose = 'Material Issue')
+            ) AS is_consumption
+        FROM `tabStock Ledger Entry` sle
+        LEFT JOIN `tabStock Entry` se
+            ON sle.voucher_type = 'Stock Entry' AND se.name = sle.voucher_no
+        WHERE sle.is_cancelled = 0
+            AND sle.posting_date >= %(from_date)s
+            AND EXISTS (
+                SELECT 1
+                FROM `tabItem Reorder` ir
+                WHERE ir.parenttype = 'Item'
+                    AND ir.parent = sle.item_code
+                    AND ir.warehouse = sle.warehouse
+            )
+        ORDER BY sle.item_code, sle.warehouse, sle.posting_date, sle.posting_time, sle.creation
+        """,
+        {"from_date": from_date, "consumption_voucher_types": CONSUMPTION_VOUCHER_TYPES},
+        as_iterator=True,
+    )
+
+
+def update_reorder_forecasts(as_of=None):
+    """
+    Scheduled job: forecast consumption and write it to Reorder Notifications.
+
+    For every item and warehouse with a reorder level, days of cover is the current
+    stock divided by the daily consumption, and the suggested reorder level is the
+    consumption over the Item's lead time plus its safety stock. The forecast is written
+    to the open notifications of the forecast pairs only: whether a pair is below its
+    reorder level stays decided by the Item's reorder level, the suggestion is advisory.
+    """
+    as_of = getdate(as_of or today())
+    reorder_levels = get_reorder_level_map()
+    if not reorder_levels:
+        return
+
+    with frappe.db.unbuffered_cursor():
+        forecasts = list(
+            forecast_consumption(get_ledger_rows(add_days(as_of, -FORECAST_LOOKBACK_DAYS)), as_of)
+        )
+
+    if not forecasts:
+        return
+
+    items = {
+        item.name: item
+        for item in frappe.get_all(
+            "Item",
+            filters={"name": ["in", list({forecast.item_code for forecast in forecasts})]},
+            fields=["name", "lead_time_days", "safety_stock"],
+        )
+    }
+
+    for forecast in forecasts:
+        item = items.get(forecast.item_code) or frappe._dict()
+        forecast.lead_time_days = int(item.lead_time_days or DEFAULT_LEAD_TIME_DAYS)
+        forecast.suggested_reorder_level = flt(
+            forecast.daily_consumption * forecast.lead_time_days + flt(item.safety_stock), 3
+        )
+        forecast.days_of_cover = (
+            flt(forecast.current_quantity / forecast.daily_consumption, 1)
+            if forecast.daily_consumption > 0
+            else None
+        )
+
+    by_pair = {(forecast.item_code, forecast.warehouse): forecast for forecast in forecasts}
+    updates = {}
+    for notification in frappe.get_all(
+        "Reorder Notification",
+        filters={"status": "Pending"},
+        fields=["name", "item", "warehouse"],
+    ):
+        forecast = by_pair.get((notification.item, notification.warehouse))
+        if forecast:
+            updates[notification.name] = {
+                "daily_consumption": flt(forecast.daily_consumption, 3),
+                "days_of_cover": forecast.days_of_cover,
+                "lead_time_days": forecast.lead_time_days,
+                "suggested_reorder_level": forecast.suggested_reorder_level,
+            }
+
+    if updates:
+        frappe.db.bulk_update("Reorder Notification", updates, update_modified=False)
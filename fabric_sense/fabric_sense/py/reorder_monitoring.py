@@ -6,12 +6,30 @@ from frappe import _
 from frappe.utils import today, flt
 
 
+SETTINGS_DOCTYPE = "Reorder Monitoring Settings"
+
+# Notifications upserted between two commits of the scheduled scan
+REORDER_SCAN_CHUNK_SIZE = 500
+
+REORDER_LEVEL_CACHE_KEY = "fabric_sense:reorder_levels"
+REORDER_LEVEL_VERSION_KEY = "fabric_sense:reorder_levels_version"
+
+# Maps are stored under REORDER_LEVEL_CACHE_KEY:<version>; the TTL only clears out keys of
+# versions nobody reads any more
+REORDER_LEVEL_CACHE_TTL = 86400
+
+# site -> (version, reorder level map), so a worker only goes back to Redis after an invalidation
+_process_cache = {}
+
+
 def check_reorder_level_on_stock_change(doc, method=None):
     """
     Monitor stock changes and create reorder notifications when stock falls below reorder level.
 
-    This function is triggered after Stock Ledger Entry submission to check if any item's
-    stock has fallen below its defined reorder level for the specific warehouse.
+    This function is triggered after Stock Ledger Entry submission. It only records the
+    (item, warehouse) pair of outgoing entries that have a reorder level; all pairs touched
+    in the transaction are evaluated once, right before commit, by
+    evaluate_pending_reorder_checks.
 
     Args:
         doc (Document): Stock Ledger Entry document
@@ -22,60 +40,181 @@ def check_reorder_level_on_stock_change(doc, method=None):
         if not doc.actual_qty or flt(doc.actual_qty) >= 0:
             return
 
-        item_code = doc.item_code
-        warehouse = doc.warehouse
+        # The scheduled scan covers every item, stock posting stays free of reorder work
+        if get_reorder_monitoring_settings().monitoring_mode == "Scheduled Scan":
+            return
 
-        # Get current stock balance for this item in this warehouse
-        # Pass the current SLE quantity to calculate actual stock after this transaction
-        current_stock = get_current_stock_balance(item_code, warehouse, doc.actual_qty)
+        # Most items have no reorder level; the cached map answers that without a query
+        if get_reorder_level(doc.item_code, doc.warehouse) is None:
+            return
 
-        # Get reorder level for this item-warehouse combination
-        reorder_level = get_reorder_level(item_code, warehouse)
+        pending = getattr(frappe.local, "fabric_sense_reorder_checks", None)
+        if pending is None:
+            pending = frappe.local.fabric_sense_reorder_checks = set()
+            frappe.db.before_commit.add(evaluate_pending_reorder_checks)
+            frappe.db.after_rollback.add(discard_pending_reorder_checks)
 
-        if reorder_level is None:
-            # No reorder level defined for this item-warehouse combination
-            return
+        pending.add((doc.item_code, doc.warehouse))
 
-        # Debug logging
-        frappe.logger().info(
-            f"Reorder check for {item_code} in {warehouse}: "
-            f"SLE qty: {doc.actual_qty}, Current stock: {current_stock}, "
-            f"Reorder level: {reorder_level}"
+    except Exception as e:
+        frappe.log_error(
+            message=f"Error in reorder level monitoring: {str(e)}\n{frappe.get_traceback()}",
+            title=f"Reorder Monitoring Error - Item: {doc.item_code}, Warehouse: {doc.warehouse}",
         )
 
-        # Check if current stock has fallen below reorder level
-        if flt(current_stock) < flt(reorder_level):
-            # Check if notification already exists for this item-warehouse combination
-            # existing_notification = frappe.db.exists(
-            #     "Reorder Notification",
-            #     {
-            #         "item": item_code,
-            #         "warehouse": warehouse,
-            #         "status": "Pending"
-            #     }
-            # )
-
-            # if not existing_notification:
-            # Create new reorder notification
-            create_reorder_notification(
-                item_code=item_code,
-                warehouse=warehouse,
-                reorder_level=reorder_level,
-                current_quantity=current_stock,
-            )
 
-            frappe.logger().info(
-                f"Reorder notification created for {item_code} in {warehouse}. "
-                f"Current stock: {current_stock}, Reorder level: {reorder_level}"
-            )
+def evaluate_pending_reorder_checks():
+    """Check the (item, warehouse) pairs recorded in this transaction, just before commit."""
+    pending = getattr(frappe.local, "fabric_sense_reorder_checks", None)
+    frappe.local.fabric_sense_reorder_checks = None
+    if not pending:
+        return
 
+    try:
+        upsert_reorder_notifications(
+            get_stock_below_reorder_level(
+                pending, get_reorder_monitoring_settings().quantity_basis
+            )
+        )
     except Exception as e:
         frappe.log_error(
             message=f"Error in reorder level monitoring: {str(e)}\n{frappe.get_traceback()}",
-            title=f"Reorder Monitoring Error - Item: {doc.item_code}, Warehouse: {doc.warehouse}",
+            title="Reorder Monitoring Error",
         )
 
 
+def discard_pending_reorder_checks():
+    """The stock movements were rolled back, so are their reorder checks."""
+    frappe.local.fabric_sense_reorder_checks = None
+
+
+def get_reorder_monitoring_settings():
+    """Reorder Monitoring Settings, from the document cache."""
+    settings = frappe.get_cached_doc(SETTINGS_DOCTYPE)
+    return frappe._dict(
+        monitoring_mode=settings.monitoring_mode or "Real-time",
+        quantity_basis=settings.quantity_basis or "Actual Qty",
+    )
+
+
+def get_stock_below_reorder_level(pairs=None, quantity_basis="Actual Qty"):
+    """
+    Bin quantity and reorder level of (item, warehouse) pairs, in one Item Reorder / Bin join.
+
+    Args:
+        pairs (iterable): (item_code, warehouse) tuples, every enabled item with a
+            reorder level if omitted
+        quantity_basis (str): "Actual Qty" or "Projected Qty"
+
+    Returns:
+        list: frappe._dict(item_code, warehouse, reorder_level, current_quantity) for the
+            pairs whose stock is below their reorder level
+    """
+    conditions = ""
+    values = {}
+    if pairs is not None:
+        pairs = set(pairs)
+        if not pairs:
+            return []
+        conditions = "AND ir.parent IN %(item_codes)s AND ir.warehouse IN %(warehouses)s"
+        values = {
+            "item_codes": tuple({item_code for item_code, _warehouse in pairs}),
+            "warehouses": tuple({warehouse for _item_code, warehouse in pairs}),
+        }
+
+    qty_field = "projected_qty" if quantity_basis == "Projected Qty" else "actual_qty"
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT
+            ir.parent AS item_code,
+            ir.warehouse,
+            ir.warehouse_reorder_level AS reorder_level,
+            COALESCE(b.{qty_field}, 0) AS current_quantity
+        FROM `tabItem Reorder` ir
+        INNER JOIN `tabItem` i ON i.name = ir.parent
+        LEFT JOIN `tabBin` b ON b.item_code = ir.parent AND b.warehouse = ir.warehouse
+        WHERE ir.parenttype = 'Item'
+            AND i.disabled = 0
+            AND ir.warehouse_reorder_level > 0
+            AND COALESCE(b.{qty_field}, 0) < ir.warehouse_reorder_level
+            {conditions}
+        ORDER BY ir.parent, ir.warehouse
+        """,
+        values,
+        as_dict=True,
+    )
+
+    if pairs is None:
+        return rows
+    return [row for row in rows if (row.item_code, row.warehouse) in pairs]
+
+
+def scan_reorder_levels():
+    """
+    Scheduled job for the "Scheduled Scan" mode: check every item with a reorder level.
+
+    One Item Reorder / Bin join finds the pairs below their level; notifications are
+    upserted in chunks with a commit after each.
+    """
+    settings = get_reorder_monitoring_settings()
+    if settings.monitoring_mode != "Scheduled Scan":
+        return
+
+    rows = get_stock_below_reorder_level(quantity_basis=settings.quantity_basis)
+    for start in range(0, len(rows), REORDER_SCAN_CHUNK_SIZE):
+        upsert_reorder_notifications(rows[start : start + REORDER_SCAN_CHUNK_SIZE])
+        frappe.db.commit()
+
+
+def upsert_reorder_notifications(rows):
+    """
+    Keep a single open (Pending) Reorder Notification per item and warehouse.
+
+    Existing open notifications get the latest quantity, level and date; pairs without
+    one get a new notification.
+
+    Args:
+        rows (list): dicts with item_code, warehouse, reorder_level and current_quantity
+    """
+    if not rows:
+        return
+
+    existing = {
+        (n.item, n.warehouse): n.name
+        for n in frappe.get_all(
+            "Reorder Notification",
+            filters={
+                "item": ["in", list({row["item_code"] for row in rows})],
+                "status": "Pending",
+            },
+            fields=["name", "item", "warehouse"],
+            # Newest first, so the oldest open notification of a pair wins
+            order_by="creation desc",
+        )
+    }
+
+    updates = {}
+    for row in rows:
+        name = existing.get((row["item_code"], row["warehouse"]))
+        if name:
+            updates[name] = {
+                "reorder_level": str(row["reorder_level"]),
+                "current_quantity": row["current_quantity"],
+                "date": today(),
+            }
+        else:
+            create_reorder_notification(
+                item_code=row["item_code"],
+                warehouse=row["warehouse"],
+                reorder_level=row["reorder_level"],
+                current_quantity=row["current_quantity"],
+            )
+
+    if updates:
+        frappe.db.bulk_update("Reorder Notification", updates)
+
+
 def get_current_stock_balance(item_code, warehouse, current_sle_qty=0):
     """
     Get current stock balance for an item in a specific warehouse.
@@ -136,6 +275,8 @@ def get_reorder_level(item_code, warehouse):
     """
     Get reorder level for an item in a specific warehouse from Item's reorder levels child table.
 
+    Levels come from the cached reorder level map, so the lookup costs no query.
+
     Args:
         item_code (str): Item code
         warehouse (str): Warehouse name
@@ -144,17 +285,7 @@ def get_reorder_level(item_code, warehouse):
         float or None: Reorder level if defined, None otherwise
     """
     try:
-        # Query the Item Reorder child table
-        reorder_data = frappe.db.get_value(
-            "Item Reorder",
-            {"parent": item_code, "warehouse": warehouse},
-            "warehouse_reorder_level",
-        )
-
-        if reorder_data:
-            return flt(reorder_data)
-
-        return None
+        return get_reorder_level_map().get(item_code, {}).get(warehouse)
 
     except Exception as e:
         frappe.log_error(
@@ -164,6 +295,104 @@ def get_reorder_level(item_code, warehouse):
         return None
 
 
+def clear_reorder_level_cache():
+    """
+    Invalidate the reorder level map for a change made in the current transaction.
+
+    The shared cache is only dropped after commit: done earlier, another worker could
+    rebuild it from the old rows under the new version and keep it until the next Item
+    save. Until then this request reads the map from the database.
+    """
+    frappe.local.fabric_sense_reorder_levels_dirty = True
+    frappe.local.fabric_sense_reorder_levels = None
+    _process_cache.pop(frappe.local.site, None)
+    frappe.db.after_commit.add(_invalidate_shared_reorder_level_map)
+
+
+def _invalidate_shared_reorder_level_map():
+    """
+    Bump the reorder level map version so every process reloads it.
+
+    A worker that read the old rows before the commit can still write its map after this;
+    it lands under the old version, which nobody reads any more.
+    """
+    old_version = frappe.cache().get_value(REORDER_LEVEL_VERSION_KEY)
+    frappe.cache().set_value(REORDER_LEVEL_VERSION_KEY, frappe.generate_hash(length=10))
+    if old_version:
+        frappe.cache().delete_value(f"{REORDER_LEVEL_CACHE_KEY}:{old_version}")
+    _process_cache.pop(frappe.local.site, None)
+    frappe.local.fabric_sense_reorder_levels = None
+    frappe.local.fabric_sense_reorder_levels_dirty = False
+
+
+def get_reorder_level_map():
+    """
+    Return {item_code: {warehouse: reorder level}}, cached per request, per process and in Redis.
+
+    Only items with a reorder level are in the map, so a missing item is a cached
+    "no reorder level" and needs no query either.
+    """
+    reorder_levels = getattr(frappe.local, "fabric_sense_reorder_levels", None)
+    if reorder_levels is not None:
+        return reorder_levels
+
+    if getattr(frappe.local, "fabric_sense_reorder_levels_dirty", False):
+        # Reorder levels changed in this transaction, the shared map does not have it yet
+        frappe.local.fabric_sense_reorder_levels = _build_reorder_level_map()
+        return frappe.local.fabric_sense_reorder_levels
+
+    version = frappe.cache().get_value(REORDER_LEVEL_VERSION_KEY)
+    if not version:
+        version = frappe.generate_hash(length=10)
+        frappe.cache().set_value(REORDER_LEVEL_VERSION_KEY, version)
+
+    cached = _process_cache.get(frappe.local.site)
+    if cached and cached[0] == version:
+        reorder_levels = cached[1]
+    else:
+        cache_key = f"{REORDER_LEVEL_CACHE_KEY}:{version}"
+        reorder_levels = frappe.cache().get_value(cache_key)
+        if reorder_levels is None:
+            reorder_levels = _build_reorder_level_map()
+            frappe.cache().set_value(
+                cache_key, reorder_levels, expires_in_sec=REORDER_LEVEL_CACHE_TTL
+            )
+        _process_cache[frappe.local.site] = (version, reorder_levels)
+
+    frappe.local.fabric_sense_reorder_levels = reorder_levels
+    return reorder_levels
+
+
+def _build_reorder_level_map():
+    reorder_levels = {}
+    for item_code, warehouse, level in frappe.db.sql(
+        """
+        SELECT parent, warehouse, warehouse_reorder_level
+        FROM `tabItem Reorder`
+        WHERE parenttype = 'Item'
+            AND warehouse_reorder_level > 0
+        ORDER BY parent, idx
+        """
+    ):
+        # The first row wins, like the get_value lookup did
+        reorder_levels.setdefault(item_code, {}).setdefault(warehouse, flt(level))
+    return reorder_levels
+
+
+def clear_reorder_level_cache_for_item(doc):
+    """Invalidate the reorder level map when an Item's reorder levels were changed."""
+    previous = doc.get_doc_before_save()
+    if _get_reorder_level_rows(doc) != (_get_reorder_level_rows(previous) if previous else []):
+        clear_reorder_level_cache()
+
+
+def _get_reorder_level_rows(item):
+    return sorted(
+        (row.warehouse or "", flt(row.warehouse_reorder_level))
+        for row in item.get("reorder_levels") or []
+    )
+
+
 def create_reorder_notification(item_code, warehouse, reorder_level, current_quantity):
     """
     Create a new Reorder Notification record.
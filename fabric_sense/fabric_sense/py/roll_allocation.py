@@ -0,0 +1,260 @@
+from bisect import bisect_left
+
+import frappe  # type: ignore
+from frappe import _  # type: ignore
+from frappe.utils import flt, today  # type: ignore
+
+
+ALLOCATION_STRATEGIES = ("Best Fit", "Minimum Leftover")
+
+# Quantities are allocated in whole units of 10^-ALLOCATION_PRECISION (centimetres for metres)
+ALLOCATION_PRECISION = 2
+
+# Largest subset search (required + longest roll, in units) for Minimum Leftover;
+# bigger requirements fall back to Best Fit
+MAX_SUBSET_SEARCH_UNITS = 200_000
+
+
+def get_available_rolls(item_codes, warehouses):
+    """
+    Read the open batch (roll) quantities of items in warehouses, in one query.
+
+    Balances come from submitted, non-cancelled Serial and Batch Bundles; disabled and
+    expired batches are skipped.
+
+    Args:
+        item_codes (iterable): Item codes
+        warehouses (iterable): Warehouses
+
+    Returns:
+        dict: (item_code, warehouse) -> list of (batch_no, qty), oldest batch first
+    """
+    item_codes = list(set(filter(None, item_codes)))
+    warehouses = list(set(filter(None, warehouses)))
+    if not item_codes or not warehouses:
+        return {}
+
+    rolls = {}
+    for row in frappe.db.sql(
+        """
+        SELECT sbb.item_code, sbb.warehouse, sbe.batch_no, SUM(sbe.qty) AS qty
+        FROM `tabSerial and Batch Entry` sbe
+        INNER JOIN `tabSerial and Batch Bundle` sbb ON sbe.parent = sbb.name
+        INNER JOIN `tabBatch` b ON b.name = sbe.batch_no
+        WHERE sbb.docstatus = 1
+            AND sbb.is_cancelled = 0
+            AND sbb.item_code IN %(item_codes)s
+            AND sbb.warehouse IN %(warehouses)s
+            AND b.disabled = 0
+            AND (b.expiry_date IS NULL OR b.expiry_date >= %(today)s)
+        GROUP BY sbb.item_code, sbb.warehouse, sbe.batch_no
+        HAVING SUM(sbe.qty) > 0
+        ORDER BY MIN(b.creation), sbe.batch_no
+        """,
+        {"item_codes": tuple(item_codes), "warehouses": tuple(warehouses), "today": today()},
+        as_dict=True,
+    ):
+        rolls.setdefault((row.item_code, row.warehouse), []).append((row.batch_no, flt(row.qty)))
+
+    return rolls
+
+
+def allocate_rolls(required_qty, rolls, strategy="Best Fit"):
+    """
+    Choose the rolls to cut a required quantity from.
+
+    Best Fit takes the shortest roll that still covers what is left, or the longest roll
+    when none does. Minimum Leftover picks the set of rolls whose total exceeds the
+    requirement by the least, so the fewest metres stay on opened rolls; it searches all
+    subsets with a bitset and falls back to Best Fit for very large requirements.
+
+    Args:
+        required_qty (float): Quantity to allocate
+        rolls (list): (batch_no, qty) tuples available
+        strategy (str): One of ALLOCATION_STRATEGIES
+
+    Returns:
+        tuple: (allocations as a list of (batch_no, qty), shortage qty)
+    """
+    if strategy not in ALLOCATION_STRATEGIES:
+        frappe.throw(_("Unknown roll allocation strategy {0}").format(strategy))
+
+    scale = 10**ALLOCATION_PRECISION
+    required = round(flt(required_qty) * scale)
+    units = [(round(flt(qty) * scale), batch_no) for batch_no, qty in rolls]
+    units = [(qty, batch_no) for qty, batch_no in units if qty > 0]
+
+    if required <= 0:
+        return [], 0.0
+
+    total = sum(qty for qty, _batch in units)
+    if total <= required:
+        # Not enough stock: everything goes, the rest is short
+        return [(batch_no, qty / scale) for qty, batch_no in units], (required - total) / scale
+
+    chosen = None
+    if strategy == "Minimum Leftover":
+        chosen = _pick_min_leftover(required, units)
+    if chosen is None:
+        chosen = _pick_best_fit(required, units)
+
+    # Rolls are used up whole, the longest chosen roll is the one that gets cut
+    chosen.sort(key=lambda roll: (-roll[0], roll[1]))
+    allocations = []
+    remaining = required
+    for qty, batch_no in reversed(chosen):
+        take = min(qty, remaining)
+        allocations.append((batch_no, take / scale))
+        remaining -= take
+
+    return allocations, 0.0
+
+
+def _pick_best_fit(required, units):
+    pool = sorted(units)
+    chosen = []
+    remaining = required
+    while remaining > 0 and pool:
+        idx = bisect_left(pool, (remaining, ""))
+        if idx < len(pool):
+            chosen.append(pool.pop(idx))
+            break
+        roll = pool.pop()
+        chosen.append(roll)
+        remaining -= roll[0]
+    return chosen
+
+
+def _pick_min_leftover(required, units):
+    """
+    Subset with the smallest total >= required, via reachable-sum bitsets.
+
+    Bit s of reach[i] is set when some subset of the first i rolls sums to s; sums above
+    required + longest roll can never be the best answer and are masked off.
+    """
+    limit = required + max(qty for qty, _batch in units)
+    if limit > MAX_SUBSET_SEARCH_UNITS:
+        return None
+
+    mask = (1 << (limit + 1)) - 1
+    reach = [1]
+    for qty, _batch in units:
+        reach.append((reach[-1] | (reach[-1] << qty)) & mask)
+
+    candidates = reach[-1] >> required
+    if not candidates:
+        return None
+    best = required + ((candidates & -candidates).bit_length() - 1)
+
+    chosen = []
+    for i in range(len(units), 0, -1):
+        qty = units[i - 1][0]
+        if not (reach[i - 1] >> best) & 1:
+            chosen.append(units[i - 1])
+            best -= qty
+    return chosen
+
+
+def allocate_stock_entry_rows(items, strategy="Best Fit"):
+    """
+    Split Stock Entry rows of batch-tracked items into one row per batch (roll).
+
+    Each source row is split on its own, so its Material Request link, target
+    warehouse, rate, accounting and custom fields carry over to every split and rows of
+    different Material Requests are never merged. Rows asking for the same item from the
+    same warehouse draw from one pool of rolls in input order, so they don't each pick
+    the same roll. Rows of items without batches, or without a source warehouse, are
+    returned unchanged; quantity no roll can cover stays on a split without batch and is
+    reported as a shortage.
+
+    Args:
+        items (list): Rows with item_code, s_warehouse and qty (or transfer_qty)
+        strategy (str): One of ALLOCATION_STRATEGIES
+
+    Returns:
+        dict: rows (the splits of each row followed by the next row, in input order)
+            and shortages (item_code, s_warehouse, qty)
+    """
+    item_codes = list({item.get("item_code") for item in items if item.get("item_code")})
+    batch_items = (
+        set(
+            frappe.get_all(
+                "Item", filters={"name": ["in", item_codes], "has_batch_no": 1}, pluck="name"
+            )
+        )
+        if item_codes
+        else set()
+    )
+
+    def is_allocated(item):
+        return item.get("item_code") in batch_items and item.get("s_warehouse")
+
+    available = get_available_rolls(
+        [item.get("item_code") for item in items if is_allocated(item)],
+        [item.get("s_warehouse") for item in items if is_allocated(item)],
+    )
+
+    rows = []
+    shortages = []
+    for item in items:
+        if not is_allocated(item):
+            rows.append(item)
+            continue
+
+        key = (item.get("item_code"), item.get("s_warehouse"))
+        # Rolls are allocated in stock UOM, the row keeps its own UOM
+        conversion_factor = flt(item.get("conversion_factor")) or 1
+        required_qty = flt(item.get("transfer_qty")) or flt(item.get("qty")) * conversion_factor
+
+        pool = available.setdefault(key, [])
+        allocations, shortage = allocate_rolls(required_qty, pool, strategy)
+        _consume_rolls(pool, allocations)
+        if shortage:
+            allocations.append((None, shortage))
+            shortages.append({"item_code": key[0], "s_warehouse": key[1], "qty": shortage})
+        if not allocations:
+            # Nothing to allocate (zero quantity), the row stays as it is
+            rows.append(item)
+            continue
+
+        for batch_no, qty in allocations:
+            row = dict(item)
+            row.update(
+                {
+                    "batch_no": batch_no,
+                    "serial_and_batch_bundle": None,
+                    "use_serial_batch_fields": 1,
+                    "qty": qty / conversion_factor,
+                    "transfer_qty": qty,
+                }
+            )
+            rows.append(row)
+
+    return {"rows": rows, "shortages": shortages}
+
+
+def _consume_rolls(pool, allocations):
+    """Take allocated quantities off the pool of (batch_no, qty), keeping its order."""
+    taken = dict(allocations)
+    pool[:] = [
+        (batch_no, flt(qty - taken.get(batch_no, 0), ALLOCATION_PRECISION))
+        for batch_no, qty in pool
+        if flt(qty - taken.get(batch_no, 0), ALLOCATION_PRECISION) > 0
+    ]
+
+
+@frappe.whitelist()
+def get_roll_allocation(items, strategy="Best Fit"):
+    """
+    Allocate rolls for the rows of a Stock Entry form.
+
+    Args:
+        items (str|list): Stock Entry rows (JSON list from the client)
+        strategy (str): "Best Fit" or "Minimum Leftover"
+
+    Returns:
+        dict: rows and shortages, see allocate_stock_entry_rows
+    """
+    items = frappe.parse_json(items) if isinstance(items, str) else items
+    frappe.has_permission("Stock Entry", "create", throw=True)
+    return allocate_stock_entry_rows(items, strategy)
@@ -3,6 +3,18 @@ from frappe.model.mapper import get_mapped_doc  # type: ignore
 from frappe import _  # type: ignore
 from frappe.utils import format_date, fmt_money, get_url, flt  # type: ignore
 
+from fabric_sense.fabric_sense.py.item_attributes import (
+    get_item_attributes,
+    get_item_attributes_for_doc,
+)
+from fabric_sense.fabric_sense.py.material_fulfilment import (
+    get_requested_quantities as get_fulfilment_requested_quantities,
+)
+
+
+# Item groups whose items are never requested through Material Requests
+SERVICE_ITEM_GROUPS = ("Stitching", "Labour", "Delivery Charge")
+
 
 def validate_billing_multiple(doc, method=None):
     """
@@ -15,13 +27,16 @@ def validate_billing_multiple(doc, method=None):
     Raises:
         frappe.ValidationError: If any item quantity is not a multiple of its Billing Multiple
     """
+    # Item attributes for all rows are loaded once and shared with the other Sales Order hooks
+    item_attributes = get_item_attributes_for_doc(doc)
+
     for item in doc.items:
         if not item.item_code:
             continue
 
         # Get Billing Multiple value from Item doctype
-        billing_multiple = frappe.db.get_value(
-            "Item", item.item_code, "custom_billing_multiples"
+        billing_multiple = (item_attributes.get(item.item_code) or {}).get(
+            "custom_billing_multiples"
         )
 
         # If Billing Multiple exists and is greater than 0, validate quantity
@@ -63,12 +78,15 @@ def validate_mbq(doc, method=None):
     Raises:
         frappe.ValidationError: If any item quantity is less than its MBQ
     """
+    # Item attributes for all rows are loaded once and shared with the other Sales Order hooks
+    item_attributes = get_item_attributes_for_doc(doc)
+
     for item in doc.items:
         if not item.item_code:
             continue
 
         # Get MBQ value from Item doctype
-        mbq = frappe.db.get_value("Item", item.item_code, "custom_mbq")
+        mbq = (item_attributes.get(item.item_code) or {}).get("custom_mbq")
 
         # If MBQ exists and is greater than 0, validate quantity
         if mbq and mbq > 0:
@@ -400,61 +418,89 @@ def send_approval_email(doc, customer_email):
         return False
 
 
-def is_service_item(item_code):
+def get_service_items(item_codes, service_item_groups=SERVICE_ITEM_GROUPS):
     """
-    Check if an item should be excluded from Material Request.
-    Items are excluded if their parent item group is "Stitching" or "Labour".
+    Find the service items (Stitching, Labour, Delivery Charge groups) among item_codes.
+
+    Reads the item groups of all items with one Item query (shared through
+    get_item_attributes) and their parent groups with one Item Group query.
 
     Args:
-        item_code (str): Item code to check
+        item_codes (iterable): Item codes to classify
+        service_item_groups (tuple): Item groups (and their children) counted as services
 
     Returns:
-        bool: True if item should be excluded (is a service item), False otherwise
+        set: Item codes that are service items
     """
-    try:
-        # Get item's item_group
-        item_group = frappe.db.get_value("Item", item_code, "item_group")
-        if not item_group:
-            return False
-
-        # Check if item_group is "Stitching" or "Labour" (root level)
-        if item_group in ["Stitching", "Labour", "Delivery Charge"]:
-            return True
+    item_attributes = get_item_attributes(item_codes)
+    item_groups = list(
+        {attrs.item_group for attrs in item_attributes.values() if attrs and attrs.item_group}
+    )
+    if not item_groups:
+        return set()
+
+    parent_groups = dict(
+        frappe.get_all(
+            "Item Group",
+            filters={"name": ["in", item_groups]},
+            fields=["name", "parent_item_group"],
+            as_list=True,
+        )
+    )
 
-        # Check if item_group starts with "Stitching/" or "Labour/" (child groups stored as paths)
+    service_items = set()
+    for item_code, attrs in item_attributes.items():
+        if not attrs or not attrs.item_group:
+            continue
+        item_group = attrs.item_group
         if (
-            item_group.startswith("Stitching/")
-            or item_group.startswith("Labour/")
-            or item_group.startswith("Delivery Charge/")
+            item_group in service_item_groups
+            or item_group.split("/")[0] in service_item_groups
+            or parent_groups.get(item_group) in service_item_groups
         ):
-            return True
+            service_items.add(item_code)
 
-        # Check parent_item_group if item_group is a child
-        # In ERPNext, hierarchical item groups can be stored as "Parent/Child"
-        # or we can check the parent_item_group field of the Item Group
-        try:
-            # Try to get Item Group by the full path first
-            if frappe.db.exists("Item Group", item_group):
-                item_group_doc = frappe.get_doc("Item Group", item_group)
-                if (
-                    hasattr(item_group_doc, "parent_item_group")
-                    and item_group_doc.parent_item_group
-                ):
-                    parent_group = item_group_doc.parent_item_group
-                    if parent_group in ["Stitching", "Labour", "Delivery Charge"]:
-                        return True
-        except Exception:
-            # If getting Item Group fails, try to extract parent from path
-            # For paths like "Stitching/Curtain Stitching", check if first part is Stitching or Labour
-            if "/" in item_group:
-                parent_from_path = item_group.split("/")[0]
-                if parent_from_path in ["Stitching", "Labour", "Delivery Charge"]:
-                    return True
+    return service_items
+
+
+def get_requested_quantities(sales_order_name):
+    """
+    Get quantities already requested in non-cancelled Material Requests, per item.
+
+    Submitted requests are read from the Material Fulfilment Ledger, drafts are added
+    on top (see material_fulfilment.get_requested_quantities).
+
+    Args:
+        sales_order_name (str): Sales Order name
+
+    Returns:
+        dict: item_code -> requested quantity
+    """
+    return get_fulfilment_requested_quantities("Sales Order", sales_order_name)
 
-        return False
-    except Exception:
-        # If there's any error checking, don't exclude the item
-        return False
+
+def _has_remaining_items(so_items, requested_quantities, service_items):
+    """
+    Check whether any non-service item still has quantity left to request.
+
+    Ordered quantities are summed per item over the Sales Order rows and compared with
+    get_requested_quantities: Material Requests linked through their custom_sales_order
+    header, drafts and submitted ones, cancelled ones excluded. These are the numbers
+    make_material_request maps, so the remaining-items check and the Material Request
+    it creates always agree.
+    """
+    ordered_quantities = {}
+    for item in so_items:
+        if not item.item_code or item.item_code in service_items:
+            continue
+        ordered_quantities[item.item_code] = ordered_quantities.get(item.item_code, 0) + flt(
+            item.qty
+        )
+
+    return any(
+        ordered_qty - requested_quantities.get(item_code, 0) > 0
+        for item_code, ordered_qty in ordered_quantities.items()
+    )
 
 
 @frappe.whitelist()
@@ -477,11 +523,23 @@ def make_material_request(source_name, target_doc=None):
         Document: Material Request document
     """
 
+    # Requested quantities and service classification are computed once for the
+    # whole Sales Order and reused by the condition, postprocess and approval logic
+    so_items = frappe.get_all(
+        "Sales Order Item",
+        filters={"parent": source_name, "parenttype": "Sales Order"},
+        fields=["item_code", "qty"],
+    )
+    requested_quantities = get_requested_quantities(source_name)
+    service_items = get_service_items(item.item_code for item in so_items)
+
     def set_missing_values(source, target):
         """Set missing values and calculate Manager Approval Status"""
 
         # Check if there are remaining items that need Material Request
-        has_remaining_items = check_remaining_items(source_name)
+        has_remaining_items = _has_remaining_items(
+            so_items, requested_quantities, service_items
+        )
 
         # Set Manager Approval Status based on remaining items
         if has_remaining_items:
@@ -499,24 +557,8 @@ def make_material_request(source_name, target_doc=None):
     def update_item(source, target, source_parent):
         """Update item quantities based on what's already been requested"""
 
-        # Get the total quantity already requested for this item from this Sales Order
-        requested_qty = (
-            frappe.db.sql(
-                """
-            SELECT IFNULL(SUM(mri.qty), 0)
-            FROM `tabMaterial Request Item` mri
-            INNER JOIN `tabMaterial Request` mr ON mri.parent = mr.name
-            WHERE mr.custom_sales_order = %s
-                AND mri.item_code = %s
-                AND mr.docstatus < 2
-        """,
-                (source_parent.name, source.item_code),
-            )[0][0]
-            or 0
-        )
-
         # Calculate remaining quantity
-        remaining_qty = source.qty - requested_qty
+        remaining_qty = source.qty - requested_quantities.get(source.item_code, 0)
 
         # Set the quantity to remaining quantity
         target.qty = remaining_qty
@@ -528,27 +570,11 @@ def make_material_request(source_name, target_doc=None):
         """Check if item has remaining quantity to be requested"""
 
         # Exclude service items (parent item group is "Stitching" or "Labour")
-        if is_service_item(source.item_code):
+        if source.item_code in service_items:
             return False
 
-        # Get the total quantity already requested for this item from this Sales Order
-        requested_qty = (
-            frappe.db.sql(
-                """
-            SELECT IFNULL(SUM(mri.qty), 0)
-            FROM `tabMaterial Request Item` mri
-            INNER JOIN `tabMaterial Request` mr ON mri.parent = mr.name
-            WHERE mr.custom_sales_order = %s
-                AND mri.item_code = %s
-                AND mr.docstatus < 2
-        """,
-                (source_name, source.item_code),
-            )[0][0]
-            or 0
-        )
-
         # Calculate remaining quantity
-        remaining_qty = source.qty - requested_qty
+        remaining_qty = source.qty - requested_quantities.get(source.item_code, 0)
 
         # Only include items with remaining quantity > 0
         return remaining_qty > 0
@@ -586,6 +612,7 @@ def check_remaining_items(sales_order_name):
     """
     Check if there are remaining items in the Sales Order that need Material Request.
     Excludes service items (items with parent item group "Stitching" or "Labour").
+    Requested quantities are counted as in make_material_request, see _has_remaining_items.
 
     Args:
         sales_order_name (str): Sales Order name
@@ -594,38 +621,17 @@ def check_remaining_items(sales_order_name):
         bool: True if there are remaining non-service items, False otherwise
     """
 
-    # Get all items from Sales Order with their quantities
-    so_items = frappe.db.sql(
-        """
-        SELECT 
-            soi.item_code,
-            soi.qty as ordered_qty,
-            IFNULL(SUM(mri.qty), 0) as requested_qty
-        FROM `tabSales Order Item` soi
-        LEFT JOIN `tabMaterial Request Item` mri 
-            ON mri.item_code = soi.item_code 
-            AND mri.sales_order = %s
-        LEFT JOIN `tabMaterial Request` mr 
-            ON mri.parent = mr.name 
-            AND mr.docstatus < 2
-        WHERE soi.parent = %s
-        GROUP BY soi.item_code, soi.qty
-    """,
-        (sales_order_name, sales_order_name),
-        as_dict=True,
+    so_items = frappe.get_all(
+        "Sales Order Item",
+        filters={"parent": sales_order_name, "parenttype": "Sales Order"},
+        fields=["item_code", "qty"],
     )
 
-    # Check if any non-service item has remaining quantity
-    for item in so_items:
-        # Skip service items
-        if is_service_item(item.item_code):
-            continue
-
-        remaining_qty = item.ordered_qty - item.requested_qty
-        if remaining_qty > 0:
-            return True
-
-    return False
+    return _has_remaining_items(
+        so_items,
+        get_requested_quantities(sales_order_name),
+        get_service_items(item.item_code for item in so_items),
+    )
 
 
 @frappe.whitelist()
@@ -859,6 +865,10 @@ def send_delivery_ready_email(doc, customer_email):
         return False
 
 
+# Sales Orders with more item rows than this create their Material Requests in a background job
+MULTI_MATERIAL_REQUEST_SYNC_LIMIT = 100
+
+
 @frappe.whitelist()
 def create_multi_material_request(sales_order):
     """
@@ -866,11 +876,15 @@ def create_multi_material_request(sales_order):
     - Purchase type: for items with 'Is On Order Item' checked
     - Material Issue type: for all other items
 
+    Both Material Requests are created in one transaction: if either fails, neither is kept.
+    Orders with more than MULTI_MATERIAL_REQUEST_SYNC_LIMIT rows are handed to a background
+    job which reports progress and the result over realtime.
+
     Args:
         sales_order (str): Sales Order name
 
     Returns:
-        dict: Contains purchase_mr and issue_mr names
+        dict: Contains purchase_mr and issue_mr names (and queued=True for background runs)
     """
     try:
         # Get the Sales Order document
@@ -879,68 +893,140 @@ def create_multi_material_request(sales_order):
         if so_doc.docstatus != 1:
             frappe.throw(_("Sales Order must be submitted to create Material Requests"))
 
-        # Separate items based on 'Is On Order Item' field
-        purchase_items = []
-        issue_items = []
-
-        for item in so_doc.items:
-            # Skip service items
-            if is_service_item(item.item_code):
-                continue
-
-            # Check if item has 'Is On Order Item' checked
-            is_on_order = frappe.db.get_value(
-                "Item", item.item_code, "custom_is_onorder_item"
+        if len(so_doc.items) > MULTI_MATERIAL_REQUEST_SYNC_LIMIT:
+            frappe.enqueue(
+                "fabric_sense.fabric_sense.py.sales_order.create_multi_material_request_job",
+                queue="long",
+                timeout=1500,
+                job_id=f"multi_material_request::{sales_order}",
+                deduplicate=True,
+                enqueue_after_commit=True,
+                sales_order=sales_order,
             )
+            return {"purchase_mr": None, "issue_mr": None, "queued": True}
 
-            if is_on_order:
-                purchase_items.append(item)
-            else:
-                issue_items.append(item)
-
-        result = {"purchase_mr": None, "issue_mr": None}
+        return _create_multi_material_request(so_doc)
 
-        # Create Purchase Material Request if there are on-order items
-        if purchase_items:
-            purchase_mr = create_material_request_from_items(
-                so_doc, purchase_items, "Purchase"
-            )
-            if purchase_mr:
-                result["purchase_mr"] = purchase_mr.name
+    except frappe.ValidationError:
+        raise
+    except Exception as e:
+        frappe.log_error(
+            f"Error creating multi material request for {sales_order}: {str(e)}\n{frappe.get_traceback()}",
+            "Multi Material Request Error",
+        )
+        frappe.throw(_("Error creating Material Requests: {0}").format(str(e)))
 
-        # Create Material Issue Request for other items
-        if issue_items:
-            issue_mr = create_material_request_from_items(
-                so_doc, issue_items, "Material Issue"
-            )
-            if issue_mr:
-                result["issue_mr"] = issue_mr.name
 
-        return result
+def create_multi_material_request_job(sales_order):
+    """Background job for large Sales Orders, publishes the result to the requesting user."""
+    result = {"purchase_mr": None, "issue_mr": None}
+    error = None
 
+    try:
+        so_doc = frappe.get_doc("Sales Order", sales_order)
+        result = _create_multi_material_request(so_doc, publish_progress=True)
+        frappe.db.commit()
     except Exception as e:
+        frappe.db.rollback()
+        error = str(e)
         frappe.log_error(
-            f"Error creating multi material request for {sales_order}: {str(e)}\n{frappe.get_traceback()}",
+            f"Error creating multi material request for {sales_order}: {error}\n{frappe.get_traceback()}",
             "Multi Material Request Error",
         )
-        frappe.throw(_("Error creating Material Requests: {0}").format(str(e)))
 
+    frappe.publish_realtime(
+        "fabric_sense_multi_material_request",
+        {
+            "reference_doctype": "Sales Order",
+            "reference_name": sales_order,
+            "error": error,
+            **result,
+        },
+        user=frappe.session.user,
+    )
+
+
+def _create_multi_material_request(so_doc, publish_progress=False):
+    """Split the Sales Order items and create both Material Requests without committing."""
 
-def create_material_request_from_items(so_doc, items, material_request_type):
+    def progress(percent, description):
+        if publish_progress:
+            frappe.publish_progress(
+                percent,
+                title=_("Creating Material Requests"),
+                doctype="Sales Order",
+                docname=so_doc.name,
+                description=description,
+            )
+
+    item_codes = [item.item_code for item in so_doc.items]
+    service_items = get_service_items(item_codes)
+    item_attributes = get_item_attributes(item_codes)
+
+    # Separate items based on 'Is On Order Item' field
+    purchase_items = []
+    issue_items = []
+
+    for item in so_doc.items:
+        # Skip service items
+        if item.item_code in service_items:
+            continue
+
+        if (item_attributes.get(item.item_code) or {}).get("custom_is_onorder_item"):
+            purchase_items.append(item)
+        else:
+            issue_items.append(item)
+
+    progress(10, _("Split {0} items").format(len(purchase_items) + len(issue_items)))
+
+    # Approval status is decided once, before either Material Request exists
+    approval_status = "Approved" if check_remaining_items(so_doc.name) else "Pending"
+
+    result = {"purchase_mr": None, "issue_mr": None}
+
+    # Create Purchase Material Request if there are on-order items
+    if purchase_items:
+        result["purchase_mr"] = create_material_request_from_items(
+            so_doc, purchase_items, "Purchase", approval_status
+        ).name
+        progress(55, _("Created Purchase Material Request {0}").format(result["purchase_mr"]))
+
+    # Create Material Issue Request for other items
+    if issue_items:
+        result["issue_mr"] = create_material_request_from_items(
+            so_doc, issue_items, "Material Issue", approval_status
+        ).name
+        progress(100, _("Created Material Issue Request {0}").format(result["issue_mr"]))
+
+    return result
+
+
+def create_material_request_from_items(
+    so_doc, items, material_request_type, approval_status=None
+):
     """
-    Create a Material Request from given items.
+    Create and submit a Material Request from given items.
+
+    Does not commit; the caller owns the transaction so that all Material Requests
+    of one run are kept or rolled back together.
 
     Args:
         so_doc (Document): Sales Order document
         items (list): List of Sales Order Item rows
         material_request_type (str): "Purchase" or "Material Issue"
+        approval_status (str): Manager approval status, computed from remaining items if omitted
 
     Returns:
-        Document: Created Material Request document or None
+        Document: Created Material Request document or None if there are no items
     """
     if not items:
         return None
 
+    if approval_status is None:
+        approval_status = (
+            "Approved" if check_remaining_items(so_doc.name) else "Pending"
+        )
+
     try:
         # Create Material Request
         mr_doc = frappe.new_doc("Material Request")
@@ -951,11 +1037,8 @@ def create_material_request_from_items(so_doc, items, material_request_type):
         mr_doc.custom_sales_order = so_doc.name
 
         # Set approval status based on whether it's first or additional request
-        has_remaining_items = check_remaining_items(so_doc.name)
-        if has_remaining_items:
-            mr_doc.custom_manager_approval_status = "Approved"
-        else:
-            mr_doc.custom_manager_approval_status = "Pending"
+        mr_doc.custom_manager_approval_status = approval_status
+        if approval_status == "Pending":
             mr_doc.custom_is_additional = 1
 
         # Add items to Material Request
@@ -976,8 +1059,6 @@ def create_material_request_from_items(so_doc, items, material_request_type):
         mr_doc.insert()
         mr_doc.submit()
 
-        frappe.db.commit()
-
         return mr_doc
 
     except Exception as e:
@@ -985,4 +1066,4 @@ def create_material_request_from_items(so_doc, items, material_request_type):
             f"Error creating {material_request_type} Material Request: {str(e)}\n{frappe.get_traceback()}",
             f"Create {material_request_type} MR Error",
         )
-        return None
+        raise
@@ -1,8 +1,150 @@
+import time
+
 import frappe # type: ignore
 from frappe import _ # type: ignore
 from frappe.utils import now_datetime, get_datetime, formatdate # type: ignore
 from erpnext.projects.doctype.task.task import Task # type: ignore
 
+from fabric_sense.fabric_sense.doctype.services.services import (
+    get_service_rate_matrix,
+    get_service_rates,
+)
+from fabric_sense.fabric_sense.doctype.tailoring_sheet.tailoring_sheet import (
+    MEASUREMENT_MATERIAL_FIELDS,
+    TAILORING_SERVICE_ITEM_GROUPS,
+)
+from fabric_sense.fabric_sense.py.item_attributes import get_item_attributes
+from fabric_sense.fabric_sense.py.material_fulfilment import get_ledger_quantities
+from fabric_sense.fabric_sense.py.sales_order import get_service_items
+
+
+# Task fields whose changes the save pipeline tracks
+TASK_TRACKED_FIELDS = (
+    "status",
+    "custom_service",
+    "custom_assigned_contractor",
+    "custom_quantity",
+    "custom_travelling_charge",
+)
+
+# Employee fields used to address the assigned contractor
+CONTRACTOR_EMAIL_FIELDS = [
+    "company_email",
+    "personal_email",
+    "prefered_email",
+    "prefered_contact_email",
+]
+
+
+def run_task_before_save(doc, method=None):
+    """
+    Single ordered before_save pipeline for Task.
+
+    Computes the save context once (see get_task_save_context) and runs the prefill,
+    working, completed and notify stages against it. With `fabric_sense_debug_task_pipeline`
+    set in site config, the time spent in every stage is logged.
+    """
+    get_task_save_context(doc)
+    _run_task_stages(
+        doc,
+        method,
+        (
+            prefill_from_tailoring_sheet_and_service,
+            handle_status_change_to_working,
+            handle_status_change_to_completed,
+            notify_assigned_contractor,
+        ),
+    )
+
+
+def run_task_on_update(doc, method=None):
+    """on_update pipeline for Task, reusing the context computed before save."""
+    try:
+        _run_task_stages(
+            doc,
+            method,
+            (enqueue_contractor_accounting,),
+        )
+    finally:
+        # The same document object may be saved again
+        doc.flags.pop("fabric_sense_task_context", None)
+
+
+def _run_task_stages(doc, method, stages):
+    debug = frappe.conf.get("fabric_sense_debug_task_pipeline")
+    timings = []
+
+    for stage in stages:
+        start = time.perf_counter()
+        stage(doc, method)
+        if debug:
+            timings.append(f"{stage.__name__}={(time.perf_counter() - start) * 1000:.1f}ms")
+
+    if debug:
+        frappe.logger("fabric_sense").info(
+            f"Task {doc.name} {method}: {', '.join(timings)}"
+        )
+
+
+def get_task_save_context(doc):
+    """
+    Status transition, changed fields and shared masters of the Task being saved.
+
+    Computed once per save and kept on doc.flags, so every stage reads the document
+    before save, the Services entry and the contractor record only once.
+
+    Returns:
+        frappe._dict: is_new, old_status, changed_fields, service (rate matrix entry or None)
+            and contractor (Employee row with name and emails, loaded when it changed)
+    """
+    ctx = doc.flags.get("fabric_sense_task_context")
+    if ctx is not None:
+        return ctx
+
+    is_new = doc.is_new()
+    old_doc = None if is_new else doc.get_doc_before_save()
+
+    if old_doc:
+        changed_fields = {
+            field for field in TASK_TRACKED_FIELDS if old_doc.get(field) != doc.get(field)
+        }
+    else:
+        changed_fields = {field for field in TASK_TRACKED_FIELDS if doc.get(field)}
+
+    contractor = None
+    if doc.get("custom_assigned_contractor") and "custom_assigned_contractor" in changed_fields:
+        contractor = frappe.db.get_value(
+            "Employee",
+            doc.custom_assigned_contractor,
+            ["employee_name", "user_id", *CONTRACTOR_EMAIL_FIELDS],
+            as_dict=True,
+        )
+
+    ctx = frappe._dict(
+        is_new=is_new,
+        old_status=old_doc.get("status") if old_doc else None,
+        changed_fields=changed_fields,
+        service=get_service_rate_matrix().get(doc.get("custom_service"))
+        if doc.get("custom_service")
+        else None,
+        contractor=contractor,
+        service_rates={},
+    )
+    doc.flags.fabric_sense_task_context = ctx
+    return ctx
+
+
+def _get_context_service_rate(doc, ctx, show_message=True):
+    """Service rate for the Task's service and contractor, looked up once per save."""
+    key = (doc.custom_service, doc.custom_assigned_contractor)
+    if key not in ctx.service_rates:
+        ctx.service_rates[key] = get_service_rate(
+            service=doc.custom_service,
+            contractor=doc.custom_assigned_contractor,
+            show_message=show_message,
+        )
+    return ctx.service_rates[key]
+
 
 def prefill_from_tailoring_sheet_and_service(doc, method=None):
     """
@@ -10,16 +152,18 @@ def prefill_from_tailoring_sheet_and_service(doc, method=None):
 
     - If service + contractor are set and service rate is empty, fetch rate and compute charges.
     """
+    ctx = get_task_save_context(doc)
+
     # 1) Prefill UOM from Services if service is selected
     if hasattr(doc, "custom_service") and doc.custom_service:
         try:
-            services_doc = frappe.get_doc("Services", doc.custom_service)
-            if hasattr(services_doc, "uom") and services_doc.uom:
+            service_uom = (ctx.service or {}).get("uom")
+            if service_uom:
                 # Try multiple possible field names for UOM
                 uom_field_names = ["custom_unit", "unit", "custom_uom", "uom"]
                 for field_name in uom_field_names:
                     if hasattr(doc, field_name) and not doc.get(field_name):
-                        setattr(doc, field_name, services_doc.uom)
+                        setattr(doc, field_name, service_uom)
                         break
         except Exception as e:
             frappe.log_error(
@@ -33,10 +177,7 @@ def prefill_from_tailoring_sheet_and_service(doc, method=None):
         hasattr(doc, "custom_assigned_contractor") and doc.custom_assigned_contractor
     )
     if has_service and has_contractor:
-        service_rate = get_service_rate(
-            service=doc.custom_service,
-            contractor=doc.custom_assigned_contractor,
-        )
+        service_rate = _get_context_service_rate(doc, ctx)
 
         # Compute charges if fields exist
         quantity = (hasattr(doc, "custom_quantity") and doc.custom_quantity) or 1.0
@@ -72,15 +213,11 @@ def handle_status_change_to_working(doc, method=None):
     if doc.status != "Working":
         return
 
-    # Get old status from document before save
-    old_status = None
-    if not doc.is_new():
-        old_doc = doc.get_doc_before_save()
-        if old_doc:
-            old_status = old_doc.get("status")
+    ctx = get_task_save_context(doc)
+    old_status = ctx.old_status
 
     # Only proceed if status changed from Open to Working (or if new document with Working status)
-    if doc.is_new():
+    if ctx.is_new:
         # New document with Working status
         pass
     elif old_status == "Open":
@@ -128,15 +265,11 @@ def handle_status_change_to_completed(doc, method=None):
     if doc.status != "Completed":
         return
 
-    # Get old status from document before save
-    old_status = None
-    if not doc.is_new():
-        old_doc = doc.get_doc_before_save()
-        if old_doc:
-            old_status = old_doc.get("status")
+    ctx = get_task_save_context(doc)
+    old_status = ctx.old_status
 
     # Only proceed if status changed from Working to Completed
-    if doc.is_new():
+    if ctx.is_new:
         # New document with Completed status - skip (shouldn't happen in normal flow)
         return
     elif old_status == "Working":
@@ -162,9 +295,7 @@ def handle_status_change_to_completed(doc, method=None):
         and doc.custom_assigned_contractor
     ):
         # Get service rate for the selected contractor and service
-        service_rate = get_service_rate(
-            service=doc.custom_service, contractor=doc.custom_assigned_contractor
-        )
+        service_rate = _get_context_service_rate(doc, ctx)
 
         # 3. Calculate Service Charge = Service Rate × Quantity
         quantity = (hasattr(doc, "custom_quantity") and doc.custom_quantity) or 1.0
@@ -185,12 +316,14 @@ def handle_status_change_to_completed(doc, method=None):
         doc.custom_total_contractor_amount = total_contractor_amount
 
 
-def create_contractor_payment_history(doc, method=None):
+def enqueue_contractor_accounting(doc, method=None):
     """
-    Create Contractor Payment History when task status changes to Completed.
+    Queue the Contractor Payment History and Journal Entry of a completed Task.
 
-    This function is called via hooks when a Task is saved.
-    It checks if the status changed to "Completed" and creates a payment history record.
+    Runs in on_update. The prerequisites are checked here so the user still sees what is
+    missing; the postings themselves happen in post_contractor_accounting after the Task
+    is committed. The job is keyed by task name, so a repeated save or retry queues
+    nothing new and the job itself skips records that already exist.
 
     Args:
         doc: Task document
@@ -200,206 +333,353 @@ def create_contractor_payment_history(doc, method=None):
     if doc.status != "Completed":
         return
 
-    # Check if status actually changed to Completed
-    if not doc.is_new():
-        old_doc = doc.get_doc_before_save()
-        if old_doc and old_doc.status == "Completed":
-            # Status was already Completed, no need to create payment history again
-            return
+    # Bulk completion posts the accounting for all its tasks itself
+    if doc.flags.skip_contractor_accounting:
+        return
 
-    # Check if payment record already exists for this task
-    existing = frappe.db.exists("Contractor Payment History", {"task": doc.name})
+    # Check if status actually changed to Completed
+    if get_task_save_context(doc).old_status == "Completed":
+        # Status was already Completed, no need to post again
+        return
 
-    if existing:
+    if not _can_create_contractor_payment_history(doc, show_message=True):
         return
+    _can_create_journal_entry(doc, show_message=True)
+
+    frappe.enqueue(
+        "fabric_sense.fabric_sense.py.task.post_contractor_accounting",
+        queue="short",
+        job_id=f"contractor_accounting::{doc.name}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        task=doc.name,
+    )
+
+    frappe.msgprint(
+        _("Contractor payment is being posted in the background"),
+        indicator="blue",
+        alert=True,
+    )
+
+
+def post_contractor_accounting(task):
+    """
+    Background job: create the Contractor Payment History and the Journal Entry of a Task.
+
+    Both records are created in one transaction, so a failed Journal Entry never leaves
+    a payment history row behind. Records that already exist are reused, which makes
+    retries idempotent. The outcome is published on the
+    `fabric_sense_contractor_accounting` realtime event.
+
+    Args:
+        task (str): Task name
+    """
+    result = {"task": task, "payment_history": None, "journal_entry": None, "error": None}
+
+    try:
+        # Lock the Task row so overlapping retries run one after the other
+        frappe.db.get_value("Task", task, "name", for_update=True)
+        doc = frappe.get_doc("Task", task)
+
+        if doc.status == "Completed" and _can_create_contractor_payment_history(doc):
+            result["payment_history"] = _create_contractor_payment_history(doc)
+            if _can_create_journal_entry(doc):
+                result["journal_entry"] = _create_journal_entry_for_task(doc)
+
+        frappe.db.commit()
 
+    except Exception as e:
+        frappe.db.rollback()
+        result = {"task": task, "payment_history": None, "journal_entry": None, "error": str(e)}
+        frappe.log_error(
+            frappe.get_traceback(), "Task: Contractor Accounting Failed"
+        )
+
+    frappe.publish_realtime(
+        "fabric_sense_contractor_accounting",
+        result,
+        doctype="Task",
+        docname=task,
+    )
+
+    return result
+
+
+def _can_create_contractor_payment_history(doc, show_message=False):
+    """Check that a contractor and a positive payment amount are set."""
     # Check if contractor is assigned
     if not doc.custom_assigned_contractor:
-        frappe.msgprint(
-            _("No contractor assigned to this task. Payment history not created."),
-            indicator="orange",
-            alert=True,
-        )
-        return
+        if show_message:
+            frappe.msgprint(
+                _("No contractor assigned to this task. Payment history not created."),
+                indicator="orange",
+                alert=True,
+            )
+        return False
 
     # Check if payment amount is set
     payment_amount = doc.custom_total_contractor_amount or 0
 
     if not payment_amount or payment_amount <= 0:
-        frappe.msgprint(
-            _("Payment amount not set for this task. Payment history not created."),
-            indicator="orange",
-            alert=True,
-        )
-        return
+        if show_message:
+            frappe.msgprint(
+                _("Payment amount not set for this task. Payment history not created."),
+                indicator="orange",
+                alert=True,
+            )
+        return False
 
-    # Create payment history record
-    try:
-        payment_history = frappe.get_doc(
-            {
-                "doctype": "Contractor Payment History",
-                "task": doc.name,
-                "project": doc.project,
-                "contractor": doc.custom_assigned_contractor,
-                "amount": payment_amount,
-                "status": "Unpaid",
-                "amount_paid": 0,
-                "payable_account": doc.custom_payable_account
-            }
-        )
+    return True
 
-        payment_history.insert(ignore_permissions=True)
-        frappe.db.commit()
 
-        frappe.msgprint(
-            _("Contractor Payment History created: {0}").format(
-                frappe.get_desk_link("Contractor Payment History", payment_history.name)
-            ),
-            indicator="green",
-            alert=True,
-        )
+def _can_create_journal_entry(doc, show_message=False):
+    """Check that the payable account, expense account and company are known."""
+    message = None
 
-    except Exception as e:
-        frappe.log_error(
-            frappe.get_traceback(), "Create Contractor Payment History Failed"
-        )
-        frappe.msgprint(
-            _("Failed to create payment history: {0}").format(str(e)),
-            indicator="red",
-            alert=True,
-        )
+    # Get payable account from task
+    if not doc.custom_payable_account:
+        message = _("Payable account not set for this task. Journal Entry not created.")
+    elif not doc.custom_expense_account:
+        message = _("Expense account not set for this task. Journal Entry not created.")
+    elif not _get_task_company(doc):
+        message = _("Company not found. Journal Entry not created.")
+
+    if message and show_message:
+        frappe.msgprint(message, indicator="orange", alert=True)
+
+    return not message
+
+
+def _get_task_company(doc):
+    # Get company from task
+    return doc.company if hasattr(doc, "company") and doc.company else frappe.defaults.get_user_default("Company")
+
+
+def _create_contractor_payment_history(doc):
+    """Insert the Contractor Payment History of a Task unless it exists. Does not commit."""
+    # Check if payment record already exists for this task
+    existing = frappe.db.exists("Contractor Payment History", {"task": doc.name})
+    if existing:
+        return existing
+
+    payment_history = frappe.get_doc(
+        {
+            "doctype": "Contractor Payment History",
+            "task": doc.name,
+            "project": doc.project,
+            "contractor": doc.custom_assigned_contractor,
+            "amount": doc.custom_total_contractor_amount,
+            "status": "Unpaid",
+            "amount_paid": 0,
+            "payable_account": doc.custom_payable_account
+        }
+    )
+    payment_history.insert(ignore_permissions=True)
+
+    return payment_history.name
 
 
-def create_journal_entry_for_completed_task(doc, method=None):
+def _create_journal_entry_for_task(doc):
     """
-    Create and submit Journal Entry when task status changes to Completed.
+    Insert and submit the Journal Entry of a Task unless it exists. Does not commit.
 
-    This function is called via hooks when a Task is saved.
-    It checks if the status changed to "Completed" and creates a journal entry record
-    with debit to expense account and credit to payable account (contractor liability).
-    The Journal Entry is automatically submitted.
+    Debits the expense account and credits the payable account (contractor liability).
+    """
+    # Check if journal entry already exists for this task
+    existing = _get_task_journal_entry(doc.name)
+    if existing:
+        return existing
+
+    payment_amount = doc.custom_total_contractor_amount
+    journal_entry = frappe.get_doc(
+        {
+            "doctype": "Journal Entry",
+            "company": _get_task_company(doc),
+            "posting_date": frappe.utils.today(),
+            "custom_task": doc.name,
+            "user_remark": f"Journal Entry for Task {doc.name} - {doc.subject or ''}",
+            "accounts": [
+                {
+                    "account": doc.custom_expense_account,
+                    "debit_in_account_currency": payment_amount,
+                    "credit_in_account_currency": 0,
+                    "custom_task": doc.name,
+                },
+                {
+                    "account": doc.custom_payable_account,
+                    "party_type": "Employee",
+                    "party": doc.custom_assigned_contractor,
+                    "debit_in_account_currency": 0,
+                    "credit_in_account_currency": payment_amount,
+                    "custom_task": doc.name,
+                }
+            ]
+        }
+    )
 
-    Args:
-        doc: Task document
-        method: Event method name
+    journal_entry.insert(ignore_permissions=True)
+
+    # Submit the Journal Entry automatically
+    journal_entry.submit()
+
+    return journal_entry.name
+
+
+def _get_task_journal_entry(task):
+    """Journal Entry already posted for a task, on its own or as part of a bulk completion."""
+    return frappe.db.exists("Journal Entry", {"custom_task": task}) or frappe.db.get_value(
+        "Journal Entry Account",
+        {"custom_task": task, "parenttype": "Journal Entry", "docstatus": ["<", 2]},
+        "parent",
+    )
+
+
+@frappe.whitelist()
+def complete_tasks(tasks):
     """
-    # Only process if status is Completed
-    if doc.status != "Completed":
-        return
+    Complete several Working tasks at once and post their contractor accounting together.
 
-    # Check if status actually changed to Completed
-    if not doc.is_new():
-        old_doc = doc.get_doc_before_save()
-        if old_doc and old_doc.status == "Completed":
-            # Status was already Completed, no need to create journal entry again
-            return
+    All tasks are validated first and nothing is changed if any of them fails. Service
+    charges come from the cached rate matrix. One Journal Entry is submitted per contractor
+    and company, with an expense / payable line pair per task carrying custom_task, and
+    all Contractor Payment History records are created in the same transaction.
 
-    # Check if journal entry already exists for this task
-    existing = frappe.db.exists("Journal Entry", {"custom_task": doc.name})
+    Args:
+        tasks (str|list): Task names (JSON list from the client)
 
-    if existing:
-        return
+    Returns:
+        dict: completed (task names), journal_entries and payment_histories
+    """
+    if isinstance(tasks, str):
+        tasks = frappe.parse_json(tasks)
+    tasks = list(dict.fromkeys(tasks or []))
+    if not tasks:
+        frappe.throw(_("Please select Tasks to complete"))
+
+    docs = [frappe.get_doc("Task", task) for task in tasks]
+    service_rates = get_service_rates(
+        (doc.get("custom_service"), doc.get("custom_assigned_contractor")) for doc in docs
+    )
 
-    # Check if contractor is assigned
-    if not doc.custom_assigned_contractor:
-        frappe.msgprint(
-            _("No contractor assigned to this task. Journal Entry not created."),
-            indicator="orange",
-            alert=True,
+    errors = []
+    for doc in docs:
+        error = _validate_task_for_bulk_completion(doc, service_rates)
+        if error:
+            errors.append(f"{doc.name}: {error}")
+
+    if errors:
+        frappe.throw(
+            _("These Tasks cannot be completed:") + "<br>" + "<br>".join(errors),
+            title=_("Bulk Task Completion"),
         )
-        return
 
-    # Check if payment amount is set
-    payment_amount = doc.custom_total_contractor_amount or 0
+    # Save the tasks without queuing one accounting job each, the postings are batched below
+    for doc in docs:
+        doc.status = "Completed"
+        doc.flags.skip_contractor_accounting = True
+        doc.save()
+
+    journal_entries = []
+    for (contractor, company), group in _group_tasks_by_contractor_and_company(docs).items():
+        journal_entry = _create_consolidated_journal_entry(contractor, company, group)
+        if journal_entry:
+            journal_entries.append(journal_entry)
+
+    # Tasks without a positive amount get no Journal Entry, and no payment history either
+    payment_histories = [
+        _create_contractor_payment_history(doc)
+        for doc in docs
+        if _can_create_contractor_payment_history(doc)
+    ]
 
-    if not payment_amount or payment_amount <= 0:
-        frappe.msgprint(
-            _("Payment amount not set for this task. Journal Entry not created."),
-            indicator="orange",
-            alert=True,
-        )
-        return
+    return {
+        "completed": [doc.name for doc in docs],
+        "journal_entries": journal_entries,
+        "payment_histories": payment_histories,
+    }
 
-    # Get payable account from task or use default
-    payable_account = doc.custom_payable_account
-    if not payable_account:
-        frappe.msgprint(
-            _("Payable account not set for this task. Journal Entry not created."),
-            indicator="orange",
-            alert=True,
-        )
-        return
-    
-    expense_account = doc.custom_expense_account
-    if not expense_account:
-        frappe.msgprint(
-            _("Expense account not set for this task. Journal Entry not created."),
-            indicator="orange",
-            alert=True,
+
+def _validate_task_for_bulk_completion(doc, service_rates):
+    """Return why a task cannot be bulk completed, or None."""
+    if not frappe.has_permission("Task", "write", doc):
+        return _("Not permitted")
+    if doc.status != "Working":
+        return _("Status must be Working, not {0}").format(doc.status)
+    if not doc.get("custom_service"):
+        return _("Service not set")
+    if not doc.get("custom_assigned_contractor"):
+        return _("No contractor assigned")
+    if not service_rates.get((doc.custom_service, doc.custom_assigned_contractor)):
+        return _("Service rate not found for contractor {0} in service {1}").format(
+            doc.custom_assigned_contractor, doc.custom_service
         )
-        return
+    if not doc.custom_payable_account:
+        return _("Payable account not set")
+    if not doc.custom_expense_account:
+        return _("Expense account not set")
+    if not _get_task_company(doc):
+        return _("Company not found")
+    return None
 
 
-    # Get company from task
-    company = doc.company if hasattr(doc, "company") and doc.company else frappe.defaults.get_user_default("Company")
-    
-    if not company:
-        frappe.msgprint(
-            _("Company not found. Journal Entry not created."),
-            indicator="orange",
-            alert=True,
-        )
-        return
+def _group_tasks_by_contractor_and_company(docs):
+    groups = {}
+    for doc in docs:
+        # Tasks already posted individually are left alone
+        if _get_task_journal_entry(doc.name):
+            continue
+        if not doc.custom_total_contractor_amount or doc.custom_total_contractor_amount <= 0:
+            continue
+        groups.setdefault(
+            (doc.custom_assigned_contractor, _get_task_company(doc)), []
+        ).append(doc)
+    return groups
 
-    # Create journal entry record
-    try:
-        journal_entry = frappe.get_doc(
-            {
-                "doctype": "Journal Entry",
-                "company": company,
-                "posting_date": frappe.utils.today(),
-                "custom_task": doc.name,
-                "user_remark": f"Journal Entry for Task {doc.name} - {doc.subject or ''}",
-                "accounts": [
-                    {
-                        "account": expense_account,
-                        "debit_in_account_currency": payment_amount,
-                        "credit_in_account_currency": 0,
-                    },
-                    {
-                        "account": payable_account,
-                        "party_type": "Employee",
-                        "party": doc.custom_assigned_contractor,
-                        "debit_in_account_currency": 0,
-                        "credit_in_account_currency": payment_amount,
-                    }
-                ]
-            }
-        )
 
-        journal_entry.insert(ignore_permissions=True)
-        
-        # Submit the Journal Entry automatically
-        journal_entry.submit()
-        frappe.db.commit()
+def _create_consolidated_journal_entry(contractor, company, docs):
+    """
+    Insert and submit one Journal Entry for several tasks of a contractor. Does not commit.
 
-        frappe.msgprint(
-            _("Journal Entry created and submitted: {0}").format(
-                frappe.get_desk_link("Journal Entry", journal_entry.name)
-            ),
-            indicator="green",
-            alert=True,
+    Each task gets its own expense debit and payable credit rows, tagged with custom_task.
+    """
+    accounts = []
+    for doc in docs:
+        accounts.extend(
+            [
+                {
+                    "account": doc.custom_expense_account,
+                    "debit_in_account_currency": doc.custom_total_contractor_amount,
+                    "credit_in_account_currency": 0,
+                    "custom_task": doc.name,
+                },
+                {
+                    "account": doc.custom_payable_account,
+                    "party_type": "Employee",
+                    "party": contractor,
+                    "debit_in_account_currency": 0,
+                    "credit_in_account_currency": doc.custom_total_contractor_amount,
+                    "custom_task": doc.name,
+                },
+            ]
         )
 
-    except Exception as e:
-        frappe.log_error(
-            frappe.get_traceback(), "Create Journal Entry for Task Failed"
-        )
-        frappe.msgprint(
-            _("Failed to create journal entry: {0}").format(str(e)),
-            indicator="red",
-            alert=True,
-        )
+    journal_entry = frappe.get_doc(
+        {
+            "doctype": "Journal Entry",
+            "company": company,
+            "posting_date": frappe.utils.today(),
+            # A single task keeps the header link used by the one-by-one flow
+            "custom_task": docs[0].name if len(docs) == 1 else None,
+            "user_remark": "Journal Entry for Tasks {0}".format(
+                ", ".join(doc.name for doc in docs)
+            ),
+            "accounts": accounts,
+        }
+    )
+    journal_entry.insert(ignore_permissions=True)
+    journal_entry.submit()
+
+    return journal_entry.name
 
 
 def get_service_rate(service, contractor, show_message=True):
@@ -415,13 +695,13 @@ def get_service_rate(service, contractor, show_message=True):
         float: Service rate, or 0.0 if not found
     """
     try:
-        # Get the Services document
-        services_doc = frappe.get_doc("Services", service)
+        # Look the rate up in the cached (service, contractor) matrix
+        service_rates = get_service_rate_matrix().get(service)
+        if service_rates is None:
+            raise frappe.DoesNotExistError
 
-        # Search for the contractor in the contractors child table
-        for contractor_row in services_doc.contractors:
-            if contractor_row.contractor == contractor:
-                return float(contractor_row.rate or 0.0)
+        if contractor in service_rates["rates"]:
+            return float(service_rates["rates"][contractor] or 0.0)
 
         # If contractor not found in the service, return 0
         if show_message:
@@ -473,10 +753,8 @@ def get_service_rate_and_calculate_charges(
 
     if service:
         try:
-            # Get UOM from Services doctype
-            services_doc = frappe.get_doc("Services", service)
-            if hasattr(services_doc, "uom") and services_doc.uom:
-                uom = services_doc.uom
+            # Get UOM from the cached Services matrix
+            uom = (get_service_rate_matrix().get(service) or {}).get("uom") or None
         except Exception as e:
             frappe.log_error(
                 message=f"Error fetching UOM from Services: {str(e)}",
@@ -497,58 +775,6 @@ def get_service_rate_and_calculate_charges(
     }
 
 
-def is_service_item(item_code):
-    """
-    Check if an item should be excluded from Material Request.
-    Items are excluded if their parent item group is "Stitching" or "Labour".
-
-    Args:
-        item_code (str): Item code to check
-
-    Returns:
-        bool: True if item should be excluded (is a service item), False otherwise
-    """
-    try:
-        # Get item's item_group
-        item_group = frappe.db.get_value("Item", item_code, "item_group")
-        if not item_group:
-            return False
-
-        # Check if item_group is "Stitching" or "Labour" (root level)
-        if item_group in ["Stitching", "Labour"]:
-            return True
-
-        # Check if item_group starts with "Stitching/" or "Labour/" (child groups stored as paths)
-        if item_group.startswith("Stitching/") or item_group.startswith("Labour/"):
-            return True
-
-        # Check parent_item_group if item_group is a child
-        # In ERPNext, hierarchical item groups can be stored as "Parent/Child"
-        # or we can check the parent_item_group field of the Item Group
-        try:
-            # Try to get Item Group by the full path first
-            if frappe.db.exists("Item Group", item_group):
-                item_group_doc = frappe.get_doc("Item Group", item_group)
-                if (
-                    hasattr(item_group_doc, "parent_item_group")
-                    and item_group_doc.parent_item_group
-                ):
-                    parent_group = item_group_doc.parent_item_group
-                    if parent_group in ["Stitching", "Labour"]:
-                        return True
-        except Exception:
-            # If getting Item Group fails, try to extract parent from path
-            # For paths like "Stitching/Curtain Stitching", check if first part is Stitching or Labour
-            if "/" in item_group:
-                parent_from_path = item_group.split("/")[0]
-                if parent_from_path in ["Stitching", "Labour"]:
-                    return True
-
-        return False
-    except Exception:
-        # If there's any error checking, don't exclude the item
-        return False
-
 
 def extract_items_from_tailoring_sheet(tailoring_sheet_name):
     """
@@ -569,63 +795,50 @@ def extract_items_from_tailoring_sheet(tailoring_sheet_name):
         frappe.ValidationError: If Tailoring Sheet has no items
     """
     try:
-        # Fetch Tailoring Sheet document
-        tailoring_sheet = frappe.get_doc("Tailoring Sheet", tailoring_sheet_name)
+        if not frappe.db.exists("Tailoring Sheet", tailoring_sheet_name):
+            raise frappe.DoesNotExistError
 
         # Dictionary to store aggregated quantities by item_code
         item_quantities = {}
 
+        # Read measurement_details rows directly, without loading the Tailoring Sheet
+        measurement_rows = frappe.get_all(
+            "Tailoring Measurement Details",
+            filters={
+                "parent": tailoring_sheet_name,
+                "parenttype": "Tailoring Sheet",
+                "parentfield": "measurement_details",
+            },
+            fields=[field for fields in MEASUREMENT_MATERIAL_FIELDS for field in fields[:2]],
+            order_by="idx asc",
+        )
+
         # Validate measurement_details exists and has items
-        if (
-            not hasattr(tailoring_sheet, "measurement_details")
-            or not tailoring_sheet.measurement_details
-        ):
+        if not measurement_rows:
             frappe.throw(
                 _(
                     "Tailoring Sheet has no items to create Material Request. Please add items in measurement_details."
                 )
             )
 
-        # Extract items from measurement_details
-        for row in tailoring_sheet.measurement_details:
-            # Fabric Selected
-            if (
-                row.fabric_selected
-                and row.final_fabric_quantity
-                and row.final_fabric_quantity > 0
-            ):
-                if row.fabric_selected not in item_quantities:
-                    item_quantities[row.fabric_selected] = 0.0
-                item_quantities[row.fabric_selected] += float(row.final_fabric_quantity)
-
-            # Lining
-            if (
-                row.lining
-                and row.final_lining_quantity
-                and row.final_lining_quantity > 0
-            ):
-                if row.lining not in item_quantities:
-                    item_quantities[row.lining] = 0.0
-                item_quantities[row.lining] += float(row.final_lining_quantity)
-
-            # Lead Rope
-            if row.lead_rope and row.lead_rope_qty and row.lead_rope_qty > 0:
-                if row.lead_rope not in item_quantities:
-                    item_quantities[row.lead_rope] = 0.0
-                item_quantities[row.lead_rope] += float(row.lead_rope_qty)
-
-            # Track/Rod
-            if row.track_rod and row.track_rod_qty and row.track_rod_qty > 0:
-                if row.track_rod not in item_quantities:
-                    item_quantities[row.track_rod] = 0.0
-                item_quantities[row.track_rod] += float(row.track_rod_qty)
+        # Extract fabric, lining, lead rope and track/rod items from measurement_details
+        for row in measurement_rows:
+            for item_field, qty_field, _uom in MEASUREMENT_MATERIAL_FIELDS:
+                item_code = row.get(item_field)
+                qty = row.get(qty_field)
+                if item_code and qty and qty > 0:
+                    if item_code not in item_quantities:
+                        item_quantities[item_code] = 0.0
+                    item_quantities[item_code] += float(qty)
 
         # Convert to list of dictionaries, excluding service items
-        items = []
-        for item_code, qty in item_quantities.items():
-            # Skip service items (parent item group is "Stitching" or "Labour")
-            if not is_service_item(item_code):
-                items.append({"item_code": item_code, "qty": qty})
+        # (parent item group is "Stitching" or "Labour"), classified in one batch
+        service_items = get_service_items(item_quantities, TAILORING_SERVICE_ITEM_GROUPS)
+        items = [
+            {"item_code": item_code, "qty": qty}
+            for item_code, qty in item_quantities.items()
+            if item_code not in service_items
+        ]
 
         # Validate that we have at least one item
         if not items:
@@ -691,21 +904,16 @@ def get_or_create_material_request_for_task(tailoring_sheet):
         if material_request:
             # Check if it's submitted
             if material_request.docstatus == 1:
-                # Material Request is submitted, return it
-                mr_doc = frappe.get_doc("Material Request", material_request.name)
-                items = []
-
-                for item in mr_doc.items:
-                    items.append(
-                        {
-                            "item_code": item.item_code,
-                            "qty": item.qty,
-                            "uom": item.uom,
-                            "item_name": item.item_name,
-                            "description": item.description,
-                            "name": item.name,  # Row name for linking
-                        }
-                    )
+                # Material Request is submitted, return its rows (name is the row name for linking)
+                items = frappe.get_all(
+                    "Material Request Item",
+                    filters={
+                        "parent": material_request.name,
+                        "parenttype": "Material Request",
+                    },
+                    fields=["item_code", "qty", "uom", "item_name", "description", "name"],
+                    order_by="idx asc",
+                )
 
                 return {
                     "material_request_name": material_request.name,
@@ -735,15 +943,12 @@ def get_or_create_material_request_for_task(tailoring_sheet):
             }
         )
 
+        # Item metadata was loaded in one query while classifying service items
+        item_attributes = get_item_attributes(item["item_code"] for item in items)
+
         # Add items to Material Request
         for item in items:
-            # Get item details for UOM
-            item_doc = frappe.get_doc("Item", item["item_code"])
-            default_uom = (
-                item_doc.stock_uom
-                if hasattr(item_doc, "stock_uom") and item_doc.stock_uom
-                else "Nos"
-            )
+            default_uom = (item_attributes.get(item["item_code"]) or {}).get("stock_uom") or "Nos"
 
             mr_doc.append(
                 "items",
@@ -811,27 +1016,18 @@ def get_material_request_items_for_stock_entry(tailoring_sheet):
     try:
         # Get all Material Requests (type "Material Issue" or "Purchase") linked to this Tailoring Sheet
         # Prioritize submitted MRs, but include drafts if no submitted ones exist
-        submitted_mrs = frappe.get_all(
-            "Material Request",
-            filters={
-                "custom_tailoring_sheet": tailoring_sheet,
-                "material_request_type": ["in", ["Material Issue", "Purchase"]],
-                "docstatus": 1,  # Submitted
-            },
-            fields=["name", "docstatus"],
-            order_by="creation desc",
-        )
-
-        draft_mrs = frappe.get_all(
+        linked_mrs = frappe.get_all(
             "Material Request",
             filters={
                 "custom_tailoring_sheet": tailoring_sheet,
                 "material_request_type": ["in", ["Material Issue", "Purchase"]],
-                "docstatus": 0,  # Draft
+                "docstatus": ["<", 2],
             },
             fields=["name", "docstatus"],
             order_by="creation desc",
         )
+        submitted_mrs = [mr for mr in linked_mrs if mr.docstatus == 1]
+        draft_mrs = [mr for mr in linked_mrs if mr.docstatus == 0]
 
         # Use submitted MRs if available, otherwise use draft MRs
         material_requests = submitted_mrs if submitted_mrs else draft_mrs
@@ -844,109 +1040,58 @@ def get_material_request_items_for_stock_entry(tailoring_sheet):
                 "message": "No Material Request (Material Issue or Purchase) found for this Tailoring Sheet",
             }
 
+        all_mr_names = [mr.name for mr in material_requests]
+        all_submitted = all(mr.docstatus == 1 for mr in material_requests)
+
         # Dictionary to store aggregated items by item_code
         # Structure: {item_code: {qty: sum, uom: value, stock_uom: value, item_name: value, description: value, mr_names: [list]}}
         aggregated_items = {}
-        all_mr_names = []
-        all_submitted = True
-
-        # Process all Material Requests and aggregate items
-        for mr in material_requests:
-            all_mr_names.append(mr.name)
-            if mr.docstatus != 1:
-                all_submitted = False
-
-            # Get Material Request document to access items
-            mr_doc = frappe.get_doc("Material Request", mr.name)
-
-            for item in mr_doc.items:
-                item_code = item.item_code
-
-                # Initialize item in aggregated_items if not exists
-                if item_code not in aggregated_items:
-                    # Get stock_uom from Item master
-                    stock_uom = None
-                    try:
-                        item_doc = frappe.get_doc("Item", item_code)
-                        stock_uom = (
-                            item_doc.stock_uom
-                            if hasattr(item_doc, "stock_uom") and item_doc.stock_uom
-                            else item.uom
-                        )
-                    except Exception:
-                        # If item not found or error, use uom from Material Request as fallback
-                        stock_uom = item.uom
-
-                    aggregated_items[item_code] = {
-                        "qty": 0.0,
-                        "uom": item.uom,
-                        "stock_uom": stock_uom,
-                        "item_name": item.item_name,
-                        "description": item.description,
-                        "mr_names": [],
-                    }
 
-                # Aggregate quantity
-                aggregated_items[item_code]["qty"] += float(item.qty)
-                # Store MR name for reference (use first occurrence for metadata)
-                if mr.name not in aggregated_items[item_code]["mr_names"]:
-                    aggregated_items[item_code]["mr_names"].append(mr.name)
-
-        # Fetch existing Stock Entry records for this tailoring sheet
-        # Look for Stock Entries that have custom_tailoring_sheet field or are linked via Material Request
-        issued_quantities = {}
+        # All rows of the selected Material Requests with the Item's stock UOM joined in,
+        # in the same order as reading each document (newest MR first, then row index)
+        mr_items = frappe.db.sql(
+            """
+            SELECT
+                mri.parent, mri.item_code, mri.qty, mri.uom, mri.item_name, mri.description,
+                COALESCE(NULLIF(i.stock_uom, ''), mri.uom) AS stock_uom
+            FROM `tabMaterial Request Item` mri
+            INNER JOIN `tabMaterial Request` mr ON mri.parent = mr.name
+            LEFT JOIN `tabItem` i ON i.name = mri.item_code
+            WHERE mri.parenttype = 'Material Request'
+                AND mri.parent IN %(mr_names)s
+            ORDER BY mr.creation DESC, mri.idx ASC
+            """,
+            {"mr_names": tuple(all_mr_names)},
+            as_dict=True,
+        )
 
-        # Method 1: Direct link via custom_tailoring_sheet field (if exists)
-        try:
-            stock_entries_direct = frappe.get_all(
-                "Stock Entry",
-                filters={
-                    "custom_tailoring_sheet": tailoring_sheet,
-                    "stock_entry_type": "Material Issue",
-                    "docstatus": 1,  # Submitted only
-                },
-                fields=["name"],
-            )
+        for item in mr_items:
+            item_code = item.item_code
 
-            for se in stock_entries_direct:
-                se_doc = frappe.get_doc("Stock Entry", se.name)
-                for item in se_doc.items:
-                    item_code = item.item_code
-                    if item_code not in issued_quantities:
-                        issued_quantities[item_code] = 0.0
-                    issued_quantities[item_code] += float(item.qty or 0)
-        except Exception:
-            # custom_tailoring_sheet field might not exist, continue with other methods
-            pass
-
-        # Method 2: Link via Material Request reference
-        try:
-            # Get Stock Entries that reference our Material Requests
-            mr_names_list = [mr.name for mr in material_requests]
-            if mr_names_list:
-                # Find Stock Entries that reference any of our Material Requests
-                stock_entries_mr = frappe.get_all(
-                    "Stock Entry",
-                    filters={
-                        "material_request": ["in", mr_names_list],
-                        "stock_entry_type": "Material Issue",
-                        "docstatus": 1,  # Submitted only
-                    },
-                    fields=["name", "material_request"],
-                )
+            # Initialize item in aggregated_items if not exists (first occurrence gives the metadata)
+            if item_code not in aggregated_items:
+                aggregated_items[item_code] = {
+                    "qty": 0.0,
+                    "uom": item.uom,
+                    "stock_uom": item.stock_uom,
+                    "item_name": item.item_name,
+                    "description": item.description,
+                    "mr_names": [],
+                }
 
-                for se in stock_entries_mr:
-                    se_doc = frappe.get_doc("Stock Entry", se.name)
-                    for item in se_doc.items:
-                        item_code = item.item_code
-                        if item_code not in issued_quantities:
-                            issued_quantities[item_code] = 0.0
-                        issued_quantities[item_code] += float(item.qty or 0)
-        except Exception as e:
-            frappe.log_error(
-                message=f"Error fetching Stock Entries via Material Request: {str(e)}",
-                title="Task: Stock Entry Fetch Error",
-            )
+            # Aggregate quantity
+            aggregated_items[item_code]["qty"] += float(item.qty)
+            # Store MR name for reference
+            if item.parent not in aggregated_items[item_code]["mr_names"]:
+                aggregated_items[item_code]["mr_names"].append(item.parent)
+
+        # Quantities already issued by submitted Material Issue Stock Entries of this tailoring sheet
+        issued_quantities = {
+            item_code: qty
+            for (_ts, item_code), qty in get_ledger_quantities(
+                "Tailoring Sheet", [tailoring_sheet], "issued_qty", aggregated_items
+            ).items()
+        }
 
         # Calculate remaining quantities and filter items
         remaining_items = []
@@ -1021,20 +1166,9 @@ def get_contractors_for_service(service):
         if not service:
             return []
 
-        # Get the Services document
-        services_doc = frappe.get_doc("Services", service)
-
-        # Extract contractor names from the contractors child table
-        contractors = []
-        if hasattr(services_doc, "contractors") and services_doc.contractors:
-            for contractor_row in services_doc.contractors:
-                if contractor_row.contractor:
-                    contractors.append(contractor_row.contractor)
+        # Contractor names from the cached Services matrix, in child table order
+        return list((get_service_rate_matrix().get(service) or {}).get("contractors", []))
 
-        return contractors
-
-    except frappe.DoesNotExistError:
-        return []
     except Exception as e:
         frappe.log_error(
             message=f"Error fetching contractors for service: {str(e)}",
@@ -1087,28 +1221,18 @@ def notify_assigned_contractor(doc, method=None):
             return
 
         # For updates, only send if field changed
-        if not doc.is_new():
-            old_doc = doc.get_doc_before_save()
-            if (
-                old_doc
-                and old_doc.get("custom_assigned_contractor")
-                == doc.custom_assigned_contractor
-            ):
-                # Field didn't change, skip notification
-                return
+        ctx = get_task_save_context(doc)
+        if "custom_assigned_contractor" not in ctx.changed_fields:
+            # Field didn't change, skip notification
+            return
 
         # Get contractor email
-        recipient = _get_contractor_email(doc.custom_assigned_contractor)
+        recipient = _get_contractor_email(doc.custom_assigned_contractor, ctx.contractor)
         if not recipient:
             return
 
         # Get contractor name for personalization
-        contractor_name = (
-            frappe.db.get_value(
-                "Employee", doc.custom_assigned_contractor, "employee_name"
-            )
-            or "there"
-        )
+        contractor_name = (ctx.contractor or {}).get("employee_name") or "there"
 
         # Build subject
         subject = f"New Task Assignment - {doc.subject or doc.name or ''}"
@@ -1270,13 +1394,14 @@ def notify_assigned_contractor(doc, method=None):
         )
 
 
-def _get_contractor_email(employee_id: str) -> str | None:
+def _get_contractor_email(employee_id: str, employee: dict | None = None) -> str | None:
     """
     Resolve an email for the given Employee.
     Priority: linked User.email -> Employee.company_email -> Employee.personal_email -> Employee.prefered_email
 
     Args:
         employee_id (str): Employee name/ID
+        employee (dict | None): Employee row with user_id and email fields, if already loaded
 
     Returns:
         str | None: Email address or None if not found
@@ -1284,23 +1409,21 @@ def _get_contractor_email(employee_id: str) -> str | None:
     if not employee_id:
         return None
 
+    if employee is None:
+        employee = frappe.db.get_value(
+            "Employee", employee_id, ["user_id", *CONTRACTOR_EMAIL_FIELDS], as_dict=True
+        )
+
     # Try linked User first
-    user_id = frappe.db.get_value("Employee", employee_id, "user_id")
+    user_id = employee.get("user_id") if employee else None
     if user_id:
         user_email = frappe.db.get_value("User", user_id, "email")
         if user_email:
             return user_email
 
     # Fallback to common email fields on Employee
-    email_fields = [
-        "company_email",
-        "personal_email",
-        "prefered_email",
-        "prefered_contact_email",
-    ]
-    employee = frappe.db.get_value("Employee", employee_id, email_fields, as_dict=True)
     if employee:
-        for f in email_fields:
+        for f in CONTRACTOR_EMAIL_FIELDS:
             eml = employee.get(f)
             if eml:
                 return eml
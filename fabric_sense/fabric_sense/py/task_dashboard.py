@@ -1,4 +1,6 @@
+import frappe  # type: ignore
 from frappe import _  # type: ignore
+from frappe.desk.notifications import get_open_count as _get_open_count  # type: ignore
 
 
 def get_data(data):
@@ -19,6 +21,7 @@ def get_data(data):
     # Add internal links
     data["internal_links"] = data.get("internal_links", {})
     data["internal_links"]["Stock Entry"] = ["custom_task", "custom_task"]
+    # Resolved by get_open_count from the Journal Entry Account rows
     data["internal_links"]["Journal Entry"] = ["custom_task", "custom_task"]
     
     # Add Stock Entry and Journal Entry to transactions
@@ -52,4 +55,44 @@ def get_data(data):
             "items": ["Journal Entry"],
         })
     
-    return data
\ No newline at end of file
+    return data
+
+
+@frappe.whitelist()
+@frappe.read_only()
+def get_open_count(doctype, name, items=None):
+    """
+    Dashboard counts, with the Journal Entries of a Task taken from their accounting rows.
+
+    A bulk completion posts one Journal Entry for several tasks and leaves its header
+    custom_task empty, only the Journal Entry Account rows point back to each task.
+    """
+    if doctype != "Task":
+        return _get_open_count(doctype, name, items)
+
+    if items is None:
+        links = frappe.get_meta(doctype).get_dashboard_data()
+        items = [d for group in links.transactions for d in group.get("items")]
+    items = [d for d in frappe.parse_json(items) if d != "Journal Entry"]
+
+    out = _get_open_count(doctype, name, items)
+
+    journal_entries = get_task_journal_entries(name)
+    out["internal_links_found"].append(
+        {"doctype": "Journal Entry", "names": journal_entries, "count": len(journal_entries)}
+    )
+    return out
+
+
+def get_task_journal_entries(task):
+    """Journal Entries linked to a task on their header or on any accounting row."""
+    names = frappe.get_all(
+        "Journal Entry Account",
+        filters={"custom_task": task, "parenttype": "Journal Entry", "docstatus": ["<", 2]},
+        pluck="parent",
+        distinct=True,
+    )
+    names += frappe.get_all(
+        "Journal Entry", filters={"custom_task": task, "docstatus": ["<", 2]}, pluck="name"
+    )
+    return list(dict.fromkeys(names))
@@ -0,0 +1,101 @@
+# Copyright (c) 2026, innogenio and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import today
+
+from fabric_sense.fabric_sense.py.bulk_material_request import (
+	build_material_request_plans,
+	get_pending_sales_order_lines,
+)
+
+PENDING_TEST_ITEM = "BULK-PENDING-ITEM"
+
+
+def _line(sales_order_item, qty, requested_qty=0, ordered_qty=5, warehouse="Stores"):
+	return frappe._dict(
+		sales_order="SO-BULK-TEST",
+		company="Test Company",
+		sales_order_item=sales_order_item,
+		item_code="BULK-ITEM",
+		qty=qty,
+		uom="Meter",
+		warehouse=warehouse,
+		schedule_date=today(),
+		custom_is_onorder_item=0,
+		ordered_qty=ordered_qty,
+		requested_qty=requested_qty,
+	)
+
+
+class TestBulkMaterialRequest(FrappeTestCase):
+	def test_rows_keep_their_sales_order_item(self):
+		(plan,) = build_material_request_plans([_line("SOI-1", 2), _line("SOI-2", 3)])
+
+		self.assertEqual(plan["material_request_type"], "Material Issue")
+		self.assertEqual(
+			[(row["sales_order_item"], row["qty"]) for row in plan["items"]],
+			[("SOI-1", 2), ("SOI-2", 3)],
+		)
+
+	def test_idempotency_key_follows_the_requested_state(self):
+		"""Runs from the same requested state share a key, whatever their rows"""
+		(plan,) = build_material_request_plans([_line("SOI-1", 2), _line("SOI-2", 3)])
+		(other_split,) = build_material_request_plans(
+			[_line("SOI-1", 2, warehouse="Finished Goods"), _line("SOI-2", 3, ordered_qty=4)]
+		)
+		(after_request,) = build_material_request_plans([_line("SOI-2", 3, requested_qty=2, ordered_qty=6)])
+
+		self.assertTrue(plan["idempotency_key"].startswith("SO-BULK-TEST::"))
+		self.assertEqual(plan["idempotency_key"], other_split["idempotency_key"])
+		self.assertNotEqual(plan["idempotency_key"], after_request["idempotency_key"])
+
+	def test_only_undelivered_orders_are_pending(self):
+		"""A fully delivered order waiting for its invoice gets no new request"""
+		if not frappe.db.exists("Item", PENDING_TEST_ITEM):
+			frappe.get_doc(
+				{
+					"doctype": "Item",
+					"item_code": PENDING_TEST_ITEM,
+					"item_name": PENDING_TEST_ITEM,
+					"item_group": "All Item Groups",
+					"stock_uom": "Nos",
+					"is_stock_item": 1,
+				}
+			).insert(ignore_permissions=True)
+
+		for name, status, per_delivered in (
+			("SO-BULK-TO-BILL", "To Bill", 100),
+			("SO-BULK-TO-DELIVER", "To Deliver and Bill", 0),
+		):
+			frappe.get_doc(
+				{
+					"doctype": "Sales Order",
+					"name": name,
+					"docstatus": 1,
+					"status": status,
+					"per_delivered": per_delivered,
+					"delivery_date": today(),
+				}
+			).db_insert()
+			frappe.get_doc(
+				{
+					"doctype": "Sales Order Item",
+					"name": f"{name}-1",
+					"parent": name,
+					"parenttype": "Sales Order",
+					"parentfield": "items",
+					"docstatus": 1,
+					"idx": 1,
+					"item_code": PENDING_TEST_ITEM,
+					"qty": 4,
+					"stock_uom": "Nos",
+				}
+			).db_insert()
+
+		self.assertEqual(build_material_request_plans(get_pending_sales_order_lines(["SO-BULK-TO-BILL"])), [])
+		self.assertEqual(
+			[line.sales_order for line in get_pending_sales_order_lines(["SO-BULK-TO-BILL", "SO-BULK-TO-DELIVER"])],
+			["SO-BULK-TO-DELIVER"],
+		)
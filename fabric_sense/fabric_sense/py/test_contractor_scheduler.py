@@ -0,0 +1,74 @@
+# Copyright (c) 2026, innogenio and Contributors
+# See license.txt
+
+from collections import Counter
+from datetime import date, timedelta
+
+from frappe.tests.utils import FrappeTestCase
+
+from fabric_sense.fabric_sense.py.contractor_scheduler import schedule_tasks
+
+DAY = date(2026, 1, 5)
+
+
+def _task(name, service="Fitting", priority="Medium", start=DAY, end=None, quantity=1):
+	return {
+		"name": name,
+		"service": service,
+		"priority": priority,
+		"quantity": quantity,
+		"start_date": start,
+		"end_date": end or start,
+	}
+
+
+class TestContractorScheduler(FrappeTestCase):
+	def test_scheduler_respects_daily_capacity(self):
+		capabilities = {"Fitting": {"EMP-1": 100, "EMP-2": 100}}
+		tasks = [_task(f"T{i}") for i in range(5)]
+
+		result = schedule_tasks(tasks, capabilities, daily_capacity=2)
+
+		self.assertEqual(len(result["assignments"]), 4)
+		self.assertEqual(len(result["unassigned"]), 1)
+
+	def test_scheduler_balances_and_prefers_urgent_tasks(self):
+		capabilities = {"Fitting": {"EMP-1": 100, "EMP-2": 200}}
+		tasks = [_task("LOW", priority="Low"), _task("URGENT", priority="Urgent")]
+
+		result = schedule_tasks(tasks, capabilities, existing_load={("EMP-1", DAY): 1}, daily_capacity=2)
+		assigned = {row["task"]: row["contractor"] for row in result["assignments"]}
+
+		# The urgent task goes first, to the contractor with nothing booked yet
+		self.assertEqual(assigned["URGENT"], "EMP-2")
+		self.assertEqual(result["assignments"][0]["task"], "URGENT")
+
+	def test_scheduler_books_every_day_of_a_task(self):
+		capabilities = {"Fitting": {"EMP-1": 100}}
+		tasks = [
+			_task("LONG", start=DAY, end=DAY + timedelta(days=2)),
+			_task("MIDDLE", start=DAY + timedelta(days=1)),
+		]
+
+		result = schedule_tasks(tasks, capabilities, daily_capacity=1)
+
+		self.assertEqual([row["task"] for row in result["assignments"]], ["LONG"])
+		self.assertEqual(result["unassigned"][0]["task"], "MIDDLE")
+
+	def test_scheduler_handles_thousands_of_tasks(self):
+		contractors = [f"EMP-{i}" for i in range(100)]
+		capabilities = {
+			f"SVC-{s}": {c: 100 + i for i, c in enumerate(contractors[s::5])} for s in range(20)
+		}
+		tasks = [
+			_task(f"T{i}", service=f"SVC-{i % 20}", start=DAY + timedelta(days=i % 15))
+			for i in range(3000)
+		]
+
+		result = schedule_tasks(tasks, capabilities, daily_capacity=2)
+
+		self.assertEqual(len(result["assignments"]) + len(result["unassigned"]), 3000)
+
+		# No contractor is booked beyond capacity on any day
+		load = Counter((row["contractor"], row["start_date"]) for row in result["assignments"])
+		self.assertLessEqual(max(load.values()), 2)
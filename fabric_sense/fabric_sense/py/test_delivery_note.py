@@ -0,0 +1,243 @@
+# Copyright (c) 2026, innogenio and Contributors
+# See license.txt
+
+import threading
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, today
+
+from erpnext.selling.doctype.sales_order.sales_order import make_delivery_note
+
+from fabric_sense.fabric_sense.py.delivery_note import (
+	ADJUSTMENT_PLAN_CACHE_KEY,
+	install_stock_ledger_hook,
+	pop_stock_ledger_adjustment,
+	preview_delivery_note_adjustments,
+	push_stock_ledger_adjustment,
+)
+from fabric_sense.fabric_sense.py.material_fulfilment import update_ledger_for_stock_entry
+
+TEST_SALES_ORDER = "SO-DN-PREVIEW-TEST"
+TEST_TAILORING_SHEET = "TS-DN-PREVIEW-TEST"
+TEST_ITEM = "DN-PREVIEW-ITEM"
+LEDGER_TEST_ITEM = "DN-LEDGER-ITEM"
+LEDGER_TEST_MEASUREMENT_SHEET = "MS-DN-LEDGER-TEST"
+LEDGER_TEST_TAILORING_SHEET = "TS-DN-LEDGER-TEST"
+
+
+class TestDeliveryNoteAdjustmentPreview(FrappeTestCase):
+	def setUp(self):
+		# Sales Order -> Measurement Sheet -> Tailoring Sheet chain the plan resolves
+		frappe.get_doc(
+			{"doctype": "Sales Order", "name": TEST_SALES_ORDER, "measurement_sheet": "MS-DN-PREVIEW-TEST"}
+		).db_insert()
+		frappe.get_doc(
+			{
+				"doctype": "Tailoring Sheet",
+				"name": TEST_TAILORING_SHEET,
+				"measurement_sheet": "MS-DN-PREVIEW-TEST",
+			}
+		).db_insert()
+
+		update_ledger_for_stock_entry(
+			frappe._dict(
+				stock_entry_type="Material Issue",
+				custom_tailoring_sheet=TEST_TAILORING_SHEET,
+				items=[frappe._dict(item_code=TEST_ITEM, qty=3)],
+			),
+			"on_submit",
+		)
+
+	def test_preview_of_saved_delivery_note(self):
+		"""The form sends a saved Delivery Note as a plain dict; its plan is computed and cached"""
+		delivery_note = {
+			"doctype": "Delivery Note",
+			"name": "DN-PREVIEW-TEST",
+			"modified": "2026-01-05 10:00:00",
+			"items": [{"item_code": TEST_ITEM, "qty": 5, "against_sales_order": TEST_SALES_ORDER}],
+		}
+		cache_key = ADJUSTMENT_PLAN_CACHE_KEY.format("DN-PREVIEW-TEST")
+		frappe.cache().delete_value(cache_key)
+
+		adjustments = preview_delivery_note_adjustments(frappe.as_json(delivery_note))
+
+		self.assertEqual(
+			adjustments,
+			[
+				{
+					"item_code": TEST_ITEM,
+					"original_qty": 5.0,
+					"issued_qty": 3.0,
+					"remaining_qty": 2.0,
+					"stock_update_qty": 2.0,
+				}
+			],
+		)
+		cached = frappe.cache().get_value(cache_key)
+		self.assertEqual(cached["issued_by_order"], {(TEST_SALES_ORDER, TEST_ITEM): 3.0})
+		frappe.cache().delete_value(cache_key)
+
+
+class TestDeliveryNoteStockLedgerAdjustment(FrappeTestCase):
+	def setUp(self):
+		self.company = frappe.db.get_value("Company", {}, "name")
+		self.warehouse = frappe.db.get_value(
+			"Warehouse", {"company": self.company, "is_group": 0}, "name"
+		)
+		self.customer = frappe.db.get_value("Customer", {}, "name")
+		if not self.company or not self.warehouse or not self.customer:
+			self.skipTest("Needs a company with a warehouse and a customer")
+
+		if not frappe.db.exists("Item", LEDGER_TEST_ITEM):
+			frappe.get_doc(
+				{
+					"doctype": "Item",
+					"item_code": LEDGER_TEST_ITEM,
+					"item_name": LEDGER_TEST_ITEM,
+					"item_group": "All Item Groups",
+					"stock_uom": "Nos",
+					"is_stock_item": 1,
+				}
+			).insert(ignore_permissions=True)
+
+		frappe.get_doc(
+			{
+				"doctype": "Tailoring Sheet",
+				"name": LEDGER_TEST_TAILORING_SHEET,
+				"measurement_sheet": LEDGER_TEST_MEASUREMENT_SHEET,
+			}
+		).db_insert()
+
+		self.receipt = self._make_stock_entry("Material Receipt", 10, t_warehouse=self.warehouse)
+
+	def _make_stock_entry(self, purpose, qty, **row):
+		se = frappe.new_doc("Stock Entry")
+		se.purpose = se.stock_entry_type = purpose
+		se.company = self.company
+		if purpose == "Material Issue":
+			se.custom_tailoring_sheet = LEDGER_TEST_TAILORING_SHEET
+		se.append(
+			"items",
+			dict(item_code=LEDGER_TEST_ITEM, qty=qty, basic_rate=100, conversion_factor=1, **row),
+		)
+		se.insert(ignore_permissions=True)
+		se.submit()
+		return se
+
+	def _stock_ledger_qty(self, voucher_type, voucher_no):
+		return frappe.get_all(
+			"Stock Ledger Entry",
+			filters={"voucher_type": voucher_type, "voucher_no": voucher_no, "is_cancelled": 0},
+			pluck="actual_qty",
+		)
+
+	def _make_sales_order(self):
+		so = frappe.new_doc("Sales Order")
+		so.company = self.company
+		so.customer = self.customer
+		so.transaction_date = today()
+		so.delivery_date = add_days(today(), 7)
+		so.measurement_sheet = LEDGER_TEST_MEASUREMENT_SHEET
+		so.append(
+			"items",
+			{
+				"item_code": LEDGER_TEST_ITEM,
+				"qty": 5,
+				"rate": 100,
+				"warehouse": self.warehouse,
+				"delivery_date": add_days(today(), 7),
+			},
+		)
+		so.flags.ignore_links = True
+		so.insert(ignore_permissions=True)
+		so.submit()
+		return so
+
+	def test_submit_excludes_quantity_issued_by_stock_entry(self):
+		"""Delivering 5 after a Material Issue of 2 for the order only moves the other 3"""
+		so = self._make_sales_order()
+		issue = self._make_stock_entry("Material Issue", 2, s_warehouse=self.warehouse)
+
+		dn = make_delivery_note(so.name)
+		dn.insert(ignore_permissions=True)
+		dn.submit()
+
+		self.assertEqual(self._stock_ledger_qty("Stock Entry", issue.name), [-2])
+		self.assertEqual(self._stock_ledger_qty("Delivery Note", dn.name), [-3])
+
+	def test_other_vouchers_pass_through(self):
+		"""A registered Delivery Note does not change the entries of other vouchers"""
+		install_stock_ledger_hook()
+		push_stock_ledger_adjustment("DN-LEDGER-TEST", {LEDGER_TEST_ITEM: 2})
+		try:
+			issue = self._make_stock_entry("Material Issue", 4, s_warehouse=self.warehouse)
+		finally:
+			pop_stock_ledger_adjustment("DN-LEDGER-TEST")
+
+		self.assertEqual(self._stock_ledger_qty("Stock Entry", issue.name), [-4])
+
+	def test_parallel_delivery_note_and_stock_entry_submits(self):
+		"""Only the Delivery Note submit is adjusted when a Stock Entry submits alongside it"""
+		so = self._make_sales_order()
+		issue = self._make_stock_entry("Material Issue", 2, s_warehouse=self.warehouse)
+
+		dn = make_delivery_note(so.name)
+		dn.insert(ignore_permissions=True)
+
+		se = frappe.new_doc("Stock Entry")
+		se.purpose = se.stock_entry_type = "Material Issue"
+		se.company = self.company
+		se.append(
+			"items",
+			{
+				"item_code": LEDGER_TEST_ITEM,
+				"qty": 4,
+				"basic_rate": 100,
+				"conversion_factor": 1,
+				"s_warehouse": self.warehouse,
+			},
+		)
+		se.insert(ignore_permissions=True)
+
+		# The submits run on their own connections, which only see committed rows
+		frappe.db.commit()
+		prepared = [("Delivery Note", dn.name), ("Stock Entry", se.name)]
+
+		results = {}
+		barrier = threading.Barrier(len(prepared), timeout=60)
+		site, sites_path = frappe.local.site, frappe.local.sites_path
+
+		def submit(doctype, name):
+			frappe.init(site=site, sites_path=sites_path)
+			frappe.connect()
+			try:
+				frappe.set_user("Administrator")
+				doc = frappe.get_doc(doctype, name)
+				barrier.wait()
+				doc.submit()
+				results[doctype] = self._stock_ledger_qty(doctype, name)
+			except Exception as e:
+				results[doctype] = e
+			finally:
+				# Nothing submitted here is kept
+				frappe.db.rollback()
+				frappe.destroy()
+
+		threads = [threading.Thread(target=submit, args=row) for row in prepared]
+		try:
+			for thread in threads:
+				thread.start()
+			for thread in threads:
+				thread.join()
+		finally:
+			frappe.delete_doc("Delivery Note", dn.name, ignore_permissions=True, force=True)
+			frappe.delete_doc("Stock Entry", se.name, ignore_permissions=True, force=True)
+			for doc in (issue, self.receipt, so):
+				doc.reload()
+				doc.cancel()
+			frappe.db.delete("Tailoring Sheet", LEDGER_TEST_TAILORING_SHEET)
+			frappe.db.commit()
+
+		self.assertEqual(results["Stock Entry"], [-4])
+		self.assertEqual(results["Delivery Note"], [-3])
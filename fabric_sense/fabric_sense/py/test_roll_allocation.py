@@ -0,0 +1,104 @@
+# Copyright (c) 2026, innogenio and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from fabric_sense.fabric_sense.py.roll_allocation import allocate_rolls, allocate_stock_entry_rows
+
+TEST_ITEM = "ROLL-ALLOCATION-ITEM"
+
+
+class TestRollAllocation(FrappeTestCase):
+	def _make_batch_item(self):
+		if not frappe.db.exists("Item", TEST_ITEM):
+			frappe.get_doc(
+				{
+					"doctype": "Item",
+					"item_code": TEST_ITEM,
+					"item_name": TEST_ITEM,
+					"item_group": "All Item Groups",
+					"stock_uom": "Nos",
+					"is_stock_item": 1,
+					"has_batch_no": 1,
+				}
+			).insert(ignore_permissions=True)
+
+	def test_roll_allocation_strategies(self):
+		rolls = [("ROLL-A", 8), ("ROLL-B", 3), ("ROLL-C", 12), ("ROLL-D", 2)]
+
+		# Best Fit cuts the shortest roll that covers the whole length
+		self.assertEqual(allocate_rolls(10, rolls, "Best Fit"), ([("ROLL-C", 10.0)], 0.0))
+
+		# Minimum Leftover uses up ROLL-A and ROLL-D exactly
+		allocations, shortage = allocate_rolls(10, rolls, "Minimum Leftover")
+		self.assertEqual(sorted(allocations), [("ROLL-A", 8.0), ("ROLL-D", 2.0)])
+		self.assertEqual(shortage, 0.0)
+
+	def test_roll_allocation_reports_shortage(self):
+		allocations, shortage = allocate_rolls(30, [("ROLL-A", 8), ("ROLL-B", 3.5)], "Minimum Leftover")
+		self.assertEqual(allocations, [("ROLL-A", 8.0), ("ROLL-B", 3.5)])
+		self.assertEqual(shortage, 18.5)
+
+	def test_stock_entry_rows_are_split_per_source_row(self):
+		"""Each row keeps its own fields, rows of one item share the rolls"""
+		self._make_batch_item()
+
+		items = [
+			{
+				"item_code": TEST_ITEM,
+				"s_warehouse": "Stores",
+				"qty": 10,
+				"transfer_qty": 10,
+				"conversion_factor": 1,
+				"material_request": "MR-ROLL-1",
+				"material_request_item": "MRI-ROLL-1",
+				"cost_center": "Main",
+			},
+			{
+				"item_code": TEST_ITEM,
+				"s_warehouse": "Stores",
+				"qty": 4,
+				"transfer_qty": 8,
+				"conversion_factor": 2,
+				"material_request": "MR-ROLL-2",
+				"material_request_item": "MRI-ROLL-2",
+				"cost_center": "Main",
+			},
+		]
+		rolls = {(TEST_ITEM, "Stores"): [("ROLL-A", 8), ("ROLL-B", 3), ("ROLL-C", 12)]}
+
+		with patch(
+			"fabric_sense.fabric_sense.py.roll_allocation.get_available_rolls", return_value=rolls
+		):
+			result = allocate_stock_entry_rows(items)
+
+		self.assertEqual(result["shortages"], [])
+		self.assertEqual(
+			[
+				(row["material_request_item"], row["batch_no"], row["qty"], row["transfer_qty"])
+				for row in result["rows"]
+			],
+			[
+				# ROLL-C is cut for the first row, the second takes ROLL-A in its own UOM
+				("MRI-ROLL-1", "ROLL-C", 10.0, 10.0),
+				("MRI-ROLL-2", "ROLL-A", 4.0, 8.0),
+			],
+		)
+		self.assertTrue(all(row["cost_center"] == "Main" for row in result["rows"]))
+		self.assertEqual(result["rows"][1]["material_request"], "MR-ROLL-2")
+
+	def test_zero_quantity_row_is_kept(self):
+		"""The form replaces its rows with the result, so a row without allocation must stay"""
+		self._make_batch_item()
+		row = {"item_code": TEST_ITEM, "s_warehouse": "Stores", "qty": 0, "conversion_factor": 1}
+
+		with patch(
+			"fabric_sense.fabric_sense.py.roll_allocation.get_available_rolls",
+			return_value={(TEST_ITEM, "Stores"): [("ROLL-A", 8)]},
+		):
+			result = allocate_stock_entry_rows([row])
+
+		self.assertEqual(result, {"rows": [row], "shortages": []})
@@ -0,0 +1,68 @@
+# Copyright (c) 2026, innogenio and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, today
+
+from fabric_sense.fabric_sense.py.sales_order import _has_remaining_items, get_requested_quantities
+
+TEST_SALES_ORDER = "SO-REMAINING-TEST"
+TEST_ITEM = "SO-REMAINING-ITEM"
+
+
+class TestSalesOrderRemainingItems(FrappeTestCase):
+	def test_ordered_quantities_are_summed_per_item(self):
+		so_items = [
+			frappe._dict(item_code=TEST_ITEM, qty=2),
+			frappe._dict(item_code=TEST_ITEM, qty=3),
+			frappe._dict(item_code="STITCHING", qty=1),
+		]
+
+		self.assertTrue(_has_remaining_items(so_items, {TEST_ITEM: 4}, {"STITCHING"}))
+		self.assertFalse(_has_remaining_items(so_items, {TEST_ITEM: 5}, {"STITCHING"}))
+
+	def test_requests_count_until_cancelled(self):
+		"""Requests linked through the header count as drafts and once submitted, not when cancelled"""
+		company = frappe.db.get_value("Company", {}, "name")
+		warehouse = frappe.db.get_value("Warehouse", {"company": company, "is_group": 0}, "name")
+		if not company or not warehouse:
+			self.skipTest("Needs a company with a warehouse")
+
+		if not frappe.db.exists("Item", TEST_ITEM):
+			frappe.get_doc(
+				{
+					"doctype": "Item",
+					"item_code": TEST_ITEM,
+					"item_name": TEST_ITEM,
+					"item_group": "All Item Groups",
+					"stock_uom": "Nos",
+					"is_stock_item": 1,
+				}
+			).insert(ignore_permissions=True)
+
+		so_items = [frappe._dict(item_code=TEST_ITEM, qty=3)]
+
+		mr = frappe.new_doc("Material Request")
+		mr.material_request_type = "Material Issue"
+		mr.company = company
+		mr.transaction_date = today()
+		mr.schedule_date = add_days(today(), 7)
+		mr.custom_sales_order = TEST_SALES_ORDER
+		mr.custom_manager_approval_status = "Approved"
+		mr.append(
+			"items",
+			{"item_code": TEST_ITEM, "qty": 3, "schedule_date": add_days(today(), 7), "warehouse": warehouse},
+		)
+		mr.flags.ignore_links = True
+		mr.insert(ignore_permissions=True)
+
+		self.assertEqual(get_requested_quantities(TEST_SALES_ORDER), {TEST_ITEM: 3})
+		self.assertFalse(_has_remaining_items(so_items, get_requested_quantities(TEST_SALES_ORDER), set()))
+
+		mr.submit()
+		self.assertEqual(get_requested_quantities(TEST_SALES_ORDER), {TEST_ITEM: 3})
+
+		mr.cancel()
+		self.assertFalse(get_requested_quantities(TEST_SALES_ORDER).get(TEST_ITEM))
+		self.assertTrue(_has_remaining_items(so_items, get_requested_quantities(TEST_SALES_ORDER), set()))
@@ -0,0 +1,141 @@
+# Copyright (c) 2026, innogenio and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, today
+
+from fabric_sense.fabric_sense.py.material_fulfilment import update_ledger_for_stock_entry
+from fabric_sense.fabric_sense.py.task import get_material_request_items_for_stock_entry
+from fabric_sense.fabric_sense.py.task_dashboard import get_task_journal_entries
+
+TEST_TAILORING_SHEET = "TS-STOCK-ENTRY-TEST"
+ISSUED_TAILORING_SHEET = "TS-STOCK-ENTRY-ISSUED-TEST"
+TEST_ITEMS = ("TS-SE-ITEM-1", "TS-SE-ITEM-2")
+
+
+class TestTaskStockEntryItems(FrappeTestCase):
+	def setUp(self):
+		self.company = frappe.db.get_value("Company", {}, "name")
+		self.warehouse = frappe.db.get_value(
+			"Warehouse", {"company": self.company, "is_group": 0}, "name"
+		)
+		if not self.company or not self.warehouse:
+			self.skipTest("Needs a company with a warehouse")
+
+		for item_code in TEST_ITEMS:
+			if not frappe.db.exists("Item", item_code):
+				frappe.get_doc(
+					{
+						"doctype": "Item",
+						"item_code": item_code,
+						"item_name": item_code,
+						"item_group": "All Item Groups",
+						"stock_uom": "Nos",
+						"is_stock_item": 1,
+					}
+				).insert(ignore_permissions=True)
+
+	def _make_material_request(self, rows, tailoring_sheet=TEST_TAILORING_SHEET):
+		mr = frappe.new_doc("Material Request")
+		mr.material_request_type = "Material Issue"
+		mr.company = self.company
+		mr.transaction_date = today()
+		mr.schedule_date = add_days(today(), 7)
+		mr.custom_tailoring_sheet = tailoring_sheet
+		mr.custom_manager_approval_status = "Approved"
+		for item_code, qty in rows:
+			mr.append(
+				"items",
+				{
+					"item_code": item_code,
+					"qty": qty,
+					"schedule_date": add_days(today(), 7),
+					"warehouse": self.warehouse,
+				},
+			)
+		mr.flags.ignore_links = True
+		mr.insert(ignore_permissions=True)
+		mr.submit()
+		return mr
+
+	def test_remaining_items_across_material_requests(self):
+		"""Requests are summed per item, issued quantities are taken off"""
+		first = self._make_material_request([(TEST_ITEMS[0], 4), (TEST_ITEMS[1], 2)])
+		second = self._make_material_request([(TEST_ITEMS[0], 3)])
+		update_ledger_for_stock_entry(
+			frappe._dict(
+				stock_entry_type="Material Issue",
+				custom_tailoring_sheet=TEST_TAILORING_SHEET,
+				items=[frappe._dict(item_code=TEST_ITEMS[0], qty=2)],
+			),
+			"on_submit",
+		)
+
+		result = get_material_request_items_for_stock_entry(TEST_TAILORING_SHEET)
+
+		# Newest request first, so the first item comes from the second request
+		self.assertEqual(result["material_request_name"], f"{second.name}, {first.name}")
+		self.assertEqual(
+			[
+				(item["item_code"], item["qty"], item["requested_qty"], item["issued_qty"], item["uom"])
+				for item in result["items"]
+			],
+			[(TEST_ITEMS[0], 5.0, 7.0, 2.0, "Nos"), (TEST_ITEMS[1], 2.0, 2.0, 0.0, "Nos")],
+		)
+		self.assertEqual(result["docstatus"], 1)
+		self.assertIsNone(result["message"])
+		self.assertEqual(result["total_items_requested"], 2)
+		self.assertEqual(result["remaining_items_count"], 2)
+
+	def test_fully_issued_items_are_left_out(self):
+		self._make_material_request([(TEST_ITEMS[1], 2)], ISSUED_TAILORING_SHEET)
+		update_ledger_for_stock_entry(
+			frappe._dict(
+				stock_entry_type="Material Issue",
+				custom_tailoring_sheet=ISSUED_TAILORING_SHEET,
+				items=[frappe._dict(item_code=TEST_ITEMS[1], qty=2)],
+			),
+			"on_submit",
+		)
+
+		result = get_material_request_items_for_stock_entry(ISSUED_TAILORING_SHEET)
+
+		self.assertEqual(result["items"], [])
+		self.assertEqual(
+			result["message"], "All Material Request items have already been issued via Stock Entries."
+		)
+
+	def test_stock_entry_items_without_material_request(self):
+		result = get_material_request_items_for_stock_entry("TS-WITHOUT-REQUESTS")
+		self.assertIsNone(result["material_request_name"])
+		self.assertEqual(result["items"], [])
+
+
+class TestTaskJournalEntryConnections(FrappeTestCase):
+	def _make_journal_entry(self, name, header_task, row_tasks, docstatus=1):
+		frappe.get_doc(
+			{"doctype": "Journal Entry", "name": name, "custom_task": header_task, "docstatus": docstatus}
+		).db_insert()
+		for idx, task in enumerate(row_tasks, start=1):
+			frappe.get_doc(
+				{
+					"doctype": "Journal Entry Account",
+					"name": f"{name}-{idx}",
+					"parent": name,
+					"parenttype": "Journal Entry",
+					"parentfield": "accounts",
+					"idx": idx,
+					"custom_task": task,
+					"docstatus": docstatus,
+				}
+			).db_insert()
+
+	def test_consolidated_journal_entry_is_linked_to_each_task(self):
+		"""A bulk completion leaves the header empty, its rows still link the task"""
+		self._make_journal_entry("JE-TASK-SINGLE", "TASK-JE-1", ["TASK-JE-1", "TASK-JE-1"])
+		self._make_journal_entry("JE-TASK-BULK", None, ["TASK-JE-1", "TASK-JE-1", "TASK-JE-2", "TASK-JE-2"])
+		self._make_journal_entry("JE-TASK-CANCELLED", None, ["TASK-JE-1"], docstatus=2)
+
+		self.assertEqual(sorted(get_task_journal_entries("TASK-JE-1")), ["JE-TASK-BULK", "JE-TASK-SINGLE"])
+		self.assertEqual(get_task_journal_entries("TASK-JE-2"), ["JE-TASK-BULK"])
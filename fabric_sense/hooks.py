@@ -54,8 +54,12 @@ doctype_js = {
     "Payment Entry": "public/js/payment_entry.js",
     "Task": "public/js/task.js",
     "Delivery Note": "public/js/delivery_note.js",
+    "Stock Entry": "public/js/stock_entry.js",
+}
+doctype_list_js = {
+    "Sales Order": "public/js/sales_order_list.js",
+    "Task": "public/js/task_list.js",
 }
-# doctype_list_js = {"doctype" : "public/js/doctype_list.js"}
 # doctype_tree_js = {"doctype" : "public/js/doctype_tree.js"}
 # doctype_calendar_js = {"doctype" : "public/js/doctype_calendar.js"}
 doc_events = {
@@ -75,6 +79,15 @@ doc_events = {
             "fabric_sense.fabric_sense.py.material_request.check_if_additional_request",
         ],
         "before_submit": "fabric_sense.fabric_sense.py.material_request.prevent_submission_without_approval",
+        "on_submit": "fabric_sense.fabric_sense.py.material_fulfilment.update_ledger_for_material_request",
+        "on_cancel": [
+            "fabric_sense.fabric_sense.py.material_fulfilment.update_ledger_for_material_request",
+            "fabric_sense.fabric_sense.py.bulk_material_request.clear_idempotency_key",
+        ],
+    },
+    "Stock Entry": {
+        "on_submit": "fabric_sense.fabric_sense.py.material_fulfilment.update_ledger_for_stock_entry",
+        "on_cancel": "fabric_sense.fabric_sense.py.material_fulfilment.update_ledger_for_stock_entry",
     },
     "Purchase Order": {
         "on_submit": "fabric_sense.fabric_sense.py.purchase_order_notifications.send_vendor_po_notification",
@@ -87,7 +100,9 @@ doc_events = {
         "on_submit": [
             "fabric_sense.fabric_sense.py.delivery_note.send_customer_delivery_notification",
             "fabric_sense.fabric_sense.py.delivery_note.update_additional_material_request_status",
+            "fabric_sense.fabric_sense.py.material_fulfilment.update_ledger_for_delivery_note",
         ],
+        "on_cancel": "fabric_sense.fabric_sense.py.material_fulfilment.update_ledger_for_delivery_note",
         "after_submit": "fabric_sense.fabric_sense.py.delivery_note.restore_original_stock_ledger_function",
     },
     "Payment Entry": {
@@ -99,16 +114,10 @@ doc_events = {
         "on_cancel": "fabric_sense.fabric_sense.py.payment_entry.revert_contractor_payment_history",
     },
     "Task": {
-        "before_save": [
-            "fabric_sense.fabric_sense.py.task.prefill_from_tailoring_sheet_and_service",
-            "fabric_sense.fabric_sense.py.task.handle_status_change_to_working",
-            "fabric_sense.fabric_sense.py.task.handle_status_change_to_completed",
-            "fabric_sense.fabric_sense.py.task.notify_assigned_contractor",
-        ],
-        "on_update": [
-            "fabric_sense.fabric_sense.py.task.create_contractor_payment_history",
-            "fabric_sense.fabric_sense.py.task.create_journal_entry_for_completed_task"
-        ],
+        # Runs prefill, working, completed and notify stages in order
+        "before_save": "fabric_sense.fabric_sense.py.task.run_task_before_save",
+        # Queues the contractor payment history and journal entry of completed tasks
+        "on_update": "fabric_sense.fabric_sense.py.task.run_task_on_update",
     },
     "Stock Ledger Entry": {
         "on_submit": "fabric_sense.fabric_sense.py.reorder_monitoring.check_reorder_level_on_stock_change",
@@ -237,6 +246,16 @@ override_doctype_class = {
 # 	],
 # }
 
+scheduler_events = {
+    "hourly_long": [
+        "fabric_sense.fabric_sense.py.bulk_material_request.create_material_requests_for_pending_sales_orders",
+        "fabric_sense.fabric_sense.py.reorder_monitoring.scan_reorder_levels",
+    ],
+    "daily_long": [
+        "fabric_sense.fabric_sense.py.reorder_forecast.update_reorder_forecasts",
+    ],
+}
+
 # Testing
 # -------
 
@@ -248,6 +267,9 @@ override_doctype_class = {
 # override_whitelisted_methods = {
 # 	"frappe.desk.doctype.event.event.get_events": "fabric_sense.event.get_events"
 # }
+override_whitelisted_methods = {
+    "frappe.desk.notifications.get_open_count": "fabric_sense.fabric_sense.py.task_dashboard.get_open_count",
+}
 #
 # each overriding function accepts a `data` argument;
 # generated from the base implementation of the doctype dashboard,
@@ -0,0 +1,6 @@
+from fabric_sense.fabric_sense.py.material_fulfilment import rebuild_material_fulfilment_ledger
+
+
+def execute():
+	# Seed the ledger from documents submitted before the incremental hooks existed
+	rebuild_material_fulfilment_ledger()
@@ -114,7 +114,31 @@ fabric_sense.tailoring_sheet.setup_tailoring_sheet_form = function (frm) {
 							freeze_message: __("Creating Material Requests..."),
 							callback: function (r) {
 								if (r.message) {
-									if (r.message.purchase_mr || r.message.issue_mr) {
+									if (r.message.queued) {
+										// Large sheets are created in the background
+										frappe.show_alert({
+											message: __("Material Requests are being created in the background"),
+											indicator: "blue",
+										});
+										frappe.realtime.on(
+											"fabric_sense_multi_material_request",
+											function handler(data) {
+												if (data.reference_name !== frm.doc.name) return;
+												frappe.realtime.off("fabric_sense_multi_material_request", handler);
+												if (data.error) {
+													frappe.msgprint({
+														title: __("Error"),
+														indicator: "red",
+														message: __("Error creating Material Requests: {0}", [data.error]),
+													});
+												} else {
+													frappe.set_route("List", "Material Request", {
+														custom_tailoring_sheet: frm.doc.name,
+													});
+												}
+											}
+										);
+									} else if (r.message.purchase_mr || r.message.issue_mr) {
 										// Navigate to Material Request list with filter for this tailoring sheet
 										frappe.set_route("List", "Material Request", {
 											custom_tailoring_sheet: frm.doc.name,
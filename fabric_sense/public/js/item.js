@@ -1,5 +1,8 @@
 frappe.ui.form.on("Item", {
 	refresh: function (frm) {
+		// Drop memoised brand lookups so a reload picks up Brand changes
+		frm._brand_data_cache = {};
+
 		// Update preferred vendor options on form load
 		update_preferred_vendor_options(frm);
 		
@@ -273,43 +276,59 @@ function setup_brands_filter(frm) {
 	}
 }
 
+function fetch_brand_data(frm) {
+	// Brand visibility and catalogue options come from one endpoint, memoised per item group / brand
+	// so that the refresh handlers share a single round trip
+	const key = `${frm.doc.item_group || ""}::${frm.doc.custom_brands || ""}`;
+	frm._brand_data_cache = frm._brand_data_cache || {};
+
+	if (!frm._brand_data_cache[key]) {
+		frm._brand_data_cache[key] = frappe
+			.xcall("fabric_sense.fabric_sense.doctype.brands.brands.get_item_form_brand_data", {
+				item_group: frm.doc.item_group || null,
+				brand: frm.doc.custom_brands || null,
+			})
+			.catch((e) => {
+				delete frm._brand_data_cache[key];
+				throw e;
+			});
+	}
+
+	return frm._brand_data_cache[key];
+}
+
 function update_catalogue_options(frm, preserve_value = false) {
 	// Update catalogue field options based on selected brand
 	if (frm.doc.custom_brands) {
 		console.log("Brand selected:", frm.doc.custom_brands);
 		
 		// Fetch catalogues from the selected brand
-		frappe.call({
-			method: "fabric_sense.fabric_sense.doctype.brands.brands.get_catalogues_by_brand",
-			args: {
-				brand: frm.doc.custom_brands
-			},
-			callback: function (r) {
-				console.log("Catalogues received:", r.message);
-				
-				if (r.message && r.message.length > 0) {
-					// Set the options for the catalogue field
-					let options = r.message.join("\n");
-					frm.set_df_property("custom_catalogue", "options", options);
-					
-					// Only clear the catalogue value if this is a brand change (not form refresh)
-					// and the current value is not in the new options
-					if (!preserve_value && frm.doc.custom_catalogue) {
-						if (!r.message.includes(frm.doc.custom_catalogue)) {
-							frm.set_value("custom_catalogue", "");
-						}
-					}
-				} else {
-					// Clear options if no catalogues found
-					frm.set_df_property("custom_catalogue", "options", "");
-					// Only clear value if not preserving (i.e., during brand change)
-					if (!preserve_value && frm.doc.custom_catalogue) {
+		fetch_brand_data(frm).then((data) => {
+			const catalogues = (data && data.catalogues) || [];
+			console.log("Catalogues received:", catalogues);
+
+			if (catalogues.length > 0) {
+				// Set the options for the catalogue field
+				let options = catalogues.join("\n");
+				frm.set_df_property("custom_catalogue", "options", options);
+
+				// Only clear the catalogue value if this is a brand change (not form refresh)
+				// and the current value is not in the new options
+				if (!preserve_value && frm.doc.custom_catalogue) {
+					if (!catalogues.includes(frm.doc.custom_catalogue)) {
 						frm.set_value("custom_catalogue", "");
 					}
 				}
-				
-				frm.refresh_field("custom_catalogue");
+			} else {
+				// Clear options if no catalogues found
+				frm.set_df_property("custom_catalogue", "options", "");
+				// Only clear value if not preserving (i.e., during brand change)
+				if (!preserve_value && frm.doc.custom_catalogue) {
+					frm.set_value("custom_catalogue", "");
+				}
 			}
+
+			frm.refresh_field("custom_catalogue");
 		});
 	} else {
 		// Clear catalogue options and value if no brand is selected
@@ -328,32 +347,27 @@ function toggle_brand_field_visibility(frm) {
 		console.log("Checking if item group exists in any brand:", frm.doc.item_group);
 		
 		// Check if the item group exists in any brand's sub-categories
-		frappe.call({
-			method: "fabric_sense.fabric_sense.doctype.brands.brands.check_item_group_in_brands",
-			args: {
-				item_group: frm.doc.item_group
-			},
-			callback: function (r) {
-				console.log("Item group exists in brands:", r.message);
-				
-				if (r.message) {
-					// Show brand field if item group exists in any brand
-					frm.set_df_property("custom_brands", "hidden", 0);
-					frm.set_df_property("custom_catalogue", "hidden", 0);
-				} else {
-					// Hide brand field and clear its value if item group doesn't exist in any brand
-					frm.set_df_property("custom_brands", "hidden", 1);
-					frm.set_df_property("custom_catalogue", "hidden", 1);
-					if (frm.doc.custom_brands) {
-						frm.set_value("custom_brands", null);
-					}
-					if (frm.doc.custom_catalogue) {
-						frm.set_value("custom_catalogue", null);
-					}
+		fetch_brand_data(frm).then((data) => {
+			const in_brands = !!(data && data.item_group_in_brands);
+			console.log("Item group exists in brands:", in_brands);
+
+			if (in_brands) {
+				// Show brand field if item group exists in any brand
+				frm.set_df_property("custom_brands", "hidden", 0);
+				frm.set_df_property("custom_catalogue", "hidden", 0);
+			} else {
+				// Hide brand field and clear its value if item group doesn't exist in any brand
+				frm.set_df_property("custom_brands", "hidden", 1);
+				frm.set_df_property("custom_catalogue", "hidden", 1);
+				if (frm.doc.custom_brands) {
+					frm.set_value("custom_brands", null);
+				}
+				if (frm.doc.custom_catalogue) {
+					frm.set_value("custom_catalogue", null);
 				}
-				frm.refresh_field("custom_brands");
-				frm.refresh_field("custom_catalogue");
 			}
+			frm.refresh_field("custom_brands");
+			frm.refresh_field("custom_catalogue");
 		});
 	} else {
 		// Hide brand field if no item group is selected
@@ -296,7 +296,31 @@ function check_remaining_items_and_show_button(frm) {
 								freeze_message: __("Creating Material Requests..."),
 								callback: function (r) {
 									if (r.message) {
-										if (r.message.purchase_mr || r.message.issue_mr) {
+										if (r.message.queued) {
+											// Large orders are created in the background
+											frappe.show_alert({
+												message: __("Material Requests are being created in the background"),
+												indicator: "blue",
+											});
+											frappe.realtime.on(
+												"fabric_sense_multi_material_request",
+												function handler(data) {
+													if (data.reference_name !== frm.doc.name) return;
+													frappe.realtime.off("fabric_sense_multi_material_request", handler);
+													if (data.error) {
+														frappe.msgprint({
+															title: __("Error"),
+															indicator: "red",
+															message: __("Error creating Material Requests: {0}", [data.error]),
+														});
+													} else {
+														frappe.set_route("List", "Material Request", {
+															custom_sales_order: frm.doc.name,
+														});
+													}
+												}
+											);
+										} else if (r.message.purchase_mr || r.message.issue_mr) {
 											// Navigate to Material Request list
 											frappe.set_route("List", "Material Request", {
 												custom_sales_order: frm.doc.name,
@@ -0,0 +1,50 @@
+// Extend ERPNext's Sales Order list with a bulk Material Request action
+(function () {
+	const settings = (frappe.listview_settings["Sales Order"] =
+		frappe.listview_settings["Sales Order"] || {});
+	const original_onload = settings.onload;
+
+	settings.onload = function (listview) {
+		if (original_onload) {
+			original_onload(listview);
+		}
+
+		listview.page.add_actions_menu_item(__("Create Material Requests"), function () {
+			const sales_orders = listview
+				.get_checked_items()
+				.filter((doc) => doc.docstatus === 1)
+				.map((doc) => doc.name);
+
+			if (!sales_orders.length) {
+				frappe.msgprint(__("Please select submitted Sales Orders"));
+				return;
+			}
+
+			frappe.call({
+				method: "fabric_sense.fabric_sense.py.bulk_material_request.create_material_requests_for_sales_orders",
+				args: { sales_orders: sales_orders },
+				callback: function (r) {
+					if (r.message && r.message.queued) {
+						frappe.show_alert({
+							message: __("Material Requests are being created in the background"),
+							indicator: "blue",
+						});
+					}
+				},
+			});
+		});
+
+		frappe.realtime.off("fabric_sense_bulk_material_request");
+		frappe.realtime.on("fabric_sense_bulk_material_request", function (data) {
+			frappe.msgprint({
+				title: __("Material Requests"),
+				indicator: data.failed.length ? "orange" : "green",
+				message: __("Created {0} Material Requests, skipped {1} and failed {2} Sales Orders", [
+					data.created.length,
+					data.skipped.length,
+					data.failed.length,
+				]),
+			});
+		});
+	};
+})();
@@ -0,0 +1,72 @@
+frappe.ui.form.on("Stock Entry", {
+	refresh: function (frm) {
+		if (frm.doc.docstatus !== 0 || frm.doc.purpose !== "Material Issue") {
+			return;
+		}
+
+		frm.add_custom_button(__("Allocate Rolls"), function () {
+			allocate_rolls(frm);
+		});
+	},
+});
+
+function allocate_rolls(frm) {
+	if (!(frm.doc.items || []).some((item) => item.item_code && item.s_warehouse)) {
+		frappe.msgprint(__("Please set the source warehouse on the items first"));
+		return;
+	}
+
+	frappe.prompt(
+		{
+			fieldname: "strategy",
+			fieldtype: "Select",
+			label: __("Strategy"),
+			options: ["Best Fit", "Minimum Leftover"],
+			default: "Best Fit",
+			reqd: 1,
+			description: __(
+				"Best Fit cuts from the shortest roll that covers the length. Minimum Leftover picks the rolls that leave the least fabric on opened rolls."
+			),
+		},
+		function (values) {
+			frappe.call({
+				method: "fabric_sense.fabric_sense.py.roll_allocation.get_roll_allocation",
+				args: { items: frm.doc.items, strategy: values.strategy },
+				freeze: true,
+				freeze_message: __("Allocating Rolls..."),
+				callback: function (r) {
+					if (!r.message) {
+						return;
+					}
+
+					const skip = ["name", "idx", "doctype", "parent", "parentfield", "parenttype"];
+					frm.clear_table("items");
+					r.message.rows.forEach(function (row) {
+						const child = frm.add_child("items");
+						Object.keys(row)
+							.filter((key) => !skip.includes(key) && !key.startsWith("__"))
+							.forEach((key) => (child[key] = row[key]));
+					});
+					frm.refresh_field("items");
+					frm.dirty();
+
+					if (r.message.shortages.length) {
+						frappe.msgprint({
+							title: __("Not Enough Rolls"),
+							indicator: "orange",
+							message: r.message.shortages
+								.map((row) =>
+									__("{0} in {1}: {2} short", [row.item_code, row.s_warehouse, row.qty])
+								)
+								.join("<br>"),
+						});
+					} else {
+						frappe.show_alert({ message: __("Rolls allocated"), indicator: "green" });
+					}
+				},
+			});
+		},
+		__("Allocate Rolls"),
+		__("Allocate")
+	);
+}
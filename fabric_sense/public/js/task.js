@@ -2,6 +2,43 @@ let task_status_before_save = null;
 let cached_contractors = null; // Cache contractors for selected service
 
 frappe.ui.form.on("Task", {
+	onload: function (frm) {
+		// Contractor payment of a completed task is posted in the background
+		frappe.realtime.off("fabric_sense_contractor_accounting");
+		frappe.realtime.on("fabric_sense_contractor_accounting", function (data) {
+			if (data.task !== frm.doc.name) return;
+
+			if (data.error) {
+				frappe.msgprint({
+					title: __("Contractor Payment"),
+					indicator: "red",
+					message: __("Failed to post contractor payment: {0}", [data.error]),
+				});
+				return;
+			}
+
+			if (data.journal_entry) {
+				frappe.show_alert({
+					message: __("Journal Entry created and submitted: {0}", [
+						frappe.utils.get_form_link("Journal Entry", data.journal_entry, true),
+					]),
+					indicator: "green",
+				});
+			} else if (data.payment_history) {
+				frappe.show_alert({
+					message: __("Contractor Payment History created: {0}", [
+						frappe.utils.get_form_link(
+							"Contractor Payment History",
+							data.payment_history,
+							true
+						),
+					]),
+					indicator: "green",
+				});
+			}
+		});
+	},
+
 	refresh: function (frm) {
 		// Set default accounts for new Task
 		if (frm.doc.__islocal && frm.doc.company) {
@@ -0,0 +1,115 @@
+// Extend ERPNext's Task list with bulk completion
+(function () {
+	const settings = (frappe.listview_settings["Task"] = frappe.listview_settings["Task"] || {});
+	const original_onload = settings.onload;
+
+	settings.onload = function (listview) {
+		if (original_onload) {
+			original_onload(listview);
+		}
+
+		listview.page.add_actions_menu_item(__("Complete Tasks"), function () {
+			const tasks = listview.get_checked_items().map((doc) => doc.name);
+
+			if (!tasks.length) {
+				frappe.msgprint(__("Please select Tasks to complete"));
+				return;
+			}
+
+			frappe.confirm(
+				__("Complete {0} Tasks and post contractor payments?", [tasks.length]),
+				function () {
+					frappe.call({
+						method: "fabric_sense.fabric_sense.py.task.complete_tasks",
+						args: { tasks: tasks },
+						freeze: true,
+						freeze_message: __("Completing Tasks..."),
+						callback: function (r) {
+							if (r.message) {
+								frappe.show_alert({
+									message: __(
+										"Completed {0} Tasks with {1} Journal Entries",
+										[r.message.completed.length, r.message.journal_entries.length]
+									),
+									indicator: "green",
+								});
+								listview.clear_checked_items();
+								listview.refresh();
+							}
+						},
+					});
+				}
+			);
+		});
+
+		listview.page.add_inner_button(__("Propose Contractor Assignments"), function () {
+			propose_contractor_assignments(listview);
+		});
+	};
+
+	function propose_contractor_assignments(listview) {
+		frappe.call({
+			method: "fabric_sense.fabric_sense.py.contractor_scheduler.propose_contractor_assignments",
+			freeze: true,
+			freeze_message: __("Scheduling Tasks..."),
+			callback: function (r) {
+				const proposal = r.message || { assignments: [], unassigned: [] };
+				if (!proposal.assignments.length) {
+					frappe.msgprint(__("No unassigned Tasks could be scheduled"));
+					return;
+				}
+
+				const rows = proposal.assignments
+					.map(
+						(row) =>
+							`<tr>
+								<td>${frappe.utils.escape_html(row.task)}</td>
+								<td>${frappe.utils.escape_html(row.service)}</td>
+								<td>${frappe.utils.escape_html(row.contractor)}</td>
+								<td>${frappe.datetime.str_to_user(row.start_date)}</td>
+							</tr>`
+					)
+					.join("");
+
+				const dialog = new frappe.ui.Dialog({
+					title: __("Proposed Contractor Assignments"),
+					size: "large",
+					fields: [
+						{
+							fieldtype: "HTML",
+							options: `<p>${__("{0} Tasks scheduled, {1} could not be assigned", [
+								proposal.assignments.length,
+								proposal.unassigned.length,
+							])}</p>
+							<table class="table table-bordered">
+								<thead><tr><th>${__("Task")}</th><th>${__("Service")}</th><th>${__("Contractor")}</th><th>${__("Date")}</th></tr></thead>
+								<tbody>${rows}</tbody>
+							</table>`,
+						},
+					],
+					primary_action_label: __("Apply"),
+					primary_action: function () {
+						frappe.call({
+							method: "fabric_sense.fabric_sense.py.contractor_scheduler.apply_contractor_assignments",
+							args: { assignments: proposal.assignments },
+							freeze: true,
+							callback: function (res) {
+								dialog.hide();
+								if (res.message) {
+									frappe.show_alert({
+										message: res.message.queued
+											? __("Assignments are being applied in the background")
+											: __("Assigned {0} Tasks", [(res.message.updated || []).length]),
+										indicator: "green",
+									});
+								}
+								listview.refresh();
+							},
+						});
+					},
+				});
+				dialog.show();
+			},
+		});
+	}
+})();